@@ -6,6 +6,12 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import logging
+from structured_log import Summary, configure as configure_logging, get_logger
+from profiling import RequestProfiler, phase
+from fast_json import FastJSONProvider
+from drift import DriftMonitor
+from cascade import Cascade
 
 # Load environment variables
 load_dotenv()
@@ -13,10 +19,51 @@ load_dotenv()
 # Global Configuration Variables
 PORT = int(os.getenv('PORT', 8000))
 CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+# Log level and format ('text' key=value lines or 'json')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# Seconds between summary lines (requests/s, readings predicted, errors); 0 disables them
+LOG_SUMMARY_INTERVAL = float(os.getenv('LOG_SUMMARY_INTERVAL', 60))
+# Server-Timing headers on every response, and profiles of selected requests
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+# Fraction of requests profiled at random; requests with the X-Profile header always are
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+# Required X-Profile header value when set
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+# 'sample' (collapsed stacks for flame graphs) or 'cprofile' (pstats files)
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sample')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Oldest profiles beyond this many are deleted
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+# Compare live inputs and predictions with the training data (needs drift_reference.pkl from train.py)
+DRIFT_ENABLED = os.getenv('DRIFT_ENABLED', 'true').lower() == 'true'
+# Seconds per drift window; scores cover the current and the previous window
+DRIFT_WINDOW = float(os.getenv('DRIFT_WINDOW', 3600))
+# PSI above which a feature is reported as 'warn' and as 'alert'
+DRIFT_PSI_WARN = float(os.getenv('DRIFT_PSI_WARN', 0.1))
+DRIFT_PSI_ALERT = float(os.getenv('DRIFT_PSI_ALERT', 0.25))
+# Fewer live rows than this report 'insufficient_data' instead of scores
+DRIFT_MIN_ROWS = int(os.getenv('DRIFT_MIN_ROWS', 200))
+# Answer confident readings from the first-stage model (needs cascade_model.pkl from train.py)
+CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'true').lower() == 'true'
+
+# Log records (including werkzeug's access log) are written to stdout by a background thread
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = get_logger('ml')
+summary = Summary(log, LOG_SUMMARY_INTERVAL)
 
 app = Flask(__name__)
+# orjson-backed jsonify that encodes NumPy values and pandas frames itself
+app.json = FastJSONProvider(app)
 CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}})
 
+# Installed only when enabled, so disabled profiling adds nothing to a request
+profiler = RequestProfiler(PROFILE_DIR, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_TOKEN,
+                           interval_ms=PROFILE_INTERVAL_MS, max_files=PROFILE_MAX_FILES)
+if PROFILING_ENABLED:
+    profiler.init_app(app)
+
 # Path setup to find files in the same directory as app.py
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(
@@ -34,6 +81,23 @@ try:
 except:
     metadata = {'accuracy': 0.84, 'f1_score': 0.84}
 
+# Drift monitor, when enabled and train.py has written the reference
+drift = None
+if DRIFT_ENABLED:
+    try:
+        drift = DriftMonitor(joblib.load(os.path.join(BASE_DIR, 'drift_reference.pkl')),
+                             DRIFT_WINDOW, DRIFT_PSI_WARN, DRIFT_PSI_ALERT, DRIFT_MIN_ROWS)
+    except FileNotFoundError:
+        log.warning('drift.disabled', reason='drift_reference.pkl not found, run train.py')
+
+# First-stage model in front of the full model, when enabled and train.py has written it
+cascade = None
+if CASCADE_ENABLED:
+    try:
+        cascade = Cascade(joblib.load(os.path.join(BASE_DIR, 'cascade_model.pkl')), model_columns, model)
+    except FileNotFoundError:
+        log.warning('cascade.disabled', reason='cascade_model.pkl not found, run train.py')
+
 
 def get_solution(prediction):
     """Get recommended action based on prediction."""
@@ -80,6 +144,56 @@ def engineer_features(df):
     return df
 
 
+def prepare_features(df_input):
+    """Turn raw ML inputs into the scaled feature matrix the model expects."""
+    if 'MoistureDetected' in df_input.columns:
+        df_input['MoistureDetected'] = df_input['MoistureDetected'].astype(
+            int)
+
+    # Apply feature engineering
+    df_input = engineer_features(df_input)
+
+    # One-hot encode and align columns
+    df_input = pd.get_dummies(df_input).reindex(
+        columns=model_columns, fill_value=0)
+
+    if drift is not None:
+        drift.observe(df_input)
+
+    # Scale features
+    return scaler.transform(df_input)
+
+
+def score(df_scaled):
+    """
+    Encoded predictions, class probabilities and which rows the full model
+    answered: only the escalated ones with the cascade, all of them without.
+    """
+    if cascade is not None:
+        return cascade.predict(df_scaled)
+    return model.predict(df_scaled), model.predict_proba(df_scaled), np.ones(len(df_scaled), dtype=bool)
+
+
+def reliability_for(confidence):
+    """Reliability based on confidence."""
+    return "HIGH" if confidence > 80 else "MEDIUM" if confidence > 60 else "LOW"
+
+
+def batch_frame(payload):
+    """
+    Build one DataFrame from a batch request body: either a list of
+    readings, or columnar {"columns": {...}, "constants": {...}}.
+    """
+    if isinstance(payload, list):
+        return pd.DataFrame(payload)
+    if isinstance(payload, dict) and isinstance(payload.get('columns'), dict):
+        df_input = pd.DataFrame(payload['columns'])
+        for name, value in (payload.get('constants') or {}).items():
+            df_input[name] = value
+        return df_input
+    return None
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
@@ -90,99 +204,137 @@ def health():
     })
 
 
-@app.route('/api/predict', methods=['POST'])
-def predict():
-    """Predict battery status from sensor data."""
+def predict_payload(data):
+    """
+    Run one reading through the model and build the /api/predict body.
+    Also called in-process by root_server's embedded mode.
+    """
     try:
-        data = request.get_json()
-        df_input = pd.DataFrame([data])
-
-        if 'MoistureDetected' in df_input.columns:
-            df_input['MoistureDetected'] = df_input['MoistureDetected'].astype(
-                int)
-
-        # Apply feature engineering
-        df_input = engineer_features(df_input)
-
-        # One-hot encode and align columns
-        df_input = pd.get_dummies(df_input).reindex(
-            columns=model_columns, fill_value=0)
-
-        # Scale features
-        df_scaled = scaler.transform(df_input)
-
-        # Get prediction and confidence
-        pred_num = model.predict(df_scaled)[0]
-        prediction = le.inverse_transform([pred_num])[0]
-
-        # Get prediction probabilities for all classes
-        probabilities = model.predict_proba(df_scaled)[0]
+        with phase('features'):
+            df_scaled = prepare_features(pd.DataFrame([data]))
+
+        with phase('model'):
+            # Get prediction and probabilities for all classes
+            encoded, probabilities, escalated = score(df_scaled)
+            pred_num = encoded[0]
+            if drift is not None:
+                drift.observe_predictions([pred_num])
+            prediction = str(le.inverse_transform([pred_num])[0])
+            probabilities = probabilities[0]
         confidence = float(max(probabilities) * 100)
 
         # Map probabilities to class names
         class_probabilities = {
-            le.classes_[i]: round(float(prob * 100), 2)
+            str(le.classes_[i]): round(float(prob * 100), 2)
             for i, prob in enumerate(probabilities)
         }
 
-        # Reliability based on confidence
-        reliability = "HIGH" if confidence > 80 else "MEDIUM" if confidence > 60 else "LOW"
+        reliability = reliability_for(confidence)
 
         solution = get_solution(prediction)
 
-        return jsonify({
+        summary.count('predicted')
+        return {
             "status": "success",
             "prediction": prediction,
             "solution": solution,
             "confidence": round(confidence, 2),
             "reliability": reliability,
             "probabilities": class_probabilities,
+            "stage": "full" if escalated[0] else "first",
             "model_accuracy": metadata.get('accuracy', 0.84),
             "input_data": data
-        })
+        }
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+        summary.count('errors')
+        log.limited(logging.ERROR, 'predict.failed', error=str(e))
+        return {"status": "error", "message": str(e)}
 
 
-@app.route('/api/predict/batch', methods=['POST'])
-def predict_batch():
-    """Predict multiple battery readings at once."""
+def predict_batch_payload(payload):
+    """
+    Score a batch (array of readings or columnar body) with one model call
+    and build the /api/predict/batch body. Also used by embedded mode.
+    """
     try:
-        data_list = request.get_json()
-        if not isinstance(data_list, list):
-            return jsonify({"status": "error", "message": "Expected array of readings"})
+        df_input = batch_frame(payload)
+        if df_input is None:
+            return {"status": "error", "message": "Expected array of readings or columnar batch"}
+        if df_input.empty:
+            return {"status": "success", "results": [], "count": 0}
+
+        with phase('features'):
+            df_scaled = prepare_features(df_input)
+        with phase('model'):
+            encoded, probabilities, escalated = score(df_scaled)
+            predictions = le.inverse_transform(encoded)
+            if drift is not None:
+                drift.observe_predictions(encoded)
+        confidences = probabilities.max(axis=1) * 100
 
         results = []
-        for data in data_list:
-            df_input = pd.DataFrame([data])
-
-            if 'MoistureDetected' in df_input.columns:
-                df_input['MoistureDetected'] = df_input['MoistureDetected'].astype(
-                    int)
-
-            df_input = engineer_features(df_input)
-            df_input = pd.get_dummies(df_input).reindex(
-                columns=model_columns, fill_value=0)
-            df_scaled = scaler.transform(df_input)
-
-            pred_num = model.predict(df_scaled)[0]
-            prediction = le.inverse_transform([pred_num])[0]
-            probabilities = model.predict_proba(df_scaled)[0]
-            confidence = float(max(probabilities) * 100)
-
+        for prediction, confidence, row, full in zip(predictions, confidences, probabilities, escalated):
+            prediction = str(prediction)
+            confidence = float(confidence)
             results.append({
                 "prediction": prediction,
                 "confidence": round(confidence, 2),
-                "solution": get_solution(prediction)
+                "solution": get_solution(prediction),
+                "reliability": reliability_for(confidence),
+                "probabilities": {
+                    str(le.classes_[i]): round(float(prob * 100), 2)
+                    for i, prob in enumerate(row)
+                },
+                "stage": "full" if full else "first"
             })
 
-        return jsonify({
+        summary.count('predicted', len(results))
+        return {
             "status": "success",
             "results": results,
-            "count": len(results)
-        })
+            "count": len(results),
+            "model_accuracy": metadata.get('accuracy', 0.84)
+        }
+    except Exception as e:
+        summary.count('errors')
+        log.limited(logging.ERROR, 'predict_batch.failed', error=str(e))
+        return {"status": "error", "message": str(e)}
+
+
+@app.after_request
+def count_request(response):
+    """Request and server error counts for the periodic log summary"""
+    # Started on first use so importing the app (embedded mode, serverless) starts no threads
+    summary.start()
+    summary.count('requests')
+    if response.status_code >= 500:
+        summary.count('server_errors')
+    return response
+
+
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    """Predict battery status from sensor data."""
+    try:
+        data = request.get_json()
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+    return jsonify(predict_payload(data))
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Predict multiple battery readings at once.
+    Accepts an array of readings or a columnar body
+    {"columns": {feature: [values...]}, "constants": {feature: value}};
+    the whole batch goes through the model in one call.
+    """
+    try:
+        payload = request.get_json()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
+    return jsonify(predict_batch_payload(payload))
 
 
 @app.route('/api/data', methods=['GET'])
@@ -215,7 +367,7 @@ def get_data():
 
         return jsonify({
             "status": "success",
-            "data": paginated_df.to_dict(orient='records'),
+            "data": paginated_df,
             "pagination": {
                 "page": page,
                 "per_page": per_page,
@@ -237,7 +389,7 @@ def get_record(record_id):
         if record_id < 0 or record_id >= len(df):
             return jsonify({"status": "error", "message": "Record not found"}), 404
 
-        record = df.iloc[record_id].to_dict()
+        record = df.iloc[record_id]
         return jsonify({"status": "success", "data": record})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -252,8 +404,8 @@ def get_stats():
         return jsonify({
             "status": "success",
             "total_records": int(len(df)),
-            "event_distribution": df['EventFlag'].value_counts().to_dict(),
-            "event_percentages": (df['EventFlag'].value_counts(normalize=True) * 100).round(2).to_dict(),
+            "event_distribution": df['EventFlag'].value_counts(),
+            "event_percentages": (df['EventFlag'].value_counts(normalize=True) * 100).round(2),
             "temperature": {
                 "max": {"mean": round(float(df['MaxTemp_C'].mean()), 2), "max": round(float(df['MaxTemp_C'].max()), 2), "min": round(float(df['MaxTemp_C'].min()), 2)},
                 "avg": {"mean": round(float(df['AvgTemp_C'].mean()), 2), "max": round(float(df['AvgTemp_C'].max()), 2), "min": round(float(df['AvgTemp_C'].min()), 2)}
@@ -279,12 +431,21 @@ def get_model_info():
             "n_features": metadata.get('n_features', 0),
             "classes": metadata.get('classes', []),
             "trained_at": metadata.get('trained_at', 'Unknown'),
-            "top_features": metadata.get('top_features', [])
+            "top_features": metadata.get('top_features', []),
+            "cascade": cascade.metrics() if cascade is not None else {"enabled": False}
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
 
+@app.route('/api/drift', methods=['GET'])
+def get_drift():
+    """PSI and KS drift scores of live inputs and predictions against the training data."""
+    if drift is None:
+        return jsonify({"status": "error", "message": "Drift monitoring is disabled"}), 404
+    return jsonify({"status": "success", **drift.report()})
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring."""
@@ -311,6 +472,7 @@ def index():
             "GET /api/data/<id>": "Get single record by ID",
             "GET /api/stats": "Get dashboard statistics",
             "GET /api/model/info": "Get model information",
+            "GET /api/drift": "Get input and prediction drift scores",
             "GET /api/health": "Health check"
         }
     })
@@ -0,0 +1,66 @@
+"""
+Two-stage cascade inference.
+
+train.py saves cascade_model.pkl: a shallow decision tree over the model's
+top features and the confidence threshold at which its answers were
+calibrated to be as accurate as CASCADE_TARGET_ACCURACY on held-out folds.
+
+Cascade.predict() runs every reading through the tree first. Readings it
+is confident about are answered from its probabilities; the rest, and
+only the rest, are escalated to the full model. Both stages use the
+scaled feature matrix from prepare_features(), so escalation costs one
+full-model call on the uncertain rows and nothing else.
+"""
+
+# Standard Libraries
+import threading
+import time
+
+
+class Cascade:
+    """First-stage model in front of the full model, with live escalation and latency counts"""
+
+    def __init__(self, artifact, model_columns, full_model):
+        self.first_stage = artifact['model']
+        self.features = artifact['features']
+        self.threshold = artifact['threshold']
+        self.trained = artifact.get('metrics', {})
+        self.indices = [list(model_columns).index(feature) for feature in self.features]
+        self.full_model = full_model
+        self.lock = threading.Lock()
+        self.counters = {'readings': 0, 'escalated': 0, 'seconds': 0.0}
+
+    def predict(self, matrix):
+        """Encoded predictions, class probabilities and a per-row mask of escalated readings"""
+        started = time.perf_counter()
+        probabilities = self.first_stage.predict_proba(matrix[:, self.indices])
+        escalated = probabilities.max(axis=1) < self.threshold
+        if escalated.any():
+            probabilities[escalated] = self.full_model.predict_proba(matrix[escalated])
+        encoded = probabilities.argmax(axis=1)
+        elapsed = time.perf_counter() - started
+
+        with self.lock:
+            self.counters['readings'] += len(matrix)
+            self.counters['escalated'] += int(escalated.sum())
+            self.counters['seconds'] += elapsed
+        return encoded, probabilities, escalated
+
+    def metrics(self):
+        """Threshold, training-time evaluation and live escalation rate and latency"""
+        with self.lock:
+            readings = self.counters['readings']
+            escalated = self.counters['escalated']
+            seconds = self.counters['seconds']
+        return {
+            'enabled': True,
+            'features': self.features,
+            'threshold': self.threshold,
+            'trained': self.trained,
+            'live': {
+                'readings': readings,
+                'escalated': escalated,
+                'escalation_rate': round(escalated / readings, 4) if readings else None,
+                'mean_ms_per_reading': round(seconds / readings * 1000, 3) if readings else None
+            }
+        }
@@ -0,0 +1,187 @@
+"""
+Feature drift monitoring for live ML inputs.
+
+train.py saves a reference sketch of the training data: for every model
+column, bin edges and the share of training rows in each bin, plus the
+class frequencies of the labels. Columns with few distinct values (flags,
+one-hot categories, hard-coded defaults) get one bin per value; the rest
+get equal-mass bins from training quantiles.
+
+At serving time DriftMonitor counts every scored row into the same bins
+and every prediction into its class, so memory is fixed by the number of
+bins whatever the traffic, and no request is kept. Counts live in two
+windows of `window_seconds`; the previous window is kept when the
+current one rotates, so scores always cover between one and two windows
+of recent traffic.
+
+Scores need `min_rows` live rows: with fewer, a handful of readings
+would swing PSI past any threshold, so the report says `insufficient_data`
+and carries no scores or status.
+
+Scores per feature and for the predicted classes:
+- PSI: sum((live - ref) * ln(live / ref)) over bins; < 0.1 is stable,
+  0.1-0.25 a moderate shift, > 0.25 a significant one
+- KS: largest gap between the binned reference and live CDFs
+"""
+
+# Importing Required Libraries
+import numpy as np
+
+# Standard Libraries
+import threading
+import time
+
+BINS = 10
+# Added to empty bins so PSI stays finite
+EPSILON = 1e-4
+
+
+def feature_edges(values, bins=BINS):
+    """Inner bin edges for one column: value midpoints when it is discrete, else quantiles"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+
+
+def bin_counts(values, edges):
+    """Row counts per bin; values beyond the outer edges fall into the first and last bins"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    return np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+
+
+def build_reference(frame, labels, classes, bins=BINS):
+    """Reference sketch of a training feature frame and its encoded labels, for train.py"""
+    features = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=np.float64)
+        edges = feature_edges(values, bins)
+        counts = bin_counts(values, edges)
+        features[column] = {
+            'edges': edges,
+            'proportions': counts / counts.sum()
+        }
+    class_counts = np.bincount(np.asarray(labels), minlength=len(classes))
+    return {
+        'bins': bins,
+        'rows': len(frame),
+        'features': features,
+        'classes': [str(name) for name in classes],
+        'class_proportions': class_counts / class_counts.sum()
+    }
+
+
+def psi(reference, live):
+    reference = np.maximum(reference, EPSILON)
+    live = np.maximum(live, EPSILON)
+    return float(np.sum((live - reference) * np.log(live / reference)))
+
+
+def ks(reference, live):
+    return float(np.max(np.abs(np.cumsum(reference) - np.cumsum(live))))
+
+
+class DriftMonitor:
+    """Fixed-size live sketches compared against a training reference"""
+
+    def __init__(self, reference, window_seconds=3600, psi_warn=0.1, psi_alert=0.25, min_rows=200):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.psi_warn = psi_warn
+        self.psi_alert = psi_alert
+        self.min_rows = min_rows
+        self.columns = list(reference['features'])
+        self.edges = [reference['features'][column]['edges'] for column in self.columns]
+        self.lock = threading.Lock()
+        self.previous = None
+        self.current = self._empty()
+        self.window_started = time.time()
+
+    def _empty(self):
+        return {
+            'rows': 0,
+            'features': [np.zeros(len(edges) + 1, dtype=np.int64) for edges in self.edges],
+            'classes': np.zeros(len(self.reference['classes']), dtype=np.int64)
+        }
+
+    def _rotate(self, now):
+        """Start a new window once the current one is `window_seconds` old; call with the lock held"""
+        if now - self.window_started >= self.window_seconds:
+            self.previous = self.current
+            self.current = self._empty()
+            self.window_started = now
+
+    def observe(self, frame):
+        """Count the rows of an unscaled feature frame aligned to the model columns"""
+        matrix = frame.reindex(columns=self.columns, fill_value=0).to_numpy(dtype=np.float64)
+        counts = [bin_counts(matrix[:, i], edges) for i, edges in enumerate(self.edges)]
+        with self.lock:
+            self._rotate(time.time())
+            self.current['rows'] += len(matrix)
+            for total, added in zip(self.current['features'], counts):
+                total += added
+
+    def observe_predictions(self, encoded):
+        """Count predicted classes (label-encoded indices)"""
+        counts = np.bincount(np.asarray(encoded, dtype=np.int64), minlength=len(self.reference['classes']))
+        with self.lock:
+            self._rotate(time.time())
+            self.current['classes'] += counts
+
+    def _status(self, score):
+        return 'alert' if score > self.psi_alert else 'warn' if score > self.psi_warn else 'ok'
+
+    def report(self):
+        """PSI and KS per feature and for predicted classes over the current and previous windows"""
+        with self.lock:
+            self._rotate(time.time())
+            windows = [self.current] + ([self.previous] if self.previous else [])
+            rows = sum(window['rows'] for window in windows)
+            features = [sum(window['features'][i] for window in windows) for i in range(len(self.columns))]
+            classes = sum(window['classes'] for window in windows)
+            window_started = self.window_started
+
+        report = {
+            'window_seconds': self.window_seconds,
+            'covers_seconds': round(time.time() - window_started + (self.window_seconds if len(windows) > 1 else 0), 1),
+            'rows': rows,
+            'min_rows': self.min_rows,
+            'thresholds': {'psi_warn': self.psi_warn, 'psi_alert': self.psi_alert},
+            'features': {},
+            'predictions': None
+        }
+        if rows < max(self.min_rows, 1):
+            report['status'] = 'insufficient_data'
+            report['drifted'] = []
+            report['max_psi'] = None
+            return report
+
+        for column, counts in zip(self.columns, features):
+            expected = self.reference['features'][column]['proportions']
+            live = counts / max(counts.sum(), 1)
+            score = psi(expected, live)
+            report['features'][column] = {
+                'psi': round(score, 4),
+                'ks': round(ks(expected, live), 4),
+                'status': self._status(score)
+            }
+        if classes.sum() >= max(self.min_rows, 1):
+            expected = self.reference['class_proportions']
+            live = classes / classes.sum()
+            score = psi(expected, live)
+            report['predictions'] = {
+                'psi': round(score, 4),
+                'ks': round(ks(expected, live), 4),
+                'status': self._status(score),
+                'reference': dict(zip(self.reference['classes'], np.round(expected, 4).tolist())),
+                'live': dict(zip(self.reference['classes'], np.round(live, 4).tolist()))
+            }
+        ranked = sorted(report['features'].items(), key=lambda item: item[1]['psi'], reverse=True)
+        report['drifted'] = [column for column, scores in ranked if scores['status'] != 'ok']
+        report['max_psi'] = ranked[0][1]['psi'] if ranked else None
+        statuses = {scores['status'] for scores in report['features'].values()}
+        report['status'] = 'alert' if 'alert' in statuses else 'warn' if 'warn' in statuses else 'ok'
+        return report
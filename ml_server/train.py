@@ -11,17 +11,20 @@ import numpy as np
 # ML Libraries
 import joblib
 import os
+import sys
 import json
+import time
 
 # All other imports
 from datetime import datetime
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold
+from sklearn.model_selection import train_test_split, cross_val_score, cross_val_predict, GridSearchCV, StratifiedKFold
 from sklearn.ensemble import (
     RandomForestClassifier, 
     GradientBoostingClassifier, 
     VotingClassifier,
     AdaBoostClassifier
 )
+from sklearn.tree import DecisionTreeClassifier
 from sklearn.preprocessing import LabelEncoder, StandardScaler, RobustScaler
 from sklearn.metrics import (
     classification_report, 
@@ -31,6 +34,7 @@ from sklearn.metrics import (
     precision_recall_fscore_support
 )
 from sklearn.pipeline import Pipeline
+from drift import build_reference
 
 # Suppress warnings for cleaner output
 import warnings
@@ -46,6 +50,7 @@ DATA_FILE = 'EV_Battery_Charging_5000_Extended.csv' # Dataset file path - extend
 
 TEST_SIZE = 0.2  # Percentage of data for testing (0.2 = 20%)
 RANDOM_STATE = 42  # For reproducibility
+DRIFT_BINS = 10  # Histogram bins per feature in the drift reference (fewer for discrete features)
 CV_FOLDS = 5  # Cross-validation folds (higher = more reliable but slower)
 
 # RandomForest Hyperparameters
@@ -70,6 +75,14 @@ ADA_N_ESTIMATORS = 100
 # Learning rate - higher = faster learning | Typical range: 0.1-1.0
 ADA_LEARNING_RATE = 0.5
 
+# Cascade (first-stage) Model - answers confident readings without the full model
+# Tree depth - shallow keeps it cheap | Typical range: 3-6
+CASCADE_MAX_DEPTH = 4
+# Top features (by importance) the first stage uses | At most 10 (the number kept in metadata)
+CASCADE_N_FEATURES = 10
+# Accuracy required of first-stage answers; sets the confidence threshold | Typical range: 0.98-0.999
+CASCADE_TARGET_ACCURACY = 0.995
+
 # ============================================================
 
 def load_and_preprocess_data(filepath):
@@ -102,18 +115,22 @@ def load_and_preprocess_data(filepath):
     
     return X, y, list(X.columns)
 
-def train_and_evaluate_model(X, y):
-    """Train multiple models and select the best one using ensemble methods."""
-    
-    # Encode labels
+def split_dataset(X, y):
+    """Encode labels and make the stratified train/test split (the same split on every call)."""
     le = LabelEncoder()
     y_encoded = le.fit_transform(y)
-    print(f"🏷️  Classes: {list(le.classes_)}\n")
-    
-    # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y_encoded, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y_encoded
     )
+    return le, X_train, X_test, y_train, y_test
+
+def train_and_evaluate_model(X, y):
+    """Train multiple models and select the best one using ensemble methods."""
+    
+    # Encode labels and split data
+    le, X_train, X_test, y_train, y_test = split_dataset(X, y)
+    print(f"🏷️  Classes: {list(le.classes_)}\n")
+    
     print(f"📊 Train set: {X_train.shape[0]} samples")
     print(f"📊 Test set: {X_test.shape[0]} samples\n")
     
@@ -262,6 +279,84 @@ def save_model_artifacts(model, label_encoder, scaler, model_columns, accuracy,
         json.dump(metadata, f, indent=2)
     print("   ✓ model_info.json")
 
+def save_drift_reference(X, y):
+    """Save per-feature histograms and class frequencies of the training split for drift monitoring."""
+    # Same split as train_and_evaluate_model, so the reference is the data the model saw
+    le, X_train, _, y_train, _ = split_dataset(X, y)
+    joblib.dump(build_reference(X_train, y_train, le.classes_, DRIFT_BINS), 'drift_reference.pkl')
+    print("   ✓ drift_reference.pkl")
+
+def calibrate_threshold(confidence, correct, target):
+    """Lowest confidence whose accepted predictions are at least `target` accurate (1.0 escalates everything)."""
+    threshold = 1.0
+    for candidate in np.unique(confidence)[::-1]:
+        accepted = confidence >= candidate
+        if correct[accepted].mean() >= target:
+            threshold = float(candidate)
+    return threshold
+
+def mean_latency_ms(predict, rows):
+    """Mean milliseconds per single-reading prediction, as the /api/predict endpoint makes them."""
+    started = time.perf_counter()
+    for i in range(len(rows)):
+        predict(rows[i:i + 1])
+    return (time.perf_counter() - started) / len(rows) * 1000
+
+def train_cascade(X, y, model, scaler, features):
+    """Train the first-stage model of the cascade, calibrate its threshold and report its cost and accuracy."""
+    print("\n🪜 Training cascade first stage...")
+    _, X_train, X_test, y_train, y_test = split_dataset(X, y)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    indices = [list(X.columns).index(feature) for feature in features]
+    
+    first_stage = DecisionTreeClassifier(max_depth=CASCADE_MAX_DEPTH, random_state=RANDOM_STATE)
+    
+    # Calibrate on out-of-fold confidences so the threshold is not fitted to training leaves
+    cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+    oof = cross_val_predict(first_stage, X_train_scaled[:, indices], y_train, cv=cv, method='predict_proba')
+    threshold = calibrate_threshold(oof.max(axis=1), oof.argmax(axis=1) == y_train, CASCADE_TARGET_ACCURACY)
+    first_stage.fit(X_train_scaled[:, indices], y_train)
+    
+    # Evaluate on the held-out test set
+    full_pred = model.predict(X_test_scaled)
+    first_proba = first_stage.predict_proba(X_test_scaled[:, indices])
+    confident = first_proba.max(axis=1) >= threshold
+    cascade_pred = np.where(confident, first_proba.argmax(axis=1), full_pred)
+    full_acc = accuracy_score(y_test, full_pred)
+    cascade_acc = accuracy_score(y_test, cascade_pred)
+    
+    def full_predict(rows):
+        model.predict(rows)
+        model.predict_proba(rows)
+    
+    def cascade_predict(rows):
+        if first_stage.predict_proba(rows[:, indices]).max() < threshold:
+            model.predict_proba(rows)
+    
+    metrics = {
+        'threshold': threshold,
+        'escalation_rate': float(1 - confident.mean()),
+        'full_accuracy': float(full_acc),
+        'cascade_accuracy': float(cascade_acc),
+        'accuracy_loss': float(full_acc - cascade_acc),
+        'full_latency_ms': mean_latency_ms(full_predict, X_test_scaled),
+        'cascade_latency_ms': mean_latency_ms(cascade_predict, X_test_scaled)
+    }
+    print(f"   Threshold: {threshold:.4f} (target accuracy {CASCADE_TARGET_ACCURACY})")
+    print(f"   Escalation rate: {metrics['escalation_rate']:.1%}")
+    print(f"   Accuracy: {cascade_acc:.4f} (full model {full_acc:.4f}, loss {metrics['accuracy_loss']:.4f})")
+    print(f"   Mean latency: {metrics['cascade_latency_ms']:.2f} ms (full model {metrics['full_latency_ms']:.2f} ms)")
+    
+    joblib.dump({
+        'model': first_stage,
+        'features': list(features),
+        'threshold': threshold,
+        'metrics': {**metrics, 'model_type': type(first_stage).__name__, 'max_depth': CASCADE_MAX_DEPTH,
+                    'target_accuracy': CASCADE_TARGET_ACCURACY, 'trained_at': datetime.now().isoformat()}
+    }, 'cascade_model.pkl')
+    print("   ✓ cascade_model.pkl")
+
 def main():
     """Main training pipeline."""
     print("=" * 60)
@@ -271,11 +366,25 @@ def main():
     # Load and preprocess data
     X, y, model_columns = load_and_preprocess_data(DATA_FILE)
     
+    # Refresh only the drift reference for the existing model artifacts
+    if '--drift-reference-only' in sys.argv:
+        save_drift_reference(X, y)
+        return
+    
+    # Retrain only the cascade first stage against the existing model artifacts
+    if '--cascade-only' in sys.argv:
+        metadata = joblib.load('model_metadata.pkl')
+        features = [row['feature'] for row in metadata['top_features']][:CASCADE_N_FEATURES]
+        train_cascade(X, y, joblib.load('battery_model.pkl'), joblib.load('scaler.pkl'), features)
+        return
+    
     # Train and evaluate
     model, label_encoder, scaler, accuracy, f1, feature_importance = train_and_evaluate_model(X, y)
     
     # Save artifacts
     save_model_artifacts(model, label_encoder, scaler, model_columns, accuracy, f1, feature_importance)
+    save_drift_reference(X, y)
+    train_cascade(X, y, model, scaler, feature_importance['feature'].head(CASCADE_N_FEATURES))
     
     print("\n" + "=" * 60)
     print(f"✅ Training complete! Final Accuracy: {accuracy:.2%}, F1: {f1:.2%}")
@@ -1,13 +1,32 @@
 # Importing Required Libraries
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
-from datetime import datetime
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import requests
+import click
+from response_cache import ResponseCache, cached_response
+from ml_features import convert_sensor_to_ml_format, convert_sensor_batch_to_ml_columns, columnar_payload, add_temporal_features
+from rolling_features import RollingFeatureEngine
+from buckets import BucketCollection
+from running_stats import STATS_FIELDS, aggregate_running_stats, format_running_stats, rebuild_running_stats, seed_running_stats
+from structured_log import Summary, configure as configure_logging, get_logger
+from profiling import RequestProfiler, db_listeners, phase
+from fast_json import FastJSONProvider, dumps as dumps_json
 
 # Standard Libraries
 import os
+import sys
+import importlib.util
+import logging
+import queue
+import threading
+import time
+from collections import deque
 
 # Load environment variables
 load_dotenv()
@@ -16,27 +35,140 @@ load_dotenv()
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'ev_battery_monitoring')
 COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'battery_sensors')
+STATS_COLLECTION_NAME = os.getenv('STATS_COLLECTION_NAME', 'battery_stats')
+# Must match sensor_server: 'documents' or 'buckets' (readings in COLLECTION_NAME_buckets)
+STORAGE_SCHEMA = os.getenv('STORAGE_SCHEMA', 'documents')
+# Must match sensor_server; under 'ttl' the stats document counts expired readings too
+RETENTION_MODE = os.getenv('RETENTION_MODE', 'off')
 ML_SERVER_URL = os.getenv('ML_SERVER_URL', 'http://localhost:8000')
+# 'http' calls ML_SERVER_URL; 'embedded' loads ml_server's model in-process (single node)
+ML_MODE = os.getenv('ML_MODE', 'http')
+ML_SERVER_DIR = os.getenv('ML_SERVER_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'ml_server'))
 PORT = int(os.getenv('PORT', 5000))
 CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+# Latest-state tailer: auto (change stream, else polling), change_stream, poll or off
+LATEST_TAILER = os.getenv('LATEST_TAILER', 'auto')
+# Seconds between _id-watermark polls when not using a change stream
+TAILER_POLL_INTERVAL = float(os.getenv('TAILER_POLL_INTERVAL', 1))
+# Minimum seconds between pushed ML predictions
+STREAM_PREDICT_INTERVAL = float(os.getenv('STREAM_PREDICT_INTERVAL', 10))
+# Seconds of silence before a keep-alive comment is sent to each client
+STREAM_KEEPALIVE = float(os.getenv('STREAM_KEEPALIVE', 15))
+# Upper bound for ?limit= on /data
+DATA_MAX_LIMIT = int(os.getenv('DATA_MAX_LIMIT', 1000))
+# Response cache TTLs in seconds per endpoint (0 disables caching for it)
+CACHE_TTL_DATA = float(os.getenv('CACHE_TTL_DATA', 2))
+CACHE_TTL_LATEST = float(os.getenv('CACHE_TTL_LATEST', 1))
+CACHE_TTL_STATS = float(os.getenv('CACHE_TTL_STATS', 5))
+CACHE_TTL_PREDICT = float(os.getenv('CACHE_TTL_PREDICT', 5))
+CACHE_TTL_HISTORY = float(os.getenv('CACHE_TTL_HISTORY', 10))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+# Largest number of buckets a single /data/history request may span
+HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', 2000))
+# Rolling feature windows in seconds per signal
+ROLLING_WINDOW_CORE_TEMP = float(os.getenv('ROLLING_WINDOW_CORE_TEMP', 60))
+ROLLING_WINDOW_VOLTAGE = float(os.getenv('ROLLING_WINDOW_VOLTAGE', 30))
+ROLLING_WINDOW_CURRENT = float(os.getenv('ROLLING_WINDOW_CURRENT', 30))
+# Most recent readings replayed into the windows when the tailer starts
+ROLLING_BACKFILL_LIMIT = int(os.getenv('ROLLING_BACKFILL_LIMIT', 50000))
+# Add the rolling features to the ML input sent by /ml/predict and /stream
+ROLLING_FEATURES_TO_MODEL = os.getenv(
+    'ROLLING_FEATURES_TO_MODEL', 'false').lower() == 'true'
+# Score every new reading in a background thread of this process
+SCORING_WORKER = os.getenv('SCORING_WORKER', 'false').lower() == 'true'
+SCORING_BATCH_SIZE = int(os.getenv('SCORING_BATCH_SIZE', 200))
+SCORING_POLL_INTERVAL = float(os.getenv('SCORING_POLL_INTERVAL', 1))
+PREDICTIONS_COLLECTION_NAME = os.getenv(
+    'PREDICTIONS_COLLECTION_NAME', 'battery_predictions')
+ALERTS_COLLECTION_NAME = os.getenv('ALERTS_COLLECTION_NAME', 'battery_alerts')
+# get_solution() severities that raise an alert
+ALERT_SEVERITIES = [severity.strip().upper() for severity in os.getenv(
+    'ALERT_SEVERITIES', 'CRITICAL,HIGH').split(',') if severity.strip()]
+# Repeat alerts for a sensor at the same or lower severity are suppressed this long
+ALERT_DEDUP_SECONDS = float(os.getenv('ALERT_DEDUP_SECONDS', 300))
+# Optional URL each alert is POSTed to as JSON
+ALERT_WEBHOOK_URL = os.getenv('ALERT_WEBHOOK_URL', '')
+# Log level and format ('text' key=value lines or 'json')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# Seconds between summary lines (requests/s, errors, readings tailed); 0 disables them
+LOG_SUMMARY_INTERVAL = float(os.getenv('LOG_SUMMARY_INTERVAL', 60))
+# Server-Timing headers on every response, and profiles of selected requests
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+# Fraction of requests profiled at random; requests with the X-Profile header always are
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+# Required X-Profile header value when set
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+# 'sample' (collapsed stacks for flame graphs) or 'cprofile' (pstats files)
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sample')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Oldest profiles beyond this many are deleted
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+
+# Log records (including werkzeug's access log) are written to stdout by a background thread
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = get_logger('root')
+summary = Summary(log, LOG_SUMMARY_INTERVAL)
 
 # Flask App
 app = Flask(__name__)
+# orjson-backed jsonify that encodes ObjectId and datetime values itself
+app.json = FastJSONProvider(app)
 CORS(app, origins=CORS_ORIGINS)
 
+# Installed only when enabled, so disabled profiling adds nothing to a request
+profiler = RequestProfiler(PROFILE_DIR, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_TOKEN,
+                           interval_ms=PROFILE_INTERVAL_MS, max_files=PROFILE_MAX_FILES)
+if PROFILING_ENABLED:
+    profiler.init_app(app)
+
+# Shared response cache for read endpoints hit by many dashboards at once
+response_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES)
+
 # Global MongoDB Connection with timeout
 try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000,
+                         event_listeners=db_listeners(PROFILING_ENABLED))
     db = client[DATABASE_NAME]
-    sensor_collection = db[COLLECTION_NAME]
+    # Bucketed readings are read through a view that unpacks them into reading documents
+    sensor_collection = BucketCollection(db[f'{COLLECTION_NAME}_buckets']) \
+        if STORAGE_SCHEMA == 'buckets' else db[COLLECTION_NAME]
+    running_stats_collection = db[STATS_COLLECTION_NAME]
+    # Background scorer output: one prediction per reading (same _id) and raised alerts
+    predictions_collection = db[PREDICTIONS_COLLECTION_NAME]
+    alerts_collection = db[ALERTS_COLLECTION_NAME]
+    # Pre-aggregated rollups maintained by sensor_server, one per bucket size
+    rollup_collections = {
+        bucket: db[f'{COLLECTION_NAME}_rollup_{bucket}']
+        for bucket in ('1m', '1h', '1d')
+    }
     # Test connection
     client.server_info()
-    print("✓ MongoDB connection successful!")
+    log.info('mongodb.connected', database=DATABASE_NAME, collection=COLLECTION_NAME)
+    if STORAGE_SCHEMA == 'buckets':
+        sensor_collection.ensure_indexes()
+    else:
+        # Keyset pagination index for /data since/before cursors
+        sensor_collection.create_index([('timestamp', -1), ('_id', -1)])
+    alerts_collection.create_index([('raised_at', -1)])
 except Exception as e:
-    print(f"✗ MongoDB connection failed: {e}")
+    log.error('mongodb.connection_failed', error=str(e))
     raise
 
 
+@app.after_request
+def count_request(response):
+    """Request and server error counts for the periodic log summary"""
+    # Started on first use, like the tailer, so importing the app starts no threads
+    summary.start()
+    summary.count('requests')
+    if response.status_code >= 500:
+        summary.count('server_errors')
+    return response
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Serve the main HTML page"""
@@ -49,26 +181,115 @@ def test():
     return render_template('test_ml.html')
 
 
+def reading_cursor(item):
+    """Keyset cursor '<timestamp>,<_id>' for a reading"""
+    timestamp = item.get('timestamp')
+    return f"{timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp},{item.get('_id')}"
+
+
+def parse_timestamp(value):
+    """Parse an ISO timestamp into a naive UTC datetime, as stored; an offset is converted"""
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def parse_cursor(cursor):
+    """Parse a '<timestamp>,<_id>' cursor into (datetime, ObjectId)"""
+    try:
+        timestamp, object_id = cursor.rsplit(',', 1)
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except (ValueError, InvalidId, TypeError):
+        raise ValueError(
+            f"Invalid cursor '{cursor}', expected '<ISO timestamp>,<_id>'")
+
+
+def keyset_filter(cursor, direction):
+    """Match readings strictly after ('$gt') or before ('$lt') a cursor on (timestamp, _id)"""
+    timestamp, object_id = parse_cursor(cursor)
+    return {'$or': [
+        {'timestamp': {direction: timestamp}},
+        {'timestamp': timestamp, '_id': {direction: object_id}}
+    ]}
+
+
 @app.route('/data', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_DATA)
 def get_sensor_data():
     """
-    Fetch all sensor data posted by sensor_server
-    Returns latest 100 records by default
+    Fetch sensor data posted by sensor_server, newest first.
+    Returns latest 100 records by default.
+
+    Query parameters:
+        since  - cursor '<timestamp>,<_id>'; only readings newer than it
+        before - cursor '<timestamp>,<_id>'; readings older than it (history)
+        limit  - number of readings (default 100, max DATA_MAX_LIMIT)
+        fields - comma-separated fields to return (_id and timestamp always included)
     """
     try:
-        # Fetch latest 100 sensor readings from MongoDB - 100 at a time and keeps on updating with latest data
-        data = list(sensor_collection.find().sort('timestamp', -1).limit(100))
+        since = request.args.get('since')
+        before = request.args.get('before')
+        limit = request.args.get('limit', '100')
+        fields = request.args.get('fields')
 
-        # Convert ObjectId to string and format timestamps
-        for item in data:
-            item['_id'] = str(item['_id'])
-            if 'timestamp' in item and isinstance(item['timestamp'], datetime):
-                item['timestamp'] = item['timestamp'].isoformat()
+        if since and before:
+            return jsonify({
+                'success': False,
+                'error': "Use either 'since' or 'before', not both"
+            }), 400
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': "'limit' must be an integer"
+            }), 400
+        if limit < 1 or limit > DATA_MAX_LIMIT:
+            return jsonify({
+                'success': False,
+                'error': f"'limit' must be between 1 and {DATA_MAX_LIMIT}"
+            }), 400
+
+        projection = None
+        if fields:
+            projection = {name.strip(): 1 for name in fields.split(',') if name.strip()}
+            projection['timestamp'] = 1
+
+        try:
+            if since:
+                # Oldest-first from the cursor so a truncated page never skips readings
+                query = keyset_filter(since, '$gt')
+                order = 1
+            elif before:
+                query = keyset_filter(before, '$lt')
+                order = -1
+            else:
+                query = {}
+                order = -1
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        # Fetch one extra document to know whether another page exists
+        data = list(sensor_collection.find(query, projection).sort(
+            [('timestamp', order), ('_id', order)]).limit(limit + 1))
+        has_more = len(data) > limit
+        data = data[:limit]
+        if order == 1:
+            data.reverse()
 
         return jsonify({
             'success': True,
             'count': len(data),
-            'data': data
+            'data': data,
+            'has_more': has_more,
+            'cursors': {
+                'since': reading_cursor(data[0]) if data else since,
+                'before': reading_cursor(data[-1]) if data else before
+            }
         }), 200
 
     except Exception as e:
@@ -78,17 +299,226 @@ def get_sensor_data():
         }), 500
 
 
+class LatestStateTailer:
+    """
+    Background tailer keeping the latest reading per (sensor_id, battery_location)
+    in memory. Follows inserts with a change stream when the deployment
+    supports one, otherwise polls by _id watermark. Listeners are called
+    with each batch of new readings (the /stream broadcaster is one).
+    """
+
+    def __init__(self, mode, poll_interval, batch_size=1000):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.latest = {}
+        self.newest = None
+        self.last_id = None
+        self.listeners = []
+        self.bootstrap_hooks = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.ready = threading.Event()
+        self.active_mode = None
+        self.readings_applied = 0
+        self.lag_seconds = None
+        self.last_poll_at = None
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def start(self):
+        """Start the tailer thread once; safe to call from every request"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def add_listener(self, listener):
+        with self.lock:
+            if listener not in self.listeners:
+                self.listeners.append(listener)
+
+    def add_bootstrap_hook(self, hook):
+        """
+        Call hook(last_id) on the tailer thread after the initial snapshot,
+        before any listener sees a reading newer than last_id
+        """
+        with self.lock:
+            if hook not in self.bootstrap_hooks:
+                self.bootstrap_hooks.append(hook)
+
+    def wait_ready(self, timeout=5):
+        """Start if needed and wait for the initial snapshot; False means use MongoDB directly"""
+        if not self.enabled:
+            return False
+        self.start()
+        return self.ready.wait(timeout)
+
+    def get_latest(self):
+        """Copy of the newest reading across all sensors"""
+        with self.lock:
+            return dict(self.newest) if self.newest else None
+
+    def get_all(self):
+        """Copies of the latest reading for every (sensor_id, battery_location)"""
+        with self.lock:
+            readings = [dict(reading) for reading in self.latest.values()]
+        return sorted(readings, key=lambda r: (str(r.get('sensor_id')), str(r.get('battery_location'))))
+
+    def metrics(self):
+        """Tailer state for /status and /data/latest/all"""
+        with self.lock:
+            return {
+                'mode': self.active_mode or self.mode,
+                'ready': self.ready.is_set(),
+                'sensors_tracked': len(self.latest),
+                'readings_applied': self.readings_applied,
+                'lag_seconds': round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+                'seconds_since_poll': round(time.monotonic() - self.last_poll_at, 3) if self.last_poll_at else None
+            }
+
+    def _apply(self, readings):
+        """Fold new readings into the in-memory map and notify listeners"""
+        if not readings:
+            return
+        with self.lock:
+            for reading in readings:
+                key = (reading.get('sensor_id'), reading.get('battery_location'))
+                current = self.latest.get(key)
+                timestamp = reading.get('timestamp')
+                if current is None or (isinstance(timestamp, datetime) and timestamp >= current.get('timestamp', timestamp)):
+                    self.latest[key] = reading
+                if self.newest is None or (isinstance(timestamp, datetime) and timestamp >= self.newest.get('timestamp', timestamp)):
+                    self.newest = reading
+            self.readings_applied += len(readings)
+            summary.count('tailed', len(readings))
+            newest_timestamp = self.newest.get('timestamp') if self.newest else None
+            if isinstance(newest_timestamp, datetime):
+                self.lag_seconds = max(
+                    0.0, (datetime.utcnow() - newest_timestamp).total_seconds())
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            try:
+                listener([dict(reading) for reading in readings])
+            except Exception as e:
+                log.limited(logging.ERROR, 'tailer.listener_failed', error=str(e))
+
+    def _bootstrap(self):
+        """Load the latest reading per sensor and set the _id watermark"""
+        newest = sensor_collection.find_one(sort=[('_id', -1)])
+        self.last_id = newest['_id'] if newest else None
+
+        snapshot = sensor_collection.aggregate([
+            {'$sort': {'timestamp': -1}},
+            {'$group': {
+                '_id': {'sensor_id': '$sensor_id', 'battery_location': '$battery_location'},
+                'reading': {'$first': '$$ROOT'}
+            }}
+        ], allowDiskUse=True)
+        with self.lock:
+            for row in snapshot:
+                reading = row['reading']
+                self.latest[(reading.get('sensor_id'), reading.get('battery_location'))] = reading
+            dated = [r for r in self.latest.values() if isinstance(r.get('timestamp'), datetime)]
+            if dated:
+                self.newest = max(dated, key=lambda r: r['timestamp'])
+            self.last_poll_at = time.monotonic()
+            hooks = list(self.bootstrap_hooks)
+
+        for hook in hooks:
+            try:
+                hook(self.last_id)
+            except Exception as e:
+                log.error('tailer.bootstrap_hook_failed', error=str(e))
+        self.ready.set()
+
+    def _poll_once(self):
+        """Apply readings inserted after the _id watermark"""
+        query = {'_id': {'$gt': self.last_id}} if self.last_id is not None else {}
+        readings = list(sensor_collection.find(query).sort(
+            '_id', 1).limit(self.batch_size))
+        self.last_poll_at = time.monotonic()
+        if readings:
+            self.last_id = readings[-1]['_id']
+            self._apply(readings)
+        return len(readings)
+
+    def _follow_change_stream(self, changes):
+        """Apply inserts from an open change stream that are newer than the _id watermark"""
+        with changes:
+            self.active_mode = 'change_stream'
+            while changes.alive:
+                change = changes.try_next()
+                self.last_poll_at = time.monotonic()
+                if change is None:
+                    continue
+                # The stream opened before the snapshot, which may already hold this reading
+                if self.last_id is not None and change['documentKey']['_id'] <= self.last_id:
+                    continue
+                self.last_id = change['documentKey']['_id']
+                self._apply([change['fullDocument']])
+
+    def _run(self):
+        changes = None
+        if self.mode in ('auto', 'change_stream'):
+            # Opened before the snapshot so that inserts made while it loads are not missed
+            try:
+                changes = sensor_collection.watch([{'$match': {'operationType': 'insert'}}])
+            except (OperationFailure, NotImplementedError) as e:
+                log.warning('tailer.change_stream_unavailable', fallback='poll', error=str(e))
+            except Exception as e:
+                log.error('tailer.change_stream_failed', fallback='poll', error=str(e))
+
+        while not self.ready.is_set():
+            try:
+                self._bootstrap()
+            except Exception as e:
+                log.limited(logging.ERROR, 'tailer.bootstrap_failed', error=str(e))
+                time.sleep(self.poll_interval)
+
+        if changes is not None:
+            try:
+                self._follow_change_stream(changes)
+            except OperationFailure as e:
+                log.warning('tailer.change_stream_unavailable', fallback='poll', error=str(e))
+            except Exception as e:
+                log.error('tailer.change_stream_failed', fallback='poll', error=str(e))
+
+        # Polling also catches up on anything the change stream missed
+        self.active_mode = 'poll'
+        while True:
+            try:
+                # Drain a backlog without sleeping between full batches
+                if self._poll_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                log.limited(logging.ERROR, 'tailer.poll_failed', error=str(e))
+            time.sleep(self.poll_interval)
+
+
+latest_tailer = LatestStateTailer(LATEST_TAILER, TAILER_POLL_INTERVAL)
+
+
+def find_latest_reading():
+    """Newest reading from the tailer's memory, or MongoDB if the tailer is off or not ready"""
+    if latest_tailer.wait_ready():
+        return latest_tailer.get_latest()
+    return sensor_collection.find_one(sort=[('timestamp', -1)])
+
+
 @app.route('/data/latest', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_LATEST)
 def get_latest_data():
     """Fetch the most recent sensor reading"""
     try:
-        latest = sensor_collection.find_one(sort=[('timestamp', -1)])
+        latest = find_latest_reading()
 
         if latest:
-            latest['_id'] = str(latest['_id'])
-            if 'timestamp' in latest and isinstance(latest['timestamp'], datetime):
-                latest['timestamp'] = latest['timestamp'].isoformat()
-
             return jsonify({
                 'success': True,
                 'data': latest
@@ -106,74 +536,279 @@ def get_latest_data():
         }), 500
 
 
+@app.route('/data/latest/all', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_LATEST)
+def get_latest_all():
+    """Fetch the latest reading of every sensor / battery location"""
+    try:
+        if latest_tailer.wait_ready():
+            readings = latest_tailer.get_all()
+        else:
+            readings = [row['reading'] for row in sensor_collection.aggregate([
+                {'$sort': {'timestamp': -1}},
+                {'$group': {
+                    '_id': {'sensor_id': '$sensor_id', 'battery_location': '$battery_location'},
+                    'reading': {'$first': '$$ROOT'}
+                }},
+                {'$sort': {'_id.sensor_id': 1, '_id.battery_location': 1}}
+            ], allowDiskUse=True)]
+
+        sensor_id = request.args.get('sensor_id')
+        if sensor_id:
+            readings = [r for r in readings if r.get('sensor_id') == sensor_id]
+
+        return jsonify({
+            'success': True,
+            'count': len(readings),
+            'data': readings,
+            'tailer': latest_tailer.metrics()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# Per-sensor rolling windows fed by the latest-state tailer
+rolling_features = RollingFeatureEngine({
+    'core_temp': ROLLING_WINDOW_CORE_TEMP,
+    'voltage': ROLLING_WINDOW_VOLTAGE,
+    'current': ROLLING_WINDOW_CURRENT
+})
+
+
+def backfill_rolling_features(last_id):
+    """Replay the readings still inside the longest window, up to the tailer's watermark"""
+    if last_id is None:
+        return
+    newest = sensor_collection.find_one({'_id': {'$lte': last_id}}, sort=[('timestamp', -1)])
+    if not newest or not isinstance(newest.get('timestamp'), datetime):
+        return
+    window = max(rolling_features.windows.values())
+    readings = list(sensor_collection.find(
+        {'_id': {'$lte': last_id},
+         'timestamp': {'$gte': newest['timestamp'] - timedelta(seconds=window)}},
+        {'sensor_id': 1, 'timestamp': 1, 'core_temp': 1, 'voltage': 1, 'current': 1}
+    ).sort('timestamp', -1).limit(ROLLING_BACKFILL_LIMIT))
+    readings.reverse()
+    rolling_features.update_many(readings)
+    log.info('rolling_features.backfilled', readings=len(readings))
+
+
+latest_tailer.add_bootstrap_hook(backfill_rolling_features)
+latest_tailer.add_listener(rolling_features.update_many)
+
+
+@app.route('/data/features', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_LATEST)
+def get_rolling_features():
+    """Rolling temporal risk features per sensor (?sensor_id=)"""
+    if not latest_tailer.wait_ready():
+        return jsonify({
+            'success': False,
+            'message': 'Rolling features need the latest-state tailer (LATEST_TAILER is off or not ready)'
+        }), 503
+
+    sensor_id = request.args.get('sensor_id')
+    if sensor_id:
+        features = rolling_features.get(sensor_id)
+        if features is None:
+            return jsonify({
+                'success': False,
+                'message': f"No readings for sensor '{sensor_id}'"
+            }), 404
+        sensors = {sensor_id: features}
+    else:
+        sensors = rolling_features.snapshot()
+
+    for features in sensors.values():
+        if isinstance(features['last_timestamp'], datetime):
+            features['last_timestamp'] = features['last_timestamp'].isoformat()
+
+    return jsonify({
+        'success': True,
+        'count': len(sensors),
+        'windows_seconds': rolling_features.windows,
+        'sensors': sensors
+    }), 200
+
+
 @app.route('/data/stats', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_STATS)
 def get_stats():
-    """Get statistics about the sensor data"""
+    """
+    Get statistics about the sensor data.
+    Served from the running stats document the sensor server maintains
+    on every insert; seeded with a full aggregation if it is missing.
+    """
     try:
-        total_count = sensor_collection.count_documents({})
+        document = seed_running_stats(running_stats_collection, sensor_collection, COLLECTION_NAME)
 
-        if total_count == 0:
+        return jsonify({
+            'success': True,
+            'stats': format_running_stats(document)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.cli.command('reconcile-stats')
+@click.option('--verify', is_flag=True,
+              help='Only compare the stored document against a full aggregation.')
+def reconcile_stats_command(verify):
+    """Rebuild (or verify) the materialized /data/stats document."""
+    stored = running_stats_collection.find_one({'_id': COLLECTION_NAME})
+    expected = format_running_stats(aggregate_running_stats(sensor_collection, COLLECTION_NAME))
+
+    if verify:
+        actual = format_running_stats(stored or {})
+        mismatches = {
+            key: (actual.get(key), value)
+            for key, value in expected.items()
+            if actual.get(key) != value
+        }
+        if RETENTION_MODE == 'ttl':
+            # A TTL index deletes readings without the stats document seeing it:
+            # it is all-time ingested, so only its count bound and newest reading are checked
+            mismatches = {key: values for key, values in mismatches.items() if key == 'last_reading'}
+            if actual['total_records'] < expected['total_records']:
+                mismatches['total_records'] = (actual['total_records'], expected['total_records'])
+            click.echo(f"RETENTION_MODE=ttl: stored counts are all-time ingested, "
+                       f"{actual['total_records'] - expected['total_records']} of them since expired")
+        if mismatches:
+            for key, (got, want) in mismatches.items():
+                click.echo(f"✗ {key}: stored={got} aggregated={want}")
+            raise SystemExit(1)
+        click.echo(
+            f"✓ Running stats match full aggregation ({expected['total_records']} records)")
+        return
+
+    rebuild_running_stats(running_stats_collection, sensor_collection, COLLECTION_NAME)
+    click.echo(
+        f"✓ Running stats rebuilt from {expected['total_records']} records")
+
+
+# Bucket sizes served by /data/history and the default span for each
+HISTORY_BUCKETS = {
+    '1m': {'size': timedelta(minutes=1), 'default_span': timedelta(hours=6), 'unit': 'minute'},
+    '1h': {'size': timedelta(hours=1), 'default_span': timedelta(days=7), 'unit': 'hour'},
+    '1d': {'size': timedelta(days=1), 'default_span': timedelta(days=90), 'unit': 'day'}
+}
+
+
+def format_rollup_point(document):
+    """Shape a rollup document into a /data/history point with min/max/avg per metric"""
+    point = {
+        'timestamp': document['start'].isoformat(),
+        'count': document.get('count', 0)
+    }
+    fields = document.get('fields', {})
+    for field in STATS_FIELDS:
+        totals = fields.get(field)
+        if not totals or not totals.get('n'):
+            continue
+        point[field] = {
+            'avg': round(totals['sum'] / totals['n'], 2),
+            'min': totals.get('min'),
+            'max': totals.get('max')
+        }
+    return point
+
+
+@app.route('/data/history', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_HISTORY)
+def get_history():
+    """
+    Time-bucketed history served from the pre-aggregated rollup collections.
+
+    Query parameters:
+        bucket    - 1m, 1h or 1d (default 1h)
+        sensor_id - restrict to one sensor; omitted merges all sensors
+        from, to  - ISO timestamps (default: bucket-specific span ending now)
+    """
+    try:
+        bucket = request.args.get('bucket', '1h')
+        sensor_id = request.args.get('sensor_id')
+
+        if bucket not in HISTORY_BUCKETS:
             return jsonify({
-                'success': True,
-                'stats': {
-                    'total_records': 0,
-                    'avg_voltage': 0,
-                    'avg_current': 0,
-                    'avg_temperature': 0,
-                    'avg_core_temp': 0,
-                    'avg_surface_temp': 0,
-                    'avg_soc': 0,
-                    'avg_humidity': 0,
-                    'avg_heat_index': 0,
-                    'avg_ambient_temp': 0,
-                    'first_reading': None,
-                    'last_reading': None
-                }
-            }), 200
+                'success': False,
+                'error': f"'bucket' must be one of {', '.join(HISTORY_BUCKETS)}"
+            }), 400
+
+        try:
+            end = parse_timestamp(request.args['to']) if request.args.get(
+                'to') else datetime.utcnow()
+            start = parse_timestamp(request.args['from']) if request.args.get(
+                'from') else end - HISTORY_BUCKETS[bucket]['default_span']
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid timestamp: {e}'
+            }), 400
+
+        if start >= end:
+            return jsonify({
+                'success': False,
+                'error': "'from' must be earlier than 'to'"
+            }), 400
+        if (end - start) / HISTORY_BUCKETS[bucket]['size'] > HISTORY_MAX_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f'Range spans more than {HISTORY_MAX_POINTS} {bucket} buckets; use a larger bucket'
+            }), 400
 
-        # Get first and last readings
-        first = sensor_collection.find_one(sort=[('timestamp', 1)])
-        last = sensor_collection.find_one(sort=[('timestamp', -1)])
-
-        # Calculate averages using aggregation
-        pipeline = [
-            {
-                '$group': {
-                    '_id': None,
-                    'avg_voltage': {'$avg': '$voltage'},
-                    'avg_current': {'$avg': '$current'},
-                    'avg_temp': {'$avg': '$temperature'},
-                    'avg_core_temp': {'$avg': '$core_temp'},
-                    'avg_surface_temp': {'$avg': '$surface_temp'},
-                    'avg_soc': {'$avg': '$soc'},
-                    'avg_humidity': {'$avg': '$humidity'},
-                    'avg_heat_index': {'$avg': '$heat_index'},
-                    'avg_ambient_temp': {'$avg': '$ambient_temp'}
+        rollup_collection = rollup_collections[bucket]
+        match = {'start': {'$gte': start, '$lt': end}}
+
+        if sensor_id:
+            match['sensor_id'] = sensor_id
+            documents = rollup_collection.find(match).sort('start', 1)
+        else:
+            # Merge every sensor's bucket into one point per bucket start
+            group = {'_id': '$start', 'count': {'$sum': '$count'}}
+            for field in STATS_FIELDS:
+                group[f'{field}__n'] = {'$sum': f'$fields.{field}.n'}
+                group[f'{field}__sum'] = {'$sum': f'$fields.{field}.sum'}
+                group[f'{field}__min'] = {'$min': f'$fields.{field}.min'}
+                group[f'{field}__max'] = {'$max': f'$fields.{field}.max'}
+            documents = [
+                {
+                    'start': row['_id'],
+                    'count': row['count'],
+                    'fields': {
+                        field: {
+                            'n': row[f'{field}__n'],
+                            'sum': row[f'{field}__sum'],
+                            'min': row[f'{field}__min'],
+                            'max': row[f'{field}__max']
+                        }
+                        for field in STATS_FIELDS
+                    }
                 }
-            }
-        ]
-
-        aggregation_result = list(sensor_collection.aggregate(pipeline))
-        averages = aggregation_result[0] if aggregation_result else {}
-
-        stats = {
-            'total_records': total_count,
-            'avg_voltage': round(averages.get('avg_voltage', 0), 2),
-            'avg_current': round(averages.get('avg_current', 0), 2),
-            'avg_temperature': round(averages.get('avg_temp', 0), 2),
-            'avg_core_temp': round(averages.get('avg_core_temp', 0), 2),
-            'avg_surface_temp': round(averages.get('avg_surface_temp', 0), 2),
-            'avg_soc': round(averages.get('avg_soc', 0), 2),
-            'avg_humidity': round(averages.get('avg_humidity', 0), 2),
-            'avg_heat_index': round(averages.get('avg_heat_index', 0), 2),
-            'avg_ambient_temp': round(averages.get('avg_ambient_temp', 0), 2),
-            'first_reading': first['timestamp'].isoformat() if first and 'timestamp' in first else None,
-            'last_reading': last['timestamp'].isoformat() if last and 'timestamp' in last else None
-        }
+                for row in rollup_collection.aggregate([
+                    {'$match': match},
+                    {'$group': group},
+                    {'$sort': {'_id': 1}}
+                ])
+            ]
+
+        points = [format_rollup_point(document) for document in documents]
 
         return jsonify({
             'success': True,
-            'stats': stats
+            'bucket': bucket,
+            'sensor_id': sensor_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'count': len(points),
+            'points': points
         }), 200
 
     except Exception as e:
@@ -183,6 +818,56 @@ def get_stats():
         }), 500
 
 
+@app.cli.command('rebuild-rollups')
+@click.option('--bucket', type=click.Choice(list(HISTORY_BUCKETS)), multiple=True,
+              help='Bucket size(s) to rebuild (default: all).')
+def rebuild_rollups_command(bucket):
+    """Recompute rollup collections from raw readings (requires MongoDB 5.0+)."""
+    for name in bucket or HISTORY_BUCKETS:
+        group = {
+            '_id': {
+                'sensor_id': '$sensor_id',
+                'start': {'$dateTrunc': {'date': '$timestamp', 'unit': HISTORY_BUCKETS[name]['unit']}}
+            },
+            'count': {'$sum': 1}
+        }
+        fields = {}
+        for field in STATS_FIELDS:
+            group[f'{field}__n'] = {
+                '$sum': {'$cond': [{'$isNumber': f'${field}'}, 1, 0]}}
+            group[f'{field}__sum'] = {'$sum': f'${field}'}
+            group[f'{field}__min'] = {'$min': f'${field}'}
+            group[f'{field}__max'] = {'$max': f'${field}'}
+            fields[field] = {
+                'n': f'${field}__n',
+                'sum': f'${field}__sum',
+                'min': f'${field}__min',
+                'max': f'${field}__max'
+            }
+
+        rollup_collections[name].delete_many({})
+        sensor_collection.aggregate([
+            {'$match': {'timestamp': {'$type': 'date'}}},
+            {'$group': group},
+            {'$project': {
+                '_id': 0,
+                'sensor_id': '$_id.sensor_id',
+                'start': '$_id.start',
+                'count': 1,
+                'fields': fields,
+                'updated_at': '$$NOW'
+            }},
+            {'$merge': {
+                'into': rollup_collections[name].name,
+                'on': ['sensor_id', 'start'],
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
+            }}
+        ])
+        click.echo(
+            f"✓ Rebuilt {rollup_collections[name].name} ({rollup_collections[name].count_documents({})} buckets)")
+
+
 @app.route('/status', methods=['GET'])
 def status():
     """Server status endpoint"""
@@ -199,84 +884,158 @@ def status():
         'database': {
             'status': db_status,
             'database': DATABASE_NAME,
-            'collection': COLLECTION_NAME
+            'collection': sensor_collection.name,
+            'schema': STORAGE_SCHEMA
         },
         'endpoints': {
             'GET /': 'Home page',
-            'GET /data': 'Fetch all sensor data (latest 100)',
+            'GET /data': 'Fetch sensor data (latest 100; ?since=, ?before=, ?limit=, ?fields=)',
             'GET /data/latest': 'Fetch latest sensor reading',
+            'GET /data/latest/all': 'Fetch latest reading of every sensor (?sensor_id=)',
             'GET /data/stats': 'Get statistics',
+            'GET /data/history': 'Bucketed min/max/avg history (?sensor_id=&from=&to=&bucket=1m|1h|1d)',
+            'GET /data/features': 'Rolling core-temp rise rate, voltage sag and current deviation per sensor (?sensor_id=)',
             'GET /ml/predict': 'Get ML prediction for latest data',
             'GET /ml/analyse': 'Analyze all MongoDB data with ML server (with ?limit=N)',
             'POST /ml/analyze': 'Analyze specific sensor data with ML',
             'GET /ml/batch-analyze': 'Batch analyze last 10 readings',
+            'GET /ml/alerts': 'Alerts raised by the background scoring worker (?limit=, ?sensor_id=)',
+            'GET /stream': 'Server-Sent Events push of new readings, stats and predictions',
             'GET /status': 'Server status'
-        }
+        },
+        'stream': {
+            'subscribers': len(broadcaster.subscribers),
+            'events_published': broadcaster.events_published
+        },
+        'ml': {
+            'mode': ML_MODE,
+            'server_url': ML_SERVER_URL if ML_MODE == 'http' else None
+        },
+        'cache': response_cache.stats(),
+        'tailer': latest_tailer.metrics(),
+        'rolling_features': {
+            'sensors': len(rolling_features.sensors),
+            'updates': rolling_features.updates,
+            'windows_seconds': rolling_features.windows,
+            'to_model': ROLLING_FEATURES_TO_MODEL
+        },
+        'scoring': scoring_worker.metrics(),
+        'profiling': profiler.metrics() if PROFILING_ENABLED else None
     })
 
 
-def convert_sensor_to_ml_format(sensor_data):
-    """Convert sensor data format to ML model input format"""
+embedded_ml = None
+embedded_ml_lock = threading.Lock()
+
+
+def get_embedded_ml():
+    """Load ml_server/app.py and its model artifacts into this process once"""
+    global embedded_ml
+    with embedded_ml_lock:
+        if embedded_ml is None:
+            # Appended, so modules both servers ship (structured_log, profiling, ...) stay root's copies
+            if os.path.abspath(ML_SERVER_DIR) not in sys.path:
+                sys.path.append(os.path.abspath(ML_SERVER_DIR))
+            spec = importlib.util.spec_from_file_location(
+                'embedded_ml_server', os.path.join(ML_SERVER_DIR, 'app.py'))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            embedded_ml = module
+            log.info('ml.embedded_loaded', directory=os.path.abspath(ML_SERVER_DIR))
+    return embedded_ml
+
+
+def ml_post(path, payload, timeout=5):
+    """
+    Send a request body to an ML server endpoint and return
+    (status_code, decoded body). In embedded mode the ml_server pipeline
+    is called in-process and produces the same body without the HTTP hop.
+    """
+    with phase('ml'):
+        if ML_MODE == 'embedded':
+            ml = get_embedded_ml()
+            handlers = {
+                '/api/predict': ml.predict_payload,
+                '/api/predict/batch': ml.predict_batch_payload
+            }
+            return 200, handlers[path](payload)
+
+        response = requests.post(
+            f'{ML_SERVER_URL}{path}', json=payload, timeout=timeout)
+        return response.status_code, response.json() if response.status_code == 200 else None
+
+
+if ML_MODE == 'embedded':
+    # Load model artifacts at startup rather than on the first prediction
+    get_embedded_ml()
+
+
+def predict_readings_batch(readings, timeout=10):
+    """
+    Score readings with one columnar call to the ML server's batch endpoint.
+    Returns one ML result dict per reading, in order.
+    """
+    payload = columnar_payload(convert_sensor_batch_to_ml_columns(readings))
+    status_code, ml_result = ml_post(
+        '/api/predict/batch', payload, timeout=timeout)
+    if status_code != 200:
+        raise ValueError(f'ML server returned HTTP {status_code}')
+    if ml_result.get('status') != 'success':
+        raise ValueError(ml_result.get('message', 'ML batch prediction failed'))
+    return ml_result['results']
+
+
+def sensor_context(reading):
+    """Subset of a reading shown next to its ML prediction"""
     return {
-        # Scale voltage
-        "PackVoltage_V": sensor_data.get('voltage', 3.7) * 100,
-        "MaxTemp_C": sensor_data.get('core_temp', 35),
-        "MinTemp_C": sensor_data.get('ambient_temp', 25),
-        "AmbientTemp_C": sensor_data.get('ambient_temp', 25),
-        # Scale current
-        "ChargeCurrent_A": sensor_data.get('current', 2.0) * 10,
-        "SOC_%": sensor_data.get('soc', 50),
-        "StateOfHealth_%": 95,  # Default value
-        "InternalResistance_mOhm": 50,  # Default value
-        "DemandVoltage_V": sensor_data.get('voltage', 3.7) * 100,
-        "DemandCurrent_A": sensor_data.get('current', 2.0) * 10,
-        "ChargePower_kW": (sensor_data.get('voltage', 3.7) * sensor_data.get('current', 2.0) * 100) / 1000,
-        "Humidity_%": sensor_data.get('humidity', 50),
-        "VibrationLevel_mg": 5,  # Default value
-        "MoistureDetected": 1 if sensor_data.get('humidity', 50) > 60 else 0,
-        "CoolingSystem": "Active"
+        'sensor_id': reading.get('sensor_id'),
+        'humidity': reading.get('humidity'),
+        'temperature': reading.get('temperature'),
+        'core_temp': reading.get('core_temp'),
+        'voltage': reading.get('voltage'),
+        'current': reading.get('current'),
+        'soc': reading.get('soc'),
+        'timestamp': reading.get('timestamp')
     }
 
 
-@app.route('/ml/predict', methods=['GET'])
-def get_ml_prediction():
-    """Get ML prediction for the latest sensor data"""
-    try:
-        # Fetch latest sensor reading
-        latest = sensor_collection.find_one(sort=[('timestamp', -1)])
+def temporal_summary(features):
+    """Rate-of-change features shown next to a prediction"""
+    if not features:
+        return None
+    return {name: features[name] for name in
+            ('core_temp_rise_rate', 'voltage_sag', 'current_deviation', 'window_readings')}
 
-        if not latest:
-            return jsonify({
-                'success': True,
-                'empty_database': True,
-                'message': 'Database is empty. Start the sensor server to generate data.',
-                'ml_prediction': None,
-                'sensor_data': None
-            }), 200
 
+def predict_latest_reading(latest):
+    """
+    Build the /ml/predict payload for a reading.
+    Returns (payload, status_code); shared by /ml/predict and /stream.
+    """
+    if not latest:
+        return {
+            'success': True,
+            'empty_database': True,
+            'message': 'Database is empty. Start the sensor server to generate data.',
+            'ml_prediction': None,
+            'sensor_data': None
+        }, 200
+
+    try:
         # Convert sensor data to ML format
         ml_input = convert_sensor_to_ml_format(latest)
+        temporal = rolling_features.get(latest.get('sensor_id'))
+        if ROLLING_FEATURES_TO_MODEL:
+            add_temporal_features(ml_input, temporal)
 
         # Call ML server for prediction
-        response = requests.post(
-            f'{ML_SERVER_URL}/api/predict', json=ml_input, timeout=5)
-
-        if response.status_code == 200:
-            ml_result = response.json()
+        status_code, ml_result = ml_post('/api/predict', ml_input, timeout=5)
 
+        if status_code == 200:
             # Format response to match frontend expectations
-            return jsonify({
+            return {
                 'success': True,
-                'sensor_data': {
-                    'sensor_id': latest.get('sensor_id'),
-                    'humidity': latest.get('humidity'),
-                    'temperature': latest.get('temperature'),
-                    'core_temp': latest.get('core_temp'),
-                    'voltage': latest.get('voltage'),
-                    'current': latest.get('current'),
-                    'soc': latest.get('soc'),
-                    'timestamp': latest.get('timestamp').isoformat() if isinstance(latest.get('timestamp'), datetime) else latest.get('timestamp')
-                },
+                'sensor_data': sensor_context(latest),
                 'ml_prediction': {
                     'prediction': ml_result.get('prediction'),
                     'solution': ml_result.get('solution'),
@@ -284,34 +1043,41 @@ def get_ml_prediction():
                     'reliability': ml_result.get('reliability'),
                     'probabilities': ml_result.get('probabilities', {}),
                     'model_accuracy': ml_result.get('model_accuracy', 0.84)
-                }
-            }), 200
+                },
+                'temporal_features': temporal_summary(temporal)
+            }, 200
         else:
-            return jsonify({
+            return {
                 'success': False,
                 'error': 'ML server returned error'
-            }), 500
+            }, 500
 
     except requests.exceptions.RequestException as e:
-        sensor_data = None
-        if latest:
-            sensor_data = {
-                'sensor_id': latest.get('sensor_id'),
-                'humidity': latest.get('humidity'),
-                'temperature': latest.get('temperature'),
-                'core_temp': latest.get('core_temp'),
-                'voltage': latest.get('voltage'),
-                'current': latest.get('current'),
-                'soc': latest.get('soc'),
-                'timestamp': latest.get('timestamp').isoformat() if isinstance(latest.get('timestamp'), datetime) else latest.get('timestamp')
-            }
-        return jsonify({
+        log.limited(logging.WARNING, 'ml.unreachable', error=str(e))
+        return {
             'success': True,
             'ml_server_error': True,
             'message': 'ML server is not running. Please start it on port 8000.',
             'ml_prediction': None,
-            'sensor_data': sensor_data
-        }), 200
+            'sensor_data': sensor_context(latest)
+        }, 200
+    except Exception as e:
+        return {
+            'success': True,
+            'error': True,
+            'message': f'Unexpected error: {str(e)}',
+            'ml_prediction': None,
+            'sensor_data': None
+        }, 200
+
+
+@app.route('/ml/predict', methods=['GET'])
+@cached_response(response_cache, CACHE_TTL_PREDICT)
+def get_ml_prediction():
+    """Get ML prediction for the latest sensor data"""
+    try:
+        # Fetch latest sensor reading
+        latest = find_latest_reading()
     except Exception as e:
         return jsonify({
             'success': True,
@@ -321,6 +1087,423 @@ def get_ml_prediction():
             'sensor_data': None
         }), 200
 
+    payload, status_code = predict_latest_reading(latest)
+    return jsonify(payload), status_code
+
+
+class ReadingBroadcaster:
+    """
+    Fans new readings from the shared latest-state tailer out to every
+    /stream client. Each event is encoded once and the same SSE frame is
+    queued to all subscribers.
+    """
+
+    def __init__(self, tailer, predict_interval, queue_size=100):
+        self.tailer = tailer
+        self.predict_interval = predict_interval
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.inbox = queue.Queue(maxsize=1000)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_prediction_at = 0
+        self.events_published = 0
+
+    def subscribe(self):
+        """Register a client and make sure the tailer and publisher are running"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.tailer.add_listener(self.on_readings)
+        self.tailer.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def on_readings(self, readings):
+        """Tailer listener; hands readings to the publisher thread without blocking"""
+        if not self.subscribers:
+            return
+        try:
+            self.inbox.put_nowait(readings)
+        except queue.Full:
+            pass
+
+    def publish(self, event, data):
+        """Encode an event once and fan it out; slow clients drop their oldest frame"""
+        message = f"event: {event}\ndata: {dumps_json(data).decode()}\n\n"
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+        self.events_published += 1
+
+    def _publish_readings(self, readings):
+        """Push a batch of new readings, then stats and (rate-limited) a prediction"""
+        latest = dict(max(readings, key=lambda r: r['_id']))
+
+        # Newest first, matching /data ordering
+        self.publish('readings', sorted(readings, key=lambda r: r['_id'], reverse=True)[:100])
+
+        document = running_stats_collection.find_one({'_id': COLLECTION_NAME})
+        if document is not None:
+            self.publish('stats', format_running_stats(document))
+
+        now = time.monotonic()
+        if now - self.last_prediction_at >= self.predict_interval:
+            self.last_prediction_at = now
+            payload, _ = predict_latest_reading(latest)
+            self.publish('prediction', payload)
+
+    def _run(self):
+        while True:
+            readings = self.inbox.get()
+            # Coalesce everything that queued up while we were publishing
+            while True:
+                try:
+                    readings = readings + self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._publish_readings(readings)
+            except Exception as e:
+                log.limited(logging.ERROR, 'stream.publish_failed', error=str(e))
+
+
+broadcaster = ReadingBroadcaster(latest_tailer, STREAM_PREDICT_INTERVAL)
+
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events channel for the dashboard.
+    Emits 'readings', 'stats', 'prediction' and scoring-worker 'alert' events.
+    """
+    subscriber = broadcaster.subscribe()
+
+    def events():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    yield subscriber.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+# get_solution() severities ordered for alert de-duplication
+SEVERITY_RANK = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CRITICAL': 4}
+
+
+def latency_percentiles(samples):
+    """p50/p95/p99/max in seconds of a sequence of latencies"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+    return {'p50': pct(50), 'p95': pct(95), 'p99': pct(99), 'max': round(ordered[-1], 3), 'samples': len(ordered)}
+
+
+class ScoringWorker:
+    """
+    Scores every new reading in micro-batches through the ML batch path.
+    Predictions are stored under the reading's _id, so the newest stored
+    prediction is the resume point and re-scoring a batch is harmless.
+    High-severity predictions raise alerts, de-duplicated per sensor, to
+    the alerts collection, /stream, an in-memory queue and an optional webhook.
+    """
+
+    def __init__(self, batch_size, poll_interval, severities, dedup_seconds, webhook_url,
+                 max_alerts=500, latency_samples=1000):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.severities = set(severities)
+        self.dedup_seconds = dedup_seconds
+        self.webhook_url = webhook_url
+        self.watermark = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.recent_alerts = deque(maxlen=max_alerts)
+        self.last_alert = {}
+        self.webhook_outbox = queue.Queue(maxsize=1000)
+        self.score_latency = deque(maxlen=latency_samples)
+        self.alert_latency = deque(maxlen=latency_samples)
+        self.last_batch_at = None
+        self.counters = {
+            'scored': 0,
+            'batches': 0,
+            'alerts': 0,
+            'alerts_suppressed': 0,
+            'ml_errors': 0,
+            'webhook_errors': 0,
+            'webhook_dropped': 0
+        }
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start the scoring thread (and the webhook sender) once"""
+        with self.lock:
+            if self.running:
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            if self.webhook_url:
+                threading.Thread(target=self._send_webhooks, daemon=True).start()
+
+    def on_readings(self, readings):
+        """Tailer listener: new readings are waiting, skip the poll sleep"""
+        self.wake.set()
+
+    def _newest_scored_id(self):
+        newest = predictions_collection.find_one(sort=[('_id', -1)], projection={'_id': 1})
+        return newest['_id'] if newest else None
+
+    def _resume_point(self):
+        """_id of the newest scored reading; a first run starts from the newest reading"""
+        scored = self._newest_scored_id()
+        if scored is not None:
+            return scored
+        newest = sensor_collection.find_one(sort=[('_id', -1)], projection={'_id': 1})
+        return newest['_id'] if newest else None
+
+    def score_once(self):
+        """Score the next micro-batch after the watermark; returns its size"""
+        query = {'_id': {'$gt': self.watermark}} if self.watermark is not None else {}
+        readings = list(sensor_collection.find(query).sort('_id', 1).limit(self.batch_size))
+        if not readings:
+            return 0
+
+        try:
+            results = predict_readings_batch(readings)
+        except Exception:
+            # Leave the watermark in place so the batch is retried
+            self.counters['ml_errors'] += 1
+            raise
+
+        now = datetime.utcnow()
+        predictions = []
+        for reading, result in zip(readings, results):
+            solution = result.get('solution') or {}
+            predictions.append({
+                '_id': reading['_id'],
+                'sensor_id': reading.get('sensor_id'),
+                'battery_location': reading.get('battery_location'),
+                'timestamp': reading.get('timestamp'),
+                'prediction': result.get('prediction'),
+                'severity': solution.get('severity'),
+                'confidence': result.get('confidence'),
+                'reliability': result.get('reliability'),
+                'probabilities': result.get('probabilities', {}),
+                'scored_at': now
+            })
+        try:
+            predictions_collection.insert_many(predictions, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate _ids mean another worker already stored those predictions
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+
+        for reading, prediction, result in zip(readings, predictions, results):
+            if isinstance(reading.get('timestamp'), datetime):
+                self.score_latency.append((now - reading['timestamp']).total_seconds())
+            if prediction['severity'] in self.severities:
+                self._alert(prediction, result, now)
+
+        self.watermark = readings[-1]['_id']
+        self.counters['scored'] += len(readings)
+        self.counters['batches'] += 1
+        summary.count('scored', len(readings))
+        self.last_batch_at = time.monotonic()
+        return len(readings)
+
+    def _alert(self, prediction, result, now):
+        """Raise an alert unless this sensor alerted at the same or higher severity recently"""
+        sensor_id = prediction['sensor_id']
+        rank = SEVERITY_RANK.get(prediction['severity'], 0)
+        previous = self.last_alert.get(sensor_id)
+        if previous and previous[0] >= rank and time.monotonic() - previous[1] < self.dedup_seconds:
+            self.counters['alerts_suppressed'] += 1
+            return
+        self.last_alert[sensor_id] = (rank, time.monotonic())
+
+        timestamp = prediction['timestamp']
+        latency = (now - timestamp).total_seconds() if isinstance(timestamp, datetime) else None
+        alert = {
+            'reading_id': prediction['_id'],
+            'sensor_id': sensor_id,
+            'battery_location': prediction['battery_location'],
+            'timestamp': timestamp,
+            'prediction': prediction['prediction'],
+            'severity': prediction['severity'],
+            'confidence': prediction['confidence'],
+            'action': (result.get('solution') or {}).get('action'),
+            'raised_at': now,
+            'latency_seconds': round(latency, 3) if latency is not None else None
+        }
+        alerts_collection.insert_one(dict(alert))
+        if latency is not None:
+            self.alert_latency.append(latency)
+        self.counters['alerts'] += 1
+
+        alert = serialize_alert(alert)
+        self.recent_alerts.append(alert)
+        broadcaster.publish('alert', alert)
+        if self.webhook_url:
+            try:
+                self.webhook_outbox.put_nowait(alert)
+            except queue.Full:
+                self.counters['webhook_dropped'] += 1
+        log.warning('alert.raised', severity=alert['severity'], sensor_id=sensor_id,
+                    prediction=alert['prediction'])
+
+    def _send_webhooks(self):
+        while True:
+            alert = self.webhook_outbox.get()
+            try:
+                requests.post(self.webhook_url, data=dumps_json(alert), timeout=5,
+                              headers={'Content-Type': 'application/json'}).raise_for_status()
+            except Exception as e:
+                self.counters['webhook_errors'] += 1
+                log.limited(logging.ERROR, 'alert.webhook_failed', error=str(e))
+
+    def backlog(self):
+        """
+        Readings inserted after the watermark while the worker thread runs,
+        else None: without a watermark the count would cover the whole collection
+        """
+        if not self.running or self.watermark is None:
+            return None
+        return sensor_collection.count_documents({'_id': {'$gt': self.watermark}})
+
+    def metrics(self):
+        """Scoring state for /status and /ml/alerts"""
+        try:
+            backlog = self.backlog()
+        except Exception:
+            backlog = None
+        return {
+            'running': self.running,
+            'backlog': backlog,
+            'seconds_since_batch': round(time.monotonic() - self.last_batch_at, 3) if self.last_batch_at else None,
+            'ingest_to_score_seconds': latency_percentiles(self.score_latency),
+            'ingest_to_alert_seconds': latency_percentiles(self.alert_latency),
+            'webhook_outbox': self.webhook_outbox.qsize() if self.webhook_url else None,
+            **self.counters
+        }
+
+    def _run(self):
+        while self.watermark is None:
+            try:
+                self.watermark = self._resume_point()
+                if self.watermark is None:
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                log.limited(logging.ERROR, 'scoring.start_failed', error=str(e))
+                time.sleep(self.poll_interval)
+        log.info('scoring.started', watermark=self.watermark)
+
+        while True:
+            try:
+                # Keep going without sleeping while a backlog drains
+                if self.score_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                log.limited(logging.ERROR, 'scoring.failed', error=str(e))
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+
+def serialize_alert(alert):
+    """Copy of an alert document without its _id"""
+    alert = dict(alert)
+    alert.pop('_id', None)
+    return alert
+
+
+scoring_worker = ScoringWorker(SCORING_BATCH_SIZE, SCORING_POLL_INTERVAL, ALERT_SEVERITIES,
+                               ALERT_DEDUP_SECONDS, ALERT_WEBHOOK_URL)
+
+if SCORING_WORKER:
+    latest_tailer.add_listener(scoring_worker.on_readings)
+
+
+def start_scoring_worker():
+    """Start the tailer and scoring worker in the serving process; safe to call repeatedly"""
+    if SCORING_WORKER and not scoring_worker.running:
+        latest_tailer.start()
+        scoring_worker.start()
+
+
+@app.before_request
+def start_scoring_worker_on_request():
+    """
+    Started on first use, like the tailer: importing the app (CLI commands,
+    score-readings, a reloader's parent) must not start a second worker with
+    its own alert de-duplication state
+    """
+    start_scoring_worker()
+
+
+@app.cli.command('score-readings')
+def score_readings_command():
+    """Run the background scoring worker in the foreground (dedicated process)"""
+    click.echo(f"✓ Scoring new readings in batches of {SCORING_BATCH_SIZE}")
+    scoring_worker._run()
+
+
+@app.route('/ml/alerts', methods=['GET'])
+def get_alerts():
+    """Recent alerts raised by the scoring worker (?limit=, ?sensor_id=) and its metrics"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), DATA_MAX_LIMIT)
+        query = {}
+        if request.args.get('sensor_id'):
+            query['sensor_id'] = request.args['sensor_id']
+        alerts = [serialize_alert(alert) for alert in
+                  alerts_collection.find(query).sort('raised_at', -1).limit(limit)]
+        return jsonify({
+            'success': True,
+            'count': len(alerts),
+            'alerts': alerts,
+            'scoring': scoring_worker.metrics()
+        }), 200
+
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be an integer'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 
 @app.route('/ml/analyze', methods=['POST'])
 def analyze_sensor_data():
@@ -338,11 +1521,9 @@ def analyze_sensor_data():
         ml_input = convert_sensor_to_ml_format(sensor_data)
 
         # Call ML server
-        response = requests.post(
-            f'{ML_SERVER_URL}/api/predict', json=ml_input, timeout=5)
+        status_code, ml_result = ml_post('/api/predict', ml_input, timeout=5)
 
-        if response.status_code == 200:
-            ml_result = response.json()
+        if status_code == 200:
             return jsonify({
                 'success': True,
                 'ml_prediction': ml_result
@@ -382,49 +1563,43 @@ def ml_analyse():
         total_confidence = 0
         failed_predictions = 0
 
-        for reading in readings:
-            ml_input = convert_sensor_to_ml_format(reading)
-
-            try:
-                # Post to ML server
-                response = requests.post(
-                    f'{ML_SERVER_URL}/api/predict', json=ml_input, timeout=10)
-
-                if response.status_code == 200:
-                    ml_result = response.json()
-                    prediction = ml_result.get('prediction')
-                    confidence = ml_result.get('confidence', 0)
-
-                    # Count prediction types
-                    predictions_count[prediction] = predictions_count.get(
-                        prediction, 0) + 1
-                    total_confidence += confidence
-
-                    results.append({
-                        'sensor_id': reading.get('sensor_id'),
-                        'timestamp': reading.get('timestamp').isoformat() if isinstance(reading.get('timestamp'), datetime) else reading.get('timestamp'),
-                        'sensor_data': {
-                            'temperature': reading.get('temperature'),
-                            'humidity': reading.get('humidity'),
-                            'core_temp': reading.get('core_temp'),
-                            'voltage': reading.get('voltage'),
-                            'current': reading.get('current'),
-                            'soc': reading.get('soc'),
-                            'battery_location': reading.get('battery_location')
-                        },
-                        'ml_analysis': {
-                            'prediction': prediction,
-                            'solution': ml_result.get('solution'),
-                            'confidence': confidence,
-                            'reliability': ml_result.get('reliability'),
-                            'probabilities': ml_result.get('probabilities', {})
-                        }
-                    })
-                else:
-                    failed_predictions += 1
-            except Exception as e:
-                failed_predictions += 1
-                continue
+        try:
+            # One columnar batch call to the ML server for all readings
+            ml_results = predict_readings_batch(readings, timeout=10)
+        except Exception as e:
+            log.limited(logging.ERROR, 'ml.analyse_failed', readings=len(readings), error=str(e))
+            ml_results = []
+            failed_predictions = len(readings)
+
+        for reading, ml_result in zip(readings, ml_results):
+            prediction = ml_result.get('prediction')
+            confidence = ml_result.get('confidence', 0)
+
+            # Count prediction types
+            predictions_count[prediction] = predictions_count.get(
+                prediction, 0) + 1
+            total_confidence += confidence
+
+            results.append({
+                'sensor_id': reading.get('sensor_id'),
+                'timestamp': reading.get('timestamp'),
+                'sensor_data': {
+                    'temperature': reading.get('temperature'),
+                    'humidity': reading.get('humidity'),
+                    'core_temp': reading.get('core_temp'),
+                    'voltage': reading.get('voltage'),
+                    'current': reading.get('current'),
+                    'soc': reading.get('soc'),
+                    'battery_location': reading.get('battery_location')
+                },
+                'ml_analysis': {
+                    'prediction': prediction,
+                    'solution': ml_result.get('solution'),
+                    'confidence': confidence,
+                    'reliability': ml_result.get('reliability'),
+                    'probabilities': ml_result.get('probabilities', {})
+                }
+            })
 
         # Calculate comprehensive statistics
         successful_predictions = len(results)
@@ -439,7 +1614,7 @@ def ml_analyse():
                 'total_records_fetched': len(readings),
                 'successful_predictions': successful_predictions,
                 'failed_predictions': failed_predictions,
-                'ml_server_url': ML_SERVER_URL
+                'ml_server_url': ML_SERVER_URL if ML_MODE == 'http' else 'embedded'
             },
             'statistics': {
                 'most_common_prediction': most_common_prediction,
@@ -477,33 +1652,31 @@ def batch_analyze():
         results = []
         predictions_count = {}
 
-        for reading in readings:
-            ml_input = convert_sensor_to_ml_format(reading)
-
-            try:
-                response = requests.post(
-                    f'{ML_SERVER_URL}/api/predict', json=ml_input, timeout=5)
-                if response.status_code == 200:
-                    ml_result = response.json()
-                    prediction = ml_result.get('prediction')
-
-                    # Count prediction types
-                    predictions_count[prediction] = predictions_count.get(
-                        prediction, 0) + 1
-
-                    results.append({
-                        'sensor_id': reading.get('sensor_id'),
-                        'timestamp': reading.get('timestamp').isoformat() if isinstance(reading.get('timestamp'), datetime) else reading.get('timestamp'),
-                        'prediction': prediction,
-                        'solution': ml_result.get('solution'),
-                        'confidence': ml_result.get('confidence'),
-                        'reliability': ml_result.get('reliability'),
-                        'core_temp': reading.get('core_temp'),
-                        'humidity': reading.get('humidity'),
-                        'soc': reading.get('soc')
-                    })
-            except Exception as e:
-                continue
+        try:
+            ml_results = predict_readings_batch(readings, timeout=5)
+        except Exception as e:
+            log.limited(logging.ERROR, 'ml.batch_analyze_failed', readings=len(readings), error=str(e))
+            ml_results = []
+
+        for reading, ml_result in zip(readings, ml_results):
+            prediction = ml_result.get('prediction')
+
+            # Count prediction types
+            predictions_count[prediction] = predictions_count.get(
+                prediction, 0) + 1
+
+            results.append({
+                'sensor_id': reading.get('sensor_id'),
+                'timestamp': reading.get('timestamp'),
+                'prediction': prediction,
+                'solution': ml_result.get('solution'),
+                'confidence': ml_result.get('confidence'),
+                'reliability': ml_result.get('reliability'),
+                'core_temp': reading.get('core_temp'),
+                'humidity': reading.get('humidity'),
+                'soc': reading.get('soc'),
+                'temporal_features': temporal_summary(rolling_features.get(reading.get('sensor_id')))
+            })
 
         # Calculate trends
         avg_confidence = sum(r['confidence']
@@ -536,7 +1709,7 @@ if __name__ == '__main__':
     print("="*60)
     print(f"Port: {PORT}")
     print(f"CORS Origins: {CORS_ORIGINS}")
-    print(f"ML Server: {ML_SERVER_URL}")
+    print(f"ML Server: {ML_SERVER_URL if ML_MODE == 'http' else 'embedded (in-process)'}")
     print(f"MongoDB: {DATABASE_NAME}.{COLLECTION_NAME}")
     print(f"Dashboard: http://localhost:{PORT}")
     print("="*60)
@@ -552,5 +1725,7 @@ if __name__ == '__main__':
         print("Please check your MongoDB connection")
         print()
 
-    # Start Flask server
-    app.run(port=PORT, debug=True)
+    start_scoring_worker()
+
+    # Start Flask server; the reloader would import the app in a second process
+    app.run(port=PORT, debug=True, use_reloader=False)
@@ -0,0 +1,342 @@
+"""
+Root Server Micro-Benchmarks
+============================
+Offline throughput measurements for root_server hot paths. Uses synthetic
+readings, so no MongoDB is needed.
+
+Usage:
+    python benchmarks.py convert [--readings 10000] [--with-model]
+    python benchmarks.py ml-modes [--requests 200]   # needs MongoDB at MONGO_URI
+    python benchmarks.py rolling [--sensors 10000] [--rate 10] [--seconds 10]
+    python benchmarks.py json [--iterations 200]
+"""
+
+# Importing Required Libraries
+import numpy as np
+import pandas as pd
+
+# Standard Libraries
+import argparse
+import json
+import os
+import importlib.util
+import random
+import subprocess
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fast_json
+from ml_features import ML_CONSTANTS, convert_sensor_to_ml_format, convert_sensor_batch_to_ml_columns, columnar_payload
+from rolling_features import RollingFeatureEngine
+
+ML_SERVER_DIR = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'ml_server')
+
+
+def synthetic_readings(count):
+    """Readings shaped like sensor_server's generate_sensor_data()"""
+    start = datetime.utcnow()
+    return [{
+        "sensor_id": f"battery_{random.randint(1, 10):03d}",
+        "humidity": round(random.uniform(30, 70), 2),
+        "temperature": round(random.uniform(20, 50), 2),
+        "heat_index": round(random.uniform(22, 55), 2),
+        "battery_location": f"cell_pack_{random.randint(1, 4)}",
+        "ambient_temp": round(random.uniform(18, 28), 2),
+        "surface_temp": round(random.uniform(25, 45), 2),
+        "core_temp": round(random.uniform(30, 50), 2),
+        "voltage": round(random.uniform(3.0, 4.2), 2),
+        "current": round(random.uniform(0.5, 3.5), 2),
+        "soc": random.randint(0, 100),
+        "timestamp": start + timedelta(seconds=i)
+    } for i in range(count)]
+
+
+def timed(function, repeat=3):
+    """Best wall time of `repeat` runs, in seconds, and the last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def load_ml_pipeline():
+    """Import ml_server's app module in-process for its feature pipeline and model"""
+    spec = importlib.util.spec_from_file_location(
+        'benchmark_ml_server', os.path.join(ML_SERVER_DIR, 'app.py'))
+    ml_app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(ml_app)
+    return ml_app
+
+
+def latency_summary(samples):
+    """Mean and percentiles (ms) of a list of durations in seconds"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+    return {
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99)
+    }
+
+
+def bench_convert(args):
+    """Per-row dict conversion vs columnar conversion for N readings"""
+    readings = synthetic_readings(args.readings)
+    n = len(readings)
+    results = {'readings': n}
+
+    # Current path: one dict per reading, one JSON body per reading,
+    # one single-row DataFrame per reading on the ML side
+    def rows_root_side():
+        return [json.dumps(convert_sensor_to_ml_format(r)) for r in readings]
+
+    def columnar_root_side():
+        return json.dumps(columnar_payload(convert_sensor_batch_to_ml_columns(readings)))
+
+    rows_time, bodies = timed(rows_root_side)
+    columnar_time, body = timed(columnar_root_side)
+
+    def rows_ml_side():
+        return [pd.DataFrame([json.loads(b)]) for b in bodies]
+
+    def columnar_ml_side():
+        payload = json.loads(body)
+        frame = pd.DataFrame(payload['columns'])
+        for name, value in payload['constants'].items():
+            frame[name] = value
+        return frame
+
+    rows_frame_time, _ = timed(rows_ml_side, repeat=1)
+    columnar_frame_time, frame = timed(columnar_ml_side)
+
+    results['per_row'] = {
+        'convert_encode_s': round(rows_time, 4),
+        'decode_frame_s': round(rows_frame_time, 4),
+        'wire_bytes': sum(len(b) for b in bodies),
+        'readings_per_s': round(n / (rows_time + rows_frame_time))
+    }
+    results['columnar'] = {
+        'convert_encode_s': round(columnar_time, 4),
+        'decode_frame_s': round(columnar_frame_time, 4),
+        'wire_bytes': len(body),
+        'readings_per_s': round(n / (columnar_time + columnar_frame_time))
+    }
+
+    # Both paths must feed the model identical numbers
+    expected = pd.DataFrame([convert_sensor_to_ml_format(r) for r in readings])
+    for name in frame.columns:
+        if pd.api.types.is_numeric_dtype(expected[name]):
+            assert np.allclose(expected[name].astype(float), frame[name].astype(float)), name
+        else:
+            assert (expected[name] == frame[name]).all(), name
+
+    if args.with_model:
+        ml_app = load_ml_pipeline()
+        sample = readings[:args.model_readings]
+
+        def rows_inference():
+            return [ml_app.model.predict_proba(ml_app.prepare_features(
+                pd.DataFrame([convert_sensor_to_ml_format(r)]))) for r in sample]
+
+        def columnar_inference():
+            frame = pd.DataFrame(convert_sensor_batch_to_ml_columns(sample))
+            for name, value in ML_CONSTANTS.items():
+                frame[name] = value
+            return ml_app.model.predict_proba(ml_app.prepare_features(frame))
+
+        rows_model_time, _ = timed(rows_inference, repeat=1)
+        columnar_model_time, _ = timed(columnar_inference)
+        results['inference'] = {
+            'readings': len(sample),
+            'per_row_s': round(rows_model_time, 4),
+            'batched_s': round(columnar_model_time, 4),
+            'speedup': round(rows_model_time / columnar_model_time, 1)
+        }
+
+    return results
+
+
+def bench_ml_modes(args):
+    """
+    /ml/predict and /ml/analyse latency with ML_MODE=http (ml_server
+    started locally as a subprocess) against ML_MODE=embedded
+    """
+    env = dict(os.environ, PORT=str(args.ml_port))
+    ml_process = subprocess.Popen(['python', 'app.py'], cwd=ML_SERVER_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health_url = f'http://localhost:{args.ml_port}/api/health'
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(health_url, timeout=1)
+                break
+            except OSError:
+                time.sleep(0.2)
+
+        # Measure the ML path itself, not the response cache or tailer
+        os.environ.update({'CACHE_TTL_PREDICT': '0', 'LATEST_TAILER': 'off'})
+        import app as root_app
+        root_app.ML_SERVER_URL = f'http://localhost:{args.ml_port}'
+        client = root_app.app.test_client()
+
+        results = {'requests': args.requests}
+        for mode in ('http', 'embedded'):
+            root_app.ML_MODE = mode
+            results[mode] = {}
+            for path in ('/ml/predict', f'/ml/analyse?limit={args.analyse_limit}'):
+                client.get(path)  # warm up
+                samples = []
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    samples.append(time.perf_counter() - started)
+                body = response.get_json()
+                assert body.get('ml_prediction') or body.get('summary', {}).get('successful_predictions'), body
+                results[mode][path] = latency_summary(samples)
+        return results
+    finally:
+        ml_process.terminate()
+        ml_process.wait()
+
+
+def bench_rolling(args):
+    """
+    Rolling feature updates for N sensors reporting at R Hz over S simulated
+    seconds, against the required N x R updates per second
+    """
+    engine = RollingFeatureEngine({'core_temp': 60, 'voltage': 30, 'current': 30})
+    sensors = [f"battery_{i:05d}" for i in range(args.sensors)]
+    ticks = int(args.seconds * args.rate)
+    rng = np.random.default_rng(42)
+    start = datetime.utcnow().timestamp()
+
+    # Pre-build the readings so only the engine is timed
+    core_temp = (35 + rng.normal(0, 0.5, (ticks, args.sensors))).tolist()
+    voltage = (3.7 + rng.normal(0, 0.05, (ticks, args.sensors))).tolist()
+    current = (2.0 + rng.normal(0, 0.2, (ticks, args.sensors))).tolist()
+    readings = [[{
+        'sensor_id': sensor_id,
+        'timestamp': start + tick / args.rate,
+        'core_temp': core_temp[tick][i],
+        'voltage': voltage[tick][i],
+        'current': current[tick][i]
+    } for i, sensor_id in enumerate(sensors)] for tick in range(ticks)]
+
+    latencies = []
+    started = time.perf_counter()
+    for batch in readings:
+        tick_started = time.perf_counter()
+        engine.update_many(batch)
+        latencies.append(time.perf_counter() - tick_started)
+    elapsed = time.perf_counter() - started
+
+    updates = ticks * args.sensors
+    required = args.sensors * args.rate
+    return {
+        'sensors': args.sensors,
+        'rate_hz': args.rate,
+        'simulated_seconds': args.seconds,
+        'updates': updates,
+        'elapsed_s': round(elapsed, 3),
+        'updates_per_s': round(updates / elapsed),
+        'required_updates_per_s': required,
+        'headroom': round(updates / elapsed / required, 2),
+        'tick': latency_summary(latencies),
+        'sample_features': engine.get(sensors[0])
+    }
+
+
+def bench_json(args):
+    """
+    Response encoding for /data (100 readings) and ml_server's /api/data
+    (per_page=1000): Flask's default provider after the per-item conversion
+    each endpoint used to do, vs fast_json on the raw documents / DataFrame
+    """
+    default_provider = DefaultJSONProvider(Flask(__name__))
+    readings = synthetic_readings(100)
+    for reading in readings:
+        reading['_id'] = ObjectId()
+    frame = pd.read_csv(os.path.join(ML_SERVER_DIR, 'EV_Battery_Charging_5000_Extended.csv')).iloc[:1000]
+
+    def data_before():
+        data = [dict(reading) for reading in readings]
+        for item in data:
+            item['_id'] = str(item['_id'])
+            item['timestamp'] = item['timestamp'].isoformat()
+        return default_provider.dumps({'success': True, 'count': len(data), 'data': data}).encode()
+
+    def data_after():
+        return fast_json.dumps({'success': True, 'count': len(readings), 'data': readings})
+
+    def api_data_before():
+        return default_provider.dumps({'status': 'success', 'data': frame.to_dict(orient='records')}).encode()
+
+    def api_data_after():
+        return fast_json.dumps({'status': 'success', 'data': frame})
+
+    cases = {
+        '/data': (data_before, data_after),
+        '/api/data': (api_data_before, api_data_after)
+    }
+    results = {'encoder': 'orjson' if fast_json.orjson is not None else 'json', 'iterations': args.iterations}
+    for endpoint, (before, after) in cases.items():
+        before_time, before_body = timed(lambda: [before() for _ in range(args.iterations)])
+        after_time, after_body = timed(lambda: [after() for _ in range(args.iterations)])
+        # Same document either way
+        assert json.loads(before_body[0]) == json.loads(after_body[0]), endpoint
+        results[endpoint] = {
+            'before_ms': round(before_time / args.iterations * 1000, 3),
+            'after_ms': round(after_time / args.iterations * 1000, 3),
+            'speedup': round(before_time / after_time, 1),
+            'bytes': len(after_body[0])
+        }
+    return results
+
+
+BENCHMARKS = {
+    'convert': bench_convert,
+    'ml-modes': bench_ml_modes,
+    'rolling': bench_rolling,
+    'json': bench_json
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('benchmark', choices=list(BENCHMARKS))
+    parser.add_argument('--readings', type=int, default=10000)
+    parser.add_argument('--with-model', action='store_true',
+                        help='Also time inference through ml_server\'s model in-process')
+    parser.add_argument('--model-readings', type=int, default=1000,
+                        help='Readings used for the per-row vs batched inference timing')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per endpoint and mode for ml-modes')
+    parser.add_argument('--analyse-limit', type=int, default=100)
+    parser.add_argument('--ml-port', type=int, default=8765)
+    parser.add_argument('--sensors', type=int, default=10000)
+    parser.add_argument('--rate', type=float, default=10,
+                        help='Readings per second per sensor for rolling')
+    parser.add_argument('--seconds', type=float, default=10,
+                        help='Simulated seconds of readings for rolling')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Responses encoded per endpoint and path for json')
+    args = parser.parse_args()
+
+    print(json.dumps(BENCHMARKS[args.benchmark](args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Root Server Dashboard Load Test
+===============================
+Simulates many open dashboards against a root server and reports
+throughput, per-endpoint latency percentiles, error rates and server
+CPU/RSS. Polling clients replay static/scripts.js: /data + /data/stats on
+one timer, /ml/predict on another. Push clients hold /stream open.
+
+With --local-stack the root server is started as a child process against a
+seeded MongoDB stand-in (mongomock, or --mongo-uri for a real server) and a
+stub ML server with tunable latency, so capacity can be measured on one box.
+
+Usage:
+    python loadtest.py --mode poll --clients 500 --server-pid <PID>
+    python loadtest.py --mode push --clients 500 --server-pid <PID>
+    python loadtest.py --local-stack --clients 50,100,200,400 --ml-latency-ms 40
+"""
+
+# Importing Required Libraries
+import requests
+
+# Standard Libraries
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================
+# LOAD TEST CONFIGURATION
+# ============================================================
+
+BASE_URL = os.getenv('ROOT_SERVER_URL', 'http://localhost:5000')
+CLIENTS = 500  # Simulated open dashboards
+DURATION = 60  # Seconds to measure
+RAMP_UP = 10  # Seconds over which clients connect
+DATA_INTERVAL = 5  # Dashboard polls /data + /data/stats every 5s
+ML_INTERVAL = 10  # ML tab polls /ml/predict every 10s
+ML_TAB_SHARE = 0.2  # Fraction of polling clients sitting on the ML tab
+
+# Local stack (--local-stack)
+ROOT_PORT = 5099  # Root server child process
+ML_PORT = 8099  # Stub ML server child process
+ML_LATENCY_MS = 30  # Stub ML server delay per request
+ML_JITTER_MS = 10  # +/- uniform jitter on that delay
+SEED_READINGS = 5000  # Readings loaded into the MongoDB stand-in
+
+# ============================================================
+
+
+def read_process_cpu(pid):
+    """Return (user + system) CPU seconds used by a process, from /proc"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+    return (int(fields[11]) + int(fields[12])) / ticks
+
+
+def read_process_rss(pid):
+    """Return (current, peak) resident set size in MB of a process, from /proc"""
+    rss = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                key, value = line.split(':', 1)
+                rss[key] = round(int(value.split()[0]) / 1024, 1)
+    return rss.get('VmRSS'), rss.get('VmHWM')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Counters:
+    """Thread-safe request, error, event and latency counters, also kept per path"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.events = 0
+        self.bytes = 0
+        self.latencies = []
+        self.paths = {}
+
+    def record(self, latency=None, size=0, error=False, event=False, path=None):
+        with self.lock:
+            if event:
+                self.events += 1
+            else:
+                self.requests += 1
+            if error:
+                self.errors += 1
+            if latency is not None:
+                self.latencies.append(latency)
+            self.bytes += size
+            if path is not None:
+                entry = self.paths.setdefault(path, {'requests': 0, 'errors': 0, 'latencies': []})
+                entry['requests'] += 1
+                entry['errors'] += int(error)
+                if latency is not None:
+                    entry['latencies'].append(latency)
+
+    def reset(self):
+        """Drop everything recorded so far (e.g. during ramp-up)"""
+        with self.lock:
+            self.requests = self.errors = self.events = self.bytes = 0
+            self.latencies = []
+            self.paths = {}
+
+
+def latency_ms(latencies):
+    return {
+        'p50': round(percentile(latencies, 50) * 1000, 2),
+        'p95': round(percentile(latencies, 95) * 1000, 2),
+        'p99': round(percentile(latencies, 99) * 1000, 2),
+        'max': round(max(latencies) * 1000, 2) if latencies else 0
+    }
+
+
+def polling_client(session, stop, counters, ml_tab):
+    """Replay the dashboard's setInterval polling for one tab"""
+    paths = ['/ml/predict'] if ml_tab else ['/data', '/data/stats']
+    interval = ML_INTERVAL if ml_tab else DATA_INTERVAL
+
+    while not stop.is_set():
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                response = session.get(f'{BASE_URL}{path}', timeout=30)
+                counters.record(time.perf_counter() - started, len(response.content),
+                                error=response.status_code >= 500 or not response.json().get('success', True),
+                                path=path)
+            except (requests.exceptions.RequestException, ValueError):
+                counters.record(error=True, path=path)
+        stop.wait(interval)
+
+
+def push_client(session, stop, counters):
+    """Hold one /stream connection open and count received events"""
+    while not stop.is_set():
+        try:
+            with session.get(f'{BASE_URL}/stream', stream=True, timeout=(10, 60)) as response:
+                counters.record(size=0, error=response.status_code != 200)
+                for line in response.iter_lines(chunk_size=None):
+                    if stop.is_set():
+                        return
+                    if line.startswith(b'event:'):
+                        counters.record(size=len(line), event=True)
+        except requests.exceptions.RequestException:
+            counters.record(error=True)
+            stop.wait(1)
+
+
+def run_load_test(mode, clients, duration, server_pid=None):
+    """Connect the simulated dashboards, measure for `duration` seconds and summarize"""
+    counters = Counters()
+    stop = threading.Event()
+    threads = []
+
+    for i in range(clients):
+        session = requests.Session()
+        if mode == 'push':
+            target, args = push_client, (session, stop, counters)
+        else:
+            ml_tab = i < clients * ML_TAB_SHARE
+            target, args = polling_client, (session, stop, counters, ml_tab)
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(RAMP_UP / max(clients, 1))
+
+    # Measure steady state only
+    counters.reset()
+    cpu_start = read_process_cpu(server_pid) if server_pid else None
+    wall_start = time.perf_counter()
+
+    time.sleep(duration)
+
+    elapsed = time.perf_counter() - wall_start
+    cpu_used = read_process_cpu(server_pid) - cpu_start if server_pid else None
+    rss, peak_rss = read_process_rss(server_pid) if server_pid else (None, None)
+    stop.set()
+
+    with counters.lock:
+        result = {
+            'mode': mode,
+            'clients': clients,
+            'duration_s': round(elapsed, 2),
+            'requests': counters.requests,
+            'requests_per_s': round(counters.requests / elapsed, 2),
+            'events_received': counters.events,
+            'errors': counters.errors,
+            'error_rate': round(counters.errors / counters.requests, 4) if counters.requests else 0,
+            'bytes_received': counters.bytes,
+            'latency_ms': latency_ms(counters.latencies),
+            'endpoints': {
+                path: {
+                    'requests': entry['requests'],
+                    'requests_per_s': round(entry['requests'] / elapsed, 2),
+                    'error_rate': round(entry['errors'] / entry['requests'], 4) if entry['requests'] else 0,
+                    'latency_ms': latency_ms(entry['latencies'])
+                } for path, entry in sorted(counters.paths.items())
+            },
+            'server_cpu_s': round(cpu_used, 2) if cpu_used is not None else None,
+            'server_cpu_pct': round(cpu_used / elapsed * 100, 1) if cpu_used is not None else None,
+            'server_rss_mb': rss,
+            'server_peak_rss_mb': peak_rss
+        }
+    return result
+
+
+def stub_prediction(latency_ms, jitter_ms):
+    """Canned /api/predict result after a simulated model delay"""
+    time.sleep(max(0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+    prediction = random.choice(['Normal', 'Watch', 'Warning'])
+    return {
+        'prediction': prediction,
+        'confidence': round(random.uniform(70, 99), 2),
+        'solution': {'emoji': '✅', 'severity': 'LOW', 'action': 'Stub ML server', 'color': '#16a34a'},
+        'reliability': 'HIGH',
+        'probabilities': {'Normal': 60.0, 'Watch': 25.0, 'Warning': 10.0, 'Alarm': 4.0, 'Runaway': 1.0}
+    }
+
+
+def serve_stub_ml(port, latency_ms, jitter_ms):
+    """Stand-in for ml_server answering /api/predict and /api/predict/batch with a fixed delay"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.reply({'status': 'healthy', 'stub': True})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/api/predict':
+                self.reply({'status': 'success', 'model_accuracy': 0.84,
+                            **stub_prediction(latency_ms, jitter_ms)})
+            elif self.path == '/api/predict/batch':
+                count = len(body) if isinstance(body, list) else len(
+                    next(iter(body.get('columns', {}).values()), []))
+                results = [stub_prediction(0, 0) for _ in range(count)]
+                time.sleep(max(0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+                self.reply({'status': 'success', 'results': results, 'count': count,
+                            'model_accuracy': 0.84})
+            else:
+                self.send_error(404)
+
+        def reply(self, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+
+def serve_root(port, mongo_uri, seed_readings):
+    """
+    Run root_server's app without the debug reloader, so its PID is the one
+    measured. Without mongo_uri, MongoDB is replaced by a seeded mongomock client.
+    """
+    if not mongo_uri:
+        try:
+            import mongomock
+            import pymongo
+        except ImportError:
+            sys.exit("✗ The MongoDB stand-in needs mongomock (pip install mongomock), or pass --mongo-uri")
+        standin = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *args, **kwargs: standin
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as root_app
+
+    if not mongo_uri and seed_readings:
+        start = datetime.utcnow() - timedelta(seconds=seed_readings)
+        root_app.sensor_collection.insert_many([{
+            'sensor_id': f'battery_{random.randint(1, 10):03d}',
+            'humidity': round(random.uniform(30, 70), 2),
+            'temperature': round(random.uniform(20, 50), 2),
+            'heat_index': round(random.uniform(22, 55), 2),
+            'battery_location': f'cell_pack_{random.randint(1, 4)}',
+            'ambient_temp': round(random.uniform(18, 28), 2),
+            'surface_temp': round(random.uniform(25, 45), 2),
+            'core_temp': round(random.uniform(30, 50), 2),
+            'voltage': round(random.uniform(3.0, 4.2), 2),
+            'current': round(random.uniform(0.5, 3.5), 2),
+            'soc': random.randint(0, 100),
+            'timestamp': start + timedelta(seconds=i)
+        } for i in range(seed_readings)])
+        print(f"✓ Seeded MongoDB stand-in with {seed_readings} readings")
+
+    # Per-request access logging would be measured as server CPU
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    root_app.app.run(port=port, debug=False, threaded=True)
+
+
+def wait_for(url, timeout=60):
+    """Poll a URL until it answers, or raise"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_local_stack(args):
+    """Start the stub ML server and the root server as child processes"""
+    script = os.path.abspath(__file__)
+    ml = subprocess.Popen([sys.executable, script, '--serve', 'stub-ml', '--ml-port', str(args.ml_port),
+                           '--ml-latency-ms', str(args.ml_latency_ms), '--ml-jitter-ms', str(args.ml_jitter_ms)])
+    env = dict(os.environ, ML_SERVER_URL=f'http://127.0.0.1:{args.ml_port}', ML_MODE='http')
+    root_command = [sys.executable, script, '--serve', 'root', '--root-port', str(args.root_port),
+                    '--seed-readings', str(args.seed_readings)]
+    if args.mongo_uri:
+        root_command += ['--mongo-uri', args.mongo_uri]
+        env['MONGO_URI'] = args.mongo_uri
+    root = subprocess.Popen(root_command, env=env, cwd=os.path.dirname(script))
+    try:
+        wait_for(f'http://127.0.0.1:{args.ml_port}/api/health')
+        wait_for(f'http://127.0.0.1:{args.root_port}/status')
+    except Exception:
+        stop_local_stack([ml, root])
+        raise
+    return [ml, root]
+
+
+def stop_local_stack(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def main():
+    global BASE_URL
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--mode', choices=['poll', 'push'], default='poll')
+    parser.add_argument('--clients', default=str(CLIENTS),
+                        help='Client count, or a comma-separated list to sweep (e.g. 50,100,200)')
+    parser.add_argument('--duration', type=int, default=DURATION)
+    parser.add_argument('--server-pid', type=int,
+                        help='Root server PID for CPU/RSS measurement (Linux /proc)')
+    parser.add_argument('--local-stack', action='store_true',
+                        help='Start the root server, MongoDB stand-in and stub ML server locally')
+    parser.add_argument('--mongo-uri', help='Use a real MongoDB instead of the stand-in')
+    parser.add_argument('--seed-readings', type=int, default=SEED_READINGS)
+    parser.add_argument('--ml-latency-ms', type=float, default=ML_LATENCY_MS)
+    parser.add_argument('--ml-jitter-ms', type=float, default=ML_JITTER_MS)
+    parser.add_argument('--root-port', type=int, default=ROOT_PORT)
+    parser.add_argument('--ml-port', type=int, default=ML_PORT)
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    parser.add_argument('--serve', choices=['stub-ml', 'root'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'stub-ml':
+        return serve_stub_ml(args.ml_port, args.ml_latency_ms, args.ml_jitter_ms)
+    if args.serve == 'root':
+        return serve_root(args.root_port, args.mongo_uri, args.seed_readings)
+
+    client_counts = [int(count) for count in args.clients.split(',')]
+    processes = []
+    server_pid = args.server_pid
+    if args.local_stack:
+        processes = start_local_stack(args)
+        server_pid = processes[1].pid
+        BASE_URL = f'http://127.0.0.1:{args.root_port}'
+
+    print("=" * 60)
+    print(f"Dashboard Load Test - {args.mode} x {args.clients} clients")
+    print("=" * 60)
+    print(f"Target: {BASE_URL}")
+    if args.local_stack:
+        print(f"Stack: {'MongoDB ' + args.mongo_uri if args.mongo_uri else 'mongomock stand-in'}, "
+              f"stub ML {args.ml_latency_ms}±{args.ml_jitter_ms} ms")
+    print(f"Duration: {args.duration}s per step (after {RAMP_UP}s ramp-up)")
+    print("=" * 60)
+
+    results = []
+    try:
+        for clients in client_counts:
+            result = run_load_test(args.mode, clients, args.duration, server_pid)
+            results.append(result)
+            print(json.dumps(result, indent=2))
+    finally:
+        if processes:
+            stop_local_stack(processes)
+
+    if len(results) > 1:
+        print("=" * 60)
+        print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'cpu %':>6} {'rss MB':>7}")
+        for result in results:
+            print(f"{result['clients']:>8} {result['requests_per_s']:>9} {result['latency_ms']['p50']:>8} "
+                  f"{result['latency_ms']['p95']:>8} {result['latency_ms']['p99']:>8} "
+                  f"{result['error_rate']:>7} {result['server_cpu_pct'] or '-':>6} {result['server_rss_mb'] or '-':>7}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
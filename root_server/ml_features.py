@@ -0,0 +1,118 @@
+"""
+Conversion of sensor readings to the ML server's input schema.
+
+convert_sensor_to_ml_format() builds one dict per reading for /api/predict.
+convert_sensor_batch_to_ml_columns() turns a batch of readings into one
+NumPy array per schema column, and columnar_payload() encodes that batch
+for /api/predict/batch without building per-row dicts.
+"""
+
+# Importing Required Libraries
+import numpy as np
+
+# Defaults used when a reading is missing a field
+SENSOR_DEFAULTS = {
+    'voltage': 3.7,
+    'current': 2.0,
+    'core_temp': 35,
+    'ambient_temp': 25,
+    'soc': 50,
+    'humidity': 50
+}
+
+# ML inputs the sensor hardware does not measure - sent once per batch
+ML_CONSTANTS = {
+    "StateOfHealth_%": 95,
+    "InternalResistance_mOhm": 50,
+    "VibrationLevel_mg": 5,
+    "CoolingSystem": "Active"
+}
+
+
+def convert_sensor_to_ml_format(sensor_data):
+    """Convert sensor data format to ML model input format"""
+    return {
+        # Scale voltage
+        "PackVoltage_V": sensor_data.get('voltage', 3.7) * 100,
+        "MaxTemp_C": sensor_data.get('core_temp', 35),
+        "MinTemp_C": sensor_data.get('ambient_temp', 25),
+        "AmbientTemp_C": sensor_data.get('ambient_temp', 25),
+        # Scale current
+        "ChargeCurrent_A": sensor_data.get('current', 2.0) * 10,
+        "SOC_%": sensor_data.get('soc', 50),
+        "StateOfHealth_%": 95,  # Default value
+        "InternalResistance_mOhm": 50,  # Default value
+        "DemandVoltage_V": sensor_data.get('voltage', 3.7) * 100,
+        "DemandCurrent_A": sensor_data.get('current', 2.0) * 10,
+        "ChargePower_kW": (sensor_data.get('voltage', 3.7) * sensor_data.get('current', 2.0) * 100) / 1000,
+        "Humidity_%": sensor_data.get('humidity', 50),
+        "VibrationLevel_mg": 5,  # Default value
+        "MoistureDetected": 1 if sensor_data.get('humidity', 50) > 60 else 0,
+        "CoolingSystem": "Active"
+    }
+
+
+def sensor_column(readings, field):
+    """One float64 array of a sensor field across a batch of readings"""
+    default = SENSOR_DEFAULTS[field]
+    return np.fromiter((reading.get(field, default) for reading in readings),
+                       dtype=np.float64, count=len(readings))
+
+
+def convert_sensor_batch_to_ml_columns(readings):
+    """
+    Convert a batch of readings (e.g. a Mongo cursor batch) to the ML
+    schema as column arrays. Values match convert_sensor_to_ml_format()
+    row for row; the constant inputs are left to ML_CONSTANTS.
+    """
+    if not isinstance(readings, list):
+        readings = list(readings)
+
+    voltage = sensor_column(readings, 'voltage')
+    current = sensor_column(readings, 'current')
+    ambient_temp = sensor_column(readings, 'ambient_temp')
+    humidity = sensor_column(readings, 'humidity')
+    pack_voltage = voltage * 100
+    charge_current = current * 10
+
+    return {
+        "PackVoltage_V": pack_voltage,
+        "MaxTemp_C": sensor_column(readings, 'core_temp'),
+        "MinTemp_C": ambient_temp,
+        "AmbientTemp_C": ambient_temp,
+        "ChargeCurrent_A": charge_current,
+        "SOC_%": sensor_column(readings, 'soc'),
+        "DemandVoltage_V": pack_voltage,
+        "DemandCurrent_A": charge_current,
+        "ChargePower_kW": (voltage * current * 100) / 1000,
+        "Humidity_%": humidity,
+        "MoistureDetected": (humidity > 60).astype(np.int8)
+    }
+
+
+def columnar_payload(columns):
+    """
+    Column-oriented JSON body for /api/predict/batch:
+    {"columns": {name: [values...]}, "constants": {name: value}}
+    """
+    return {
+        'columns': {name: values.tolist() for name, values in columns.items()},
+        'constants': ML_CONSTANTS
+    }
+
+
+# Rolling feature -> ML input column. The shipped model ignores these
+# columns until it is retrained with them (see ROLLING_FEATURES_TO_MODEL)
+TEMPORAL_ML_COLUMNS = {
+    'core_temp_rise_rate': 'CoreTempRiseRate_C_per_min',
+    'voltage_sag': 'VoltageSag_V',
+    'current_deviation': 'CurrentDeviation_z'
+}
+
+
+def add_temporal_features(ml_input, features):
+    """Add a sensor's rolling features to an ML input dict; missing values become 0"""
+    for name, column in TEMPORAL_ML_COLUMNS.items():
+        value = features.get(name) if features else None
+        ml_input[column] = value if value is not None else 0
+    return ml_input
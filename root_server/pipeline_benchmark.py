@@ -0,0 +1,486 @@
+"""
+End-to-End Pipeline Benchmark
+=============================
+Runs the whole pipeline - sensor_server's fleet simulator and async
+writer, MongoDB, root_server's tailer and scoring worker, and ml_server -
+at a sweep of ingest rates with a number of open dashboards, and reports
+per step:
+
+- throughput: readings generated, written, tailed and scored per second
+- per-hop latency percentiles for a sample of readings:
+    ingest      generated -> written to MongoDB (queueing + insert)
+    tail        written -> seen by root's latest-state tailer
+    pickup      written -> sent to ml_server by the scoring worker
+    ml          sent -> predictions returned (HTTP + model)
+    end_to_end  generated -> scored
+- dashboard request latency and data freshness (age of /data/latest)
+- backlogs, and CPU/RSS of the pipeline and ML processes
+
+A step is sustained while the writer and the scoring worker keep up with
+the target rate (within 5%), the scoring backlog does not grow and the
+end-to-end p99 stays under --slo-ms; the first step that is not is the
+saturation point. Results are JSON (--output) with the commit they were
+measured at, so runs can be compared between commits.
+
+ml_server runs as its own process. The sensor and root apps share a
+second process: the in-process MongoDB stand-in (mongomock) cannot be
+shared between processes, and one process lets every hop be timed on the
+same clock. Pass --mongo-uri to measure against a real MongoDB instead;
+the benchmark writes to *_pipeline_bench collections and drops them first.
+
+Usage:
+    python pipeline_benchmark.py --rates 100,500,1000,2000 --dashboards 20
+    python pipeline_benchmark.py --rates 200 --duration 60 --output pipeline.json
+"""
+
+# Importing Required Libraries
+import requests
+
+# Standard Libraries
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import loadtest
+from loadtest import Counters, latency_ms, percentile, read_process_cpu, read_process_rss, wait_for
+
+# ============================================================
+# BENCHMARK CONFIGURATION
+# ============================================================
+
+RATES = '100,500,1000,2000'  # Target readings/s, one step each
+DASHBOARDS = 10  # Simulated open dashboards during every step
+DURATION = 30  # Seconds measured per step
+WARMUP = 10  # Seconds before measuring, after the stack is up
+SENSORS = 100  # Fleet size; raised when a rate needs more than 100 Hz per sensor
+SLO_MS = 5000  # End-to-end p99 above this saturates a step
+KEEP_UP = 0.95  # Fraction of the target rate a hop must sustain
+MAX_TRACKED = 100000  # Readings timed per step; the rest are sampled out
+FRESHNESS_INTERVAL = 0.5  # Seconds between /data/latest freshness probes
+
+ROOT_PORT = 5098  # Root server (sensor + root process)
+ML_PORT = 8098  # ml_server process
+BENCH_SUFFIX = '_pipeline_bench'  # Collection name suffix with --mongo-uri
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SENSOR_DIR = os.path.join(os.path.dirname(ROOT_DIR), 'sensor_server')
+ML_DIR = os.path.join(os.path.dirname(ROOT_DIR), 'ml_server')
+EPOCH = datetime(1970, 1, 1)
+
+# ============================================================
+
+# Stage order of a tracked reading's timestamps
+STAGES = ('generated', 'written', 'tailed', 'sent', 'scored')
+HOPS = {
+    'ingest': ('generated', 'written'),
+    'tail': ('written', 'tailed'),
+    'pickup': ('written', 'sent'),
+    'ml': ('sent', 'scored'),
+    'end_to_end': ('generated', 'scored')
+}
+
+
+class StageProbe:
+    """Wall-clock time each sampled reading reached each stage, keyed by _id"""
+
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.times = {}
+            self.counts = dict.fromkeys(STAGES[1:], 0)
+            self.started = time.time()
+
+    def written(self, readings):
+        now = time.time()
+        with self.lock:
+            self.counts['written'] += len(readings)
+            for reading in readings:
+                if hash(reading['_id']) % self.sample_every == 0:
+                    entry = [None] * len(STAGES)
+                    entry[0] = (reading['timestamp'] - EPOCH).total_seconds()
+                    entry[1] = now
+                    self.times[reading['_id']] = entry
+
+    def mark(self, stage, readings):
+        now = time.time()
+        index = STAGES.index(stage)
+        with self.lock:
+            self.counts[stage] += len(readings)
+            for reading in readings:
+                entry = self.times.get(reading['_id'])
+                if entry is not None and entry[index] is None:
+                    entry[index] = now
+
+    def report(self):
+        """Counts, rates and per-hop latency percentiles since the last reset"""
+        with self.lock:
+            elapsed = time.time() - self.started
+            entries = list(self.times.values())
+            counts = dict(self.counts)
+        hops = {}
+        for hop, (start, end) in HOPS.items():
+            first, last = STAGES.index(start), STAGES.index(end)
+            hops[hop] = latency_ms([entry[last] - entry[first] for entry in entries
+                                    if entry[first] is not None and entry[last] is not None])
+            hops[hop]['samples'] = sum(1 for entry in entries if entry[first] is not None and entry[last] is not None)
+        return {
+            'seconds': round(elapsed, 2),
+            'tracked': len(entries),
+            'counts': counts,
+            'per_s': {stage: round(count / elapsed, 1) for stage, count in counts.items()},
+            'hops_ms': hops
+        }
+
+
+def serve_ml(port):
+    """Run ml_server's app on its own, without the debug reloader"""
+    sys.path.insert(0, ML_DIR)
+    import app as ml_app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    ml_app.app.run(port=port, debug=False, threaded=True)
+
+
+def load_sensor_app():
+    """Import sensor_server/app.py as `sensor_app` next to root's `app`"""
+    sys.path.append(SENSOR_DIR)
+    spec = importlib.util.spec_from_file_location('sensor_app', os.path.join(SENSOR_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['sensor_app'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def serve_pipeline(port, mongo_uri, sample_every):
+    """
+    Run the sensor generator + writer and the root server in this process,
+    with probes on the write, tail and scoring hops and a /_bench/probe
+    endpoint reporting them.
+    """
+    if mongo_uri:
+        import pymongo
+        database = pymongo.MongoClient(mongo_uri)[os.environ.get('DATABASE_NAME', 'battery_monitoring')]
+        for name in database.list_collection_names():
+            if BENCH_SUFFIX in name:
+                database.drop_collection(name)
+    else:
+        try:
+            import mongomock
+            import pymongo
+        except ImportError:
+            sys.exit("✗ The MongoDB stand-in needs mongomock (pip install mongomock), or pass --mongo-uri")
+        standin = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *args, **kwargs: standin
+
+    sys.path.insert(0, ROOT_DIR)
+    import app as root_app
+    sensor_app = load_sensor_app()
+
+    probe = StageProbe(sample_every)
+
+    write = sensor_app.ingest_writer.write
+
+    def probed_write(readings):
+        written = write(readings)
+        probe.written(readings)
+        return written
+
+    sensor_app.ingest_writer.write = probed_write
+    root_app.latest_tailer.add_listener(lambda readings: probe.mark('tailed', readings))
+
+    predict = root_app.predict_readings_batch
+
+    def probed_predict(readings, *args, **kwargs):
+        probe.mark('sent', readings)
+        results = predict(readings, *args, **kwargs)
+        probe.mark('scored', readings)
+        return results
+
+    root_app.predict_readings_batch = probed_predict
+
+    def probe_report():
+        report = probe.report()
+        if root_app.request.args.get('reset') == 'true':
+            probe.reset()
+        ingest = sensor_app.ingest_writer.metrics()
+        report['sensor'] = {
+            'queue_depth': ingest['queue']['depth'] if 'queue' in ingest else ingest.get('buffered'),
+            'dropped': ingest.get('dropped', 0),
+            'failed_readings': ingest.get('failed_readings', 0),
+            'scheduler': sensor_app.scheduler.metrics()
+        }
+        report['scoring'] = root_app.scoring_worker.metrics()
+        return root_app.jsonify({'success': True, **report})
+
+    root_app.app.add_url_rule('/_bench/probe', 'bench_probe', probe_report)
+
+    # The generator's banner and per-request access logs are noise here
+    sensor_app.print = lambda *args, **kwargs: None
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    sensor_app.ingest_writer.start()
+    threading.Thread(target=sensor_app.fleet_data_system, daemon=True).start()
+    root_app.app.run(port=port, debug=False, threaded=True)
+
+
+def fleet_shape(rate, sensors):
+    """(sensors, hz) producing `rate` readings/s with at most 100 Hz per sensor"""
+    sensors = max(sensors, math.ceil(rate / 100))
+    return sensors, rate / sensors
+
+
+def wait_for_data(url, timeout=60):
+    """Poll /data/latest until the first reading has been written, or raise"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if requests.get(url, timeout=10).status_code == 200:
+            return
+        time.sleep(0.25)
+    raise RuntimeError(f"No readings reached {url} within {timeout}s")
+
+
+def start_pipeline(args, rate):
+    """Start the sensor + root process for one step and wait for its first reading"""
+    sensors, hz = fleet_shape(rate, args.sensors)
+    sample_every = max(1, math.ceil(rate * (args.warmup + args.duration) / MAX_TRACKED))
+    env = dict(os.environ,
+               SIMULATION_MODE='fleet', FLEET_SENSORS=str(sensors), FLEET_RATE_HZ=str(hz),
+               WRITE_MODE='async', SPOOL_ENABLED='false', RETENTION_MODE='off',
+               SCORING_WORKER='true', ML_MODE='http', ML_SERVER_URL=f'http://127.0.0.1:{args.ml_port}',
+               LOG_LEVEL='ERROR')
+    command = [sys.executable, os.path.abspath(__file__), '--serve', 'pipeline',
+               '--root-port', str(args.root_port), '--sample-every', str(sample_every)]
+    if args.mongo_uri:
+        command += ['--mongo-uri', args.mongo_uri]
+        env.update(MONGO_URI=args.mongo_uri,
+                   COLLECTION_NAME=f'battery_sensors{BENCH_SUFFIX}',
+                   STATS_COLLECTION_NAME=f'battery_stats{BENCH_SUFFIX}',
+                   PREDICTIONS_COLLECTION_NAME=f'battery_predictions{BENCH_SUFFIX}',
+                   ALERTS_COLLECTION_NAME=f'battery_alerts{BENCH_SUFFIX}')
+    process = subprocess.Popen(command, env=env, cwd=ROOT_DIR)
+    try:
+        wait_for(f'http://127.0.0.1:{args.root_port}/status')
+        # Dashboards open onto a populated collection, as in production
+        wait_for_data(f'http://127.0.0.1:{args.root_port}/data/latest')
+    except Exception:
+        stop_processes([process])
+        raise
+    return process
+
+
+def stop_processes(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def freshness_probe(stop, ages):
+    """Age of the newest reading a dashboard would show, sampled from /data/latest"""
+    session = requests.Session()
+    while not stop.is_set():
+        try:
+            latest = session.get(f'{loadtest.BASE_URL}/data/latest', timeout=10).json()
+            timestamp = datetime.fromisoformat(str(latest['data']['timestamp']).rstrip('Z'))
+            ages.append((datetime.utcnow() - timestamp).total_seconds())
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+            pass
+        stop.wait(FRESHNESS_INTERVAL)
+
+
+def run_step(args, rate, ml_pid):
+    """Run one ingest rate with the dashboards open and return its measurements"""
+    process = start_pipeline(args, rate)
+    counters = Counters()
+    stop = threading.Event()
+    ages = []
+    try:
+        for i in range(args.dashboards):
+            ml_tab = i < args.dashboards * loadtest.ML_TAB_SHARE
+            threading.Thread(target=loadtest.polling_client,
+                             args=(requests.Session(), stop, counters, ml_tab), daemon=True).start()
+        threading.Thread(target=freshness_probe, args=(stop, ages), daemon=True).start()
+
+        time.sleep(args.warmup)
+        probe_url = f'{loadtest.BASE_URL}/_bench/probe'
+        before = requests.get(probe_url, params={'reset': 'true'}, timeout=30).json()
+        counters.reset()
+        del ages[:]
+        cpu_start = {name: read_process_cpu(pid) for name, pid in (('pipeline', process.pid), ('ml', ml_pid))}
+
+        time.sleep(args.duration)
+
+        after = requests.get(probe_url, timeout=30).json()
+        elapsed = after['seconds']
+        cpu = {name: round((read_process_cpu(pid) - cpu_start[name]) / elapsed * 100, 1)
+               for name, pid in (('pipeline', process.pid), ('ml', ml_pid))}
+        rss = {name: read_process_rss(pid)[0] for name, pid in (('pipeline', process.pid), ('ml', ml_pid))}
+    finally:
+        stop.set()
+        stop_processes([process])
+
+    backlog_before = before['scoring'].get('backlog') or 0
+    backlog_after = after['scoring'].get('backlog') or 0
+    with counters.lock:
+        dashboards = {
+            'requests': counters.requests,
+            'error_rate': round(counters.errors / counters.requests, 4) if counters.requests else 0,
+            'latency_ms': latency_ms(counters.latencies)
+        }
+    dashboards['freshness_s'] = {
+        'p50': round(percentile(ages, 50), 3),
+        'p99': round(percentile(ages, 99), 3),
+        'max': round(max(ages), 3) if ages else 0,
+        'samples': len(ages)
+    }
+
+    per_s = after['per_s']
+    limits = []
+    if per_s['written'] < rate * KEEP_UP:
+        limits.append('ingest')
+    if per_s['scored'] < per_s['written'] * KEEP_UP or backlog_after - backlog_before > rate:
+        limits.append('scoring')
+    if after['hops_ms']['end_to_end']['p99'] > args.slo_ms or not after['hops_ms']['end_to_end']['samples']:
+        limits.append('latency')
+
+    return {
+        'target_per_s': rate,
+        'fleet': dict(zip(('sensors', 'hz'), fleet_shape(rate, args.sensors))),
+        'duration_s': elapsed,
+        'throughput_per_s': per_s,
+        'counts': after['counts'],
+        'tracked_readings': after['tracked'],
+        'hops_ms': after['hops_ms'],
+        'backlog': {
+            'ingest_queue': after['sensor']['queue_depth'],
+            'ingest_dropped': after['sensor']['dropped'],
+            'scoring_start': backlog_before,
+            'scoring_end': backlog_after
+        },
+        'scheduler': after['sensor']['scheduler'],
+        'dashboards': dashboards,
+        'cpu_pct': cpu,
+        'rss_mb': rss,
+        'sustained': not limits,
+        'limited_by': limits
+    }
+
+
+def saturation(steps):
+    """Highest sustained rate, and the first rate that was not with the hops that gave out"""
+    sustained = [step['target_per_s'] for step in steps if step['sustained']]
+    first = next((step for step in steps if not step['sustained']), None)
+    return {
+        'max_sustained_per_s': max(sustained) if sustained else None,
+        'saturated_at_per_s': first['target_per_s'] if first else None,
+        'limited_by': first['limited_by'] if first else []
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_step(step):
+    hops = step['hops_ms']
+    print(f"  {step['target_per_s']:>6}/s  written {step['throughput_per_s']['written']:>8.1f}/s  "
+          f"scored {step['throughput_per_s']['scored']:>8.1f}/s  "
+          f"e2e p50/p99 {hops['end_to_end']['p50']:.0f}/{hops['end_to_end']['p99']:.0f} ms  "
+          f"{'ok' if step['sustained'] else 'SATURATED (' + ', '.join(step['limited_by']) + ')'}")
+    for hop in ('ingest', 'tail', 'pickup', 'ml'):
+        print(f"          {hop:<7} p50 {hops[hop]['p50']:>9.2f}  p95 {hops[hop]['p95']:>9.2f}  "
+              f"p99 {hops[hop]['p99']:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rates', default=RATES, help='Comma-separated target readings/s to sweep')
+    parser.add_argument('--dashboards', type=int, default=DASHBOARDS)
+    parser.add_argument('--duration', type=int, default=DURATION)
+    parser.add_argument('--warmup', type=int, default=WARMUP)
+    parser.add_argument('--sensors', type=int, default=SENSORS)
+    parser.add_argument('--slo-ms', type=float, default=SLO_MS)
+    parser.add_argument('--stop-at-saturation', action='store_true',
+                        help='Skip the remaining rates once a step saturates')
+    parser.add_argument('--mongo-uri', help='Use a real MongoDB instead of the stand-in')
+    parser.add_argument('--root-port', type=int, default=ROOT_PORT)
+    parser.add_argument('--ml-port', type=int, default=ML_PORT)
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    parser.add_argument('--serve', choices=['ml', 'pipeline'], help=argparse.SUPPRESS)
+    parser.add_argument('--sample-every', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'ml':
+        return serve_ml(args.ml_port)
+    if args.serve == 'pipeline':
+        return serve_pipeline(args.root_port, args.mongo_uri, args.sample_every)
+
+    rates = [int(rate) for rate in args.rates.split(',')]
+    loadtest.BASE_URL = f'http://127.0.0.1:{args.root_port}'
+
+    print("=" * 60)
+    print(f"Pipeline Benchmark - {args.rates} readings/s, {args.dashboards} dashboards")
+    print("=" * 60)
+    print(f"MongoDB: {args.mongo_uri or 'mongomock stand-in'}")
+    print(f"Duration: {args.duration}s per step (after {args.warmup}s warm-up), SLO p99 {args.slo_ms:.0f} ms")
+    print("=" * 60)
+
+    ml = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', 'ml',
+                           '--ml-port', str(args.ml_port)],
+                          env=dict(os.environ, PORT=str(args.ml_port), LOG_LEVEL='WARNING'), cwd=ML_DIR)
+    steps = []
+    try:
+        wait_for(f'http://127.0.0.1:{args.ml_port}/api/health')
+        for rate in rates:
+            step = run_step(args, rate, ml.pid)
+            steps.append(step)
+            print_step(step)
+            if args.stop_at_saturation and not step['sustained']:
+                break
+    finally:
+        stop_processes([ml])
+
+    results = {
+        'benchmark': 'pipeline',
+        'commit': git_commit(),
+        'measured_at': datetime.utcnow().isoformat() + 'Z',
+        'config': {
+            'rates': rates,
+            'dashboards': args.dashboards,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'sensors': args.sensors,
+            'slo_ms': args.slo_ms,
+            'keep_up': KEEP_UP,
+            'mongodb': 'external' if args.mongo_uri else 'mongomock'
+        },
+        'steps': steps,
+        'saturation': saturation(steps)
+    }
+
+    print("=" * 60)
+    print(f"Max sustained: {results['saturation']['max_sustained_per_s']} readings/s; "
+          f"saturated at: {results['saturation']['saturated_at_per_s']} "
+          f"({', '.join(results['saturation']['limited_by']) or '-'})")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
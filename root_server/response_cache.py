@@ -0,0 +1,160 @@
+"""
+Short-TTL in-process response cache for root_server read endpoints.
+
+Concurrent requests for the same key are coalesced: one request renders
+the response while the others wait for it. Cached bodies carry a strong
+ETag so clients can revalidate with If-None-Match and get a 304.
+"""
+
+# Importing Required Libraries
+from flask import Response, make_response, request
+
+# Standard Libraries
+import hashlib
+import threading
+import time
+from functools import wraps
+
+
+class CachedResponse:
+    """A rendered response body plus the metadata needed to replay it"""
+
+    __slots__ = ('body', 'status', 'mimetype', 'etag', 'expires')
+
+    def __init__(self, body, status, mimetype, ttl):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.expires = time.monotonic() + ttl
+
+
+class ResponseCache:
+    """Thread-safe TTL cache with per-key request coalescing"""
+
+    def __init__(self, max_entries=1024, wait_timeout=10):
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.entries = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'not_modified': 0,
+            'uncacheable': 0,
+            'evictions': 0
+        }
+
+    def get_or_render(self, key, render):
+        """
+        Return a fresh cached entry for key, rendering it at most once.
+        `render` returns a CachedResponse, or None if the result must not be cached.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                self.counters['hits'] += 1
+                return entry, None
+            event = self.inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self.inflight[key] = threading.Event()
+                self.counters['misses'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            event.wait(self.wait_timeout)
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is not None:
+                return entry, None
+            # The leader's result was not cacheable (e.g. an error); render our own
+            return None, render
+
+        try:
+            entry = render()
+            if entry is not None:
+                self._store(key, entry)
+            else:
+                with self.lock:
+                    self.counters['uncacheable'] += 1
+            return entry, None
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            event.set()
+
+    def _store(self, key, entry):
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                now = time.monotonic()
+                expired = [k for k, v in self.entries.items() if v.expires <= now]
+                for k in expired:
+                    del self.entries[k]
+                self.counters['evictions'] += len(expired)
+                if len(self.entries) >= self.max_entries:
+                    # Still full: drop the entry closest to expiry
+                    oldest = min(self.entries, key=lambda k: self.entries[k].expires)
+                    del self.entries[oldest]
+                    self.counters['evictions'] += 1
+            self.entries[key] = entry
+
+    def record_not_modified(self):
+        with self.lock:
+            self.counters['not_modified'] += 1
+
+    def stats(self):
+        """Counters and hit ratio for the /status payload"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+            stats['inflight'] = len(self.inflight)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = round(
+            (stats['hits'] + stats['coalesced']) / lookups, 4) if lookups else 0
+        return stats
+
+
+def cached_response(cache, ttl):
+    """
+    Decorate a Flask view so its 200 responses are cached for `ttl` seconds,
+    keyed by path and query string. A ttl of 0 disables caching for the view.
+    """
+    def decorator(view):
+        if ttl <= 0:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.full_path
+            uncached = []
+
+            def render():
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    uncached.append(response)
+                    return None
+                return CachedResponse(response.get_data(), response.status_code,
+                                      response.mimetype, ttl)
+
+            entry, fallback = cache.get_or_render(key, render)
+            if entry is None and fallback is not None:
+                entry = fallback()
+            if entry is None:
+                return uncached[0]
+
+            if request.if_none_match.contains(entry.etag):
+                cache.record_not_modified()
+                response = Response(status=304)
+            else:
+                response = Response(entry.body, status=entry.status,
+                                    mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,213 @@
+"""
+Streaming temporal risk features per sensor.
+
+Each sensor keeps time-based windows over its recent readings. A window
+is a ring buffer plus running sums, so adding a reading and evicting
+expired ones costs O(1) amortized, independent of the window length:
+
+- core temperature rise rate (least-squares slope, °C/min)
+- voltage sag (window mean minus latest voltage, V)
+- current deviation (z-score of the latest current against the window)
+"""
+
+# Standard Libraries
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+# Running sums are rebuilt from the buffer after this many updates to shed
+# floating-point drift and re-base the time origin
+RESYNC_EVERY = 10000
+
+
+class RollingWindow:
+    """
+    Time-bounded window of (t, value) samples with running sums for
+    mean, variance and least-squares slope. `t` is in seconds.
+    """
+
+    __slots__ = ('seconds', 'max_samples', 'samples', 'origin', 'n', 'sum_t', 'sum_tt',
+                 'sum_y', 'sum_yy', 'sum_ty', 'updates')
+
+    def __init__(self, seconds, max_samples=4096):
+        self.seconds = seconds
+        self.max_samples = max_samples
+        self.samples = deque()
+        self.origin = None
+        self.updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.n = 0
+        self.sum_t = self.sum_tt = self.sum_y = self.sum_yy = self.sum_ty = 0.0
+
+    def _add(self, t, y):
+        t -= self.origin
+        self.n += 1
+        self.sum_t += t
+        self.sum_tt += t * t
+        self.sum_y += y
+        self.sum_yy += y * y
+        self.sum_ty += t * y
+
+    def _remove(self, t, y):
+        t -= self.origin
+        self.n -= 1
+        self.sum_t -= t
+        self.sum_tt -= t * t
+        self.sum_y -= y
+        self.sum_yy -= y * y
+        self.sum_ty -= t * y
+
+    def push(self, t, y):
+        """Add a sample and evict those older than the window"""
+        if self.origin is None:
+            self.origin = t
+        self.samples.append((t, y))
+        self._add(t, y)
+
+        cutoff = t - self.seconds
+        samples = self.samples
+        while samples[0][0] < cutoff or len(samples) > self.max_samples:
+            old_t, old_y = samples.popleft()
+            self._remove(old_t, old_y)
+
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.origin = samples[0][0]
+            self._reset_sums()
+            for sample_t, sample_y in samples:
+                self._add(sample_t, sample_y)
+
+    @property
+    def mean(self):
+        return self.sum_y / self.n if self.n else None
+
+    @property
+    def std(self):
+        if self.n < 2:
+            return None
+        variance = (self.sum_yy - self.sum_y * self.sum_y / self.n) / (self.n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    @property
+    def slope(self):
+        """Least-squares slope of value over time, per second"""
+        if self.n < 2:
+            return None
+        denominator = self.n * self.sum_tt - self.sum_t * self.sum_t
+        if denominator <= 0:
+            return None
+        return (self.n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    @property
+    def span(self):
+        return self.samples[-1][0] - self.samples[0][0] if self.samples else 0.0
+
+
+class SensorFeatureState:
+    """Rolling windows and the latest values for one sensor"""
+
+    __slots__ = ('core_temp', 'voltage', 'current', 'last_voltage', 'last_current',
+                 'last_timestamp', 'readings')
+
+    def __init__(self, windows):
+        self.core_temp = RollingWindow(windows['core_temp'])
+        self.voltage = RollingWindow(windows['voltage'])
+        self.current = RollingWindow(windows['current'])
+        self.last_voltage = None
+        self.last_current = None
+        self.last_timestamp = None
+        self.readings = 0
+
+    def features(self):
+        rise_rate = self.core_temp.slope
+        voltage_mean = self.voltage.mean
+        current_mean = self.current.mean
+        current_std = self.current.std
+
+        current_deviation = None
+        if current_std and self.last_current is not None:
+            current_deviation = (self.last_current - current_mean) / current_std
+        elif current_std == 0.0:
+            current_deviation = 0.0
+
+        return {
+            'core_temp_rise_rate': round(rise_rate * 60, 4) if rise_rate is not None else None,
+            'voltage_sag': round(voltage_mean - self.last_voltage, 4)
+            if voltage_mean is not None and self.last_voltage is not None else None,
+            'current_deviation': round(current_deviation, 4) if current_deviation is not None else None,
+            'current_std': round(current_std, 4) if current_std is not None else None,
+            'window_readings': self.core_temp.n,
+            'window_span_seconds': round(self.core_temp.span, 3),
+            'readings': self.readings,
+            'last_timestamp': self.last_timestamp
+        }
+
+
+class RollingFeatureEngine:
+    """
+    Rolling temporal features keyed by sensor_id.
+    `windows` maps core_temp / voltage / current to a window length in seconds.
+    """
+
+    def __init__(self, windows):
+        self.windows = dict(windows)
+        self.sensors = {}
+        self.lock = threading.Lock()
+        self.updates = 0
+
+    def _fold(self, reading):
+        """Push one reading into its sensor's windows; caller holds the lock"""
+        timestamp = reading.get('timestamp')
+        if isinstance(timestamp, datetime):
+            t = timestamp.timestamp()
+        elif isinstance(timestamp, (int, float)):
+            t = float(timestamp)
+        else:
+            return None
+        sensor_id = reading.get('sensor_id')
+
+        state = self.sensors.get(sensor_id)
+        if state is None:
+            state = self.sensors[sensor_id] = SensorFeatureState(self.windows)
+
+        core_temp = reading.get('core_temp')
+        voltage = reading.get('voltage')
+        current = reading.get('current')
+        if core_temp is not None:
+            state.core_temp.push(t, core_temp)
+        if voltage is not None:
+            state.voltage.push(t, voltage)
+            state.last_voltage = voltage
+        if current is not None:
+            state.current.push(t, current)
+            state.last_current = current
+        state.last_timestamp = timestamp
+        state.readings += 1
+        self.updates += 1
+        return state
+
+    def update(self, reading):
+        """Fold one reading in; returns the sensor's features after it"""
+        with self.lock:
+            state = self._fold(reading)
+            return state.features() if state else None
+
+    def update_many(self, readings):
+        """Fold a batch of readings in under one lock acquisition"""
+        with self.lock:
+            for reading in readings:
+                self._fold(reading)
+
+    def get(self, sensor_id):
+        """Current features for one sensor, or None if it has not reported"""
+        with self.lock:
+            state = self.sensors.get(sensor_id)
+            return state.features() if state else None
+
+    def snapshot(self):
+        """Current features for every sensor, keyed by sensor_id"""
+        with self.lock:
+            return {sensor_id: state.features() for sensor_id, state in self.sensors.items()}
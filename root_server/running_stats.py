@@ -0,0 +1,188 @@
+"""
+Materialized /data/stats document for the sensor readings collection.
+
+sensor_server folds every batch of inserted readings into one document
+with $inc/$min/$max (count, per-field n/sum/min/max, first and last
+reading), and root_server's /data/stats reads that document instead of
+aggregating the collection.
+
+The document is only ever created from a full aggregation (seed), never
+by an update: an upsert would start it from zero while the collection
+already holds readings. apply_running_stats() therefore updates without
+upsert and seeds when the document is missing; the readings it was given are
+already inserted, so the aggregation counts them.
+
+Readings archived by retention are taken back out with remove_running_stats().
+min/max stay all-time bounds, as they cannot be undone by an update. Readings
+removed by a TTL index are never seen, so with RETENTION_MODE=ttl the counts
+and averages cover every reading ever ingested until a reconcile-stats rebuild.
+"""
+
+# Importing Required Libraries
+from pymongo.errors import DuplicateKeyError
+
+# Standard Libraries
+from datetime import datetime
+
+# Numeric reading fields tracked in the document,
+# mapped to the key each average is reported under by /data/stats
+STATS_FIELDS = {
+    'voltage': 'avg_voltage',
+    'current': 'avg_current',
+    'temperature': 'avg_temperature',
+    'core_temp': 'avg_core_temp',
+    'surface_temp': 'avg_surface_temp',
+    'soc': 'avg_soc',
+    'humidity': 'avg_humidity',
+    'heat_index': 'avg_heat_index',
+    'ambient_temp': 'avg_ambient_temp'
+}
+
+
+def build_stats_update(readings, track_range=True):
+    """
+    Build one $inc/$min/$max update that folds a batch of readings into
+    a stats document (the running stats, or a rollup bucket).
+    With track_range, first/last reading timestamps are kept as well.
+    """
+    inc = {'count': len(readings)}
+    mins = {}
+    maxs = {}
+
+    for reading in readings:
+        for field in STATS_FIELDS:
+            value = reading.get(field)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            inc[f'fields.{field}.n'] = inc.get(f'fields.{field}.n', 0) + 1
+            inc[f'fields.{field}.sum'] = inc.get(
+                f'fields.{field}.sum', 0) + value
+            mins[f'fields.{field}.min'] = min(
+                mins.get(f'fields.{field}.min', value), value)
+            maxs[f'fields.{field}.max'] = max(
+                maxs.get(f'fields.{field}.max', value), value)
+
+        timestamp = reading.get('timestamp')
+        if track_range and isinstance(timestamp, datetime):
+            mins['first_reading'] = min(
+                mins.get('first_reading', timestamp), timestamp)
+            maxs['last_reading'] = max(
+                maxs.get('last_reading', timestamp), timestamp)
+
+    update = {'$inc': inc, '$set': {'updated_at': datetime.utcnow()}}
+    if mins:
+        update['$min'] = mins
+    if maxs:
+        update['$max'] = maxs
+    return update
+
+
+def aggregate_running_stats(collection, key):
+    """
+    Compute the running stats document from scratch with one pass over
+    the readings collection. Used to seed and reconcile the materialized copy.
+    """
+    group = {
+        '_id': None,
+        'count': {'$sum': 1},
+        'first_reading': {'$min': '$timestamp'},
+        'last_reading': {'$max': '$timestamp'}
+    }
+    for field in STATS_FIELDS:
+        numeric = {'$cond': [{'$isNumber': f'${field}'}, 1, 0]}
+        group[f'{field}__n'] = {'$sum': numeric}
+        group[f'{field}__sum'] = {'$sum': f'${field}'}
+        group[f'{field}__min'] = {'$min': f'${field}'}
+        group[f'{field}__max'] = {'$max': f'${field}'}
+
+    result = list(collection.aggregate([{'$group': group}]))
+    totals = result[0] if result else {}
+
+    # Bounds of an empty set are left out rather than stored as null:
+    # null sorts below every number, so a later $min would keep it
+    document = {'_id': key, 'count': totals.get('count', 0), 'fields': {}, 'updated_at': datetime.utcnow()}
+    for name in ('first_reading', 'last_reading'):
+        if totals.get(name) is not None:
+            document[name] = totals[name]
+    for field in STATS_FIELDS:
+        document['fields'][field] = {
+            'n': totals.get(f'{field}__n', 0),
+            'sum': totals.get(f'{field}__sum', 0)
+        }
+        for bound in ('min', 'max'):
+            if totals.get(f'{field}__{bound}') is not None:
+                document['fields'][field][bound] = totals[f'{field}__{bound}']
+    return document
+
+
+def seed_running_stats(stats_collection, collection, key):
+    """
+    Create the stats document from a full aggregation unless it exists;
+    returns the stored document. A concurrent seed or update is never overwritten.
+    """
+    document = stats_collection.find_one({'_id': key})
+    if document is not None:
+        return document
+    document = aggregate_running_stats(collection, key)
+    fields = {name: value for name, value in document.items() if name != '_id'}
+    try:
+        stats_collection.update_one({'_id': key}, {'$setOnInsert': fields}, upsert=True)
+    except DuplicateKeyError:
+        # Another process seeded it between the find and the upsert
+        pass
+    return stats_collection.find_one({'_id': key})
+
+
+def rebuild_running_stats(stats_collection, collection, key):
+    """Replace the stats document with a fresh aggregation"""
+    document = aggregate_running_stats(collection, key)
+    stats_collection.replace_one({'_id': key}, document, upsert=True)
+    return document
+
+
+def apply_running_stats(stats_collection, collection, key, readings):
+    """Fold a batch of inserted readings into the stats document, seeding it if missing"""
+    if not readings:
+        return
+    result = stats_collection.update_one({'_id': key}, build_stats_update(readings))
+    if result.matched_count == 0:
+        seed_running_stats(stats_collection, collection, key)
+
+
+def remove_running_stats(stats_collection, collection, key, readings):
+    """
+    Take deleted readings back out of the stats document's counts and sums,
+    and move first_reading up to the oldest reading left in `collection`.
+    """
+    if not readings:
+        return
+    added = build_stats_update(readings, track_range=False)
+    update = {
+        '$inc': {name: -value for name, value in added['$inc'].items()},
+        '$set': {'updated_at': datetime.utcnow()}
+    }
+    oldest = collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', 1)])
+    if oldest is not None:
+        update['$set']['first_reading'] = oldest['timestamp']
+    else:
+        update['$unset'] = {'first_reading': '', 'last_reading': ''}
+    stats_collection.update_one({'_id': key}, update)
+
+
+def format_running_stats(document):
+    """Shape a running stats document into the /data/stats payload"""
+    fields = document.get('fields', {})
+    stats = {'total_records': document.get('count', 0)}
+
+    for field, key in STATS_FIELDS.items():
+        totals = fields.get(field, {})
+        n = totals.get('n', 0)
+        stats[key] = round(totals.get('sum', 0) / n, 2) if n else 0
+
+    first = document.get('first_reading')
+    last = document.get('last_reading')
+    stats['first_reading'] = first.isoformat() if isinstance(
+        first, datetime) else None
+    stats['last_reading'] = last.isoformat() if isinstance(
+        last, datetime) else None
+    return stats
@@ -1,7 +1,11 @@
 let currentTab = "raw-data",
     autoRefreshInterval = null,
     dataTimerSeconds = 0,
-    mlTimerSeconds = 0;
+    mlTimerSeconds = 0,
+    liveStream = null,
+    streamErrors = 0,
+    latestReadings = [],
+    dataCursor = null;
 function switchTab(e) {
     ((currentTab = e),
         document.querySelectorAll(".tab-btn").forEach((e) => {
@@ -12,20 +16,60 @@ function switchTab(e) {
             e.classList.remove("active");
         }),
         document.getElementById(e).classList.add("active"),
-        autoRefreshInterval && clearInterval(autoRefreshInterval),
         "raw-data" === e
-            ? (fetchData(),
-                fetchStats(),
-                startDataTimer(),
-                (autoRefreshInterval = setInterval(() => {
-                    (fetchData(), fetchStats());
-                }, 5e3)))
-            : "ml-insights" === e &&
-            (fetchMLInsights(),
-                startMLTimer(),
-                (autoRefreshInterval = setInterval(() => {
+            ? (fetchData(), fetchStats(), startDataTimer())
+            : "ml-insights" === e && (fetchMLInsights(), startMLTimer()),
+        liveStream || startPolling());
+}
+function startPolling() {
+    (autoRefreshInterval && clearInterval(autoRefreshInterval),
+        (autoRefreshInterval =
+            "ml-insights" === currentTab
+                ? setInterval(() => {
                     fetchMLInsights();
-                }, 1e4))));
+                }, 1e4)
+                : setInterval(() => {
+                    "raw-data" === currentTab && (fetchData(), fetchStats());
+                }, 5e3)));
+}
+function startLiveStream() {
+    // Push channel: one shared server-side watcher, no per-tab polling.
+    // Falls back to interval polling if the browser or host can't stream.
+    if (!window.EventSource) return !1;
+    ((liveStream = new EventSource("/stream")),
+        liveStream.addEventListener("readings", (e) => {
+            ((streamErrors = 0),
+                (latestReadings = JSON.parse(e.data)
+                    .concat(latestReadings)
+                    .slice(0, 100)),
+                (dataCursor = `${latestReadings[0].timestamp},${latestReadings[0]._id}`),
+                displayDataTable(latestReadings),
+                displayLatestReading(latestReadings[0]),
+                (dataTimerSeconds = 0));
+            const t = document.getElementById("dataStatus");
+            ((t.innerHTML = "<span>●</span><span>Live</span>"),
+                (t.className = "status-badge success"));
+        }),
+        liveStream.addEventListener("stats", (e) => {
+            ((streamErrors = 0), displayStats(JSON.parse(e.data)));
+        }),
+        liveStream.addEventListener("prediction", (e) => {
+            ((streamErrors = 0), renderMLInsights(JSON.parse(e.data)));
+        }),
+        (liveStream.onopen = () => {
+            ((streamErrors = 0),
+                autoRefreshInterval && clearInterval(autoRefreshInterval),
+                (autoRefreshInterval = null));
+        }),
+        (liveStream.onerror = () => {
+            (streamErrors++,
+                (liveStream.readyState === EventSource.CLOSED || streamErrors >= 3) &&
+                (console.warn("Live stream unavailable, falling back to polling"),
+                    liveStream.close(),
+                    (liveStream = null),
+                    startPolling()));
+        }));
+    return !0;
 }
 async function fetchData() {
     const e = document.getElementById("dataTableBody"),
@@ -33,11 +77,18 @@ async function fetchData() {
     ((t.innerHTML = "<span>●</span><span>Loading...</span>"),
         (t.className = "status-badge warning"));
     try {
-        const a = await fetch("/data"),
+        // Incremental poll: only readings newer than the last one we have
+        const a = await fetch(
+            dataCursor ? `/data?since=${encodeURIComponent(dataCursor)}` : "/data",
+        ),
             s = await a.json();
-        s.success && s.data && s.data.length > 0
-            ? (displayDataTable(s.data),
-                displayLatestReading(s.data[0]),
+        if (s.success && dataCursor && s.has_more)
+            return ((dataCursor = null), fetchData());
+        s.success && s.data && (s.data.length > 0 || latestReadings.length > 0)
+            ? ((latestReadings = s.data.concat(dataCursor ? latestReadings : []).slice(0, 100)),
+                s.cursors && s.cursors.since && (dataCursor = s.cursors.since),
+                displayDataTable(latestReadings),
+                displayLatestReading(latestReadings[0]),
                 (t.innerHTML = "<span>●</span><span>Live</span>"),
                 (t.className = "status-badge success"),
                 (dataTimerSeconds = 0))
@@ -68,21 +119,21 @@ async function fetchStats() {
     try {
         const e = await fetch("/data/stats"),
             t = await e.json();
-        if (t.success && t.stats) {
-            const e = t.stats;
-            ((document.getElementById("totalRecords").textContent =
-                e.total_records || 0),
-                (document.getElementById("avgVoltage").innerHTML =
-                    `${formatNumber(e.avg_voltage)}<span class="stat-unit">V</span>`),
-                (document.getElementById("avgCurrent").innerHTML =
-                    `${formatNumber(e.avg_current)}<span class="stat-unit">A</span>`),
-                (document.getElementById("avgTemp").innerHTML =
-                    `${formatNumber(e.avg_temperature)}<span class="stat-unit">°C</span>`));
-        }
+        t.success && t.stats && displayStats(t.stats);
     } catch (e) {
         console.error("Error fetching stats:", e);
     }
 }
+function displayStats(e) {
+    ((document.getElementById("totalRecords").textContent =
+        e.total_records || 0),
+        (document.getElementById("avgVoltage").innerHTML =
+            `${formatNumber(e.avg_voltage)}<span class="stat-unit">V</span>`),
+        (document.getElementById("avgCurrent").innerHTML =
+            `${formatNumber(e.avg_current)}<span class="stat-unit">A</span>`),
+        (document.getElementById("avgTemp").innerHTML =
+            `${formatNumber(e.avg_temperature)}<span class="stat-unit">°C</span>`));
+}
 async function fetchMLInsights() {
     const e = document.getElementById("mlInsightContainer"),
         t = document.getElementById("mlStatus");
@@ -92,7 +143,18 @@ async function fetchMLInsights() {
     try {
         const a = await fetch("/ml/predict"),
             s = await a.json();
-        
+        renderMLInsights(s);
+    } catch (a) {
+        (console.error("Error fetching ML insights:", a),
+            (e.innerHTML = `<div class="no-data"><div class="no-data-icon">⚠️</div><h4>Error Loading ML Insights</h4><p>${a.message}</p></div>`),
+            (t.innerHTML = "<span>●</span><span>Error</span>"),
+            (t.className = "status-badge error"));
+    }
+}
+function renderMLInsights(s) {
+    const e = document.getElementById("mlInsightContainer"),
+        t = document.getElementById("mlStatus");
+    try {
         // Handle empty database
         if (s.empty_database) {
             (e.innerHTML = `<div class="no-data"><div class="no-data-icon">📭</div><h4>Database is Empty</h4><p>${s.message}</p></div>`),
@@ -125,7 +187,7 @@ async function fetchMLInsights() {
             (t.className = "status-badge success"),
             (mlTimerSeconds = 0));
     } catch (a) {
-        (console.error("Error fetching ML insights:", a),
+        (console.error("Error rendering ML insights:", a),
             (e.innerHTML = `<div class="no-data"><div class="no-data-icon">⚠️</div><h4>Error Loading ML Insights</h4><p>${a.message}</p></div>`),
             (t.innerHTML = "<span>●</span><span>Error</span>"),
             (t.className = "status-badge error"));
@@ -254,7 +316,6 @@ document.addEventListener("DOMContentLoaded", () => {
     (fetchData(),
         fetchStats(),
         startDataTimer(),
-        (autoRefreshInterval = setInterval(() => {
-            "raw-data" === currentTab && (fetchData(), fetchStats());
-        }, 5e3)));
+        startPolling(),
+        startLiveStream());
 });
@@ -0,0 +1,188 @@
+"""
+Structured, non-blocking logging.
+
+Events are logged as a name plus key=value fields:
+
+    log = get_logger('sensor')
+    log.info('reading.flushed', readings=500, ms=12.3)
+
+Handlers on the root logger are replaced by a QueueHandler, so the
+calling thread only formats the message and enqueues the record; a
+QueueListener thread does the formatting and stdout I/O. The queue is
+bounded and a full queue drops the record instead of blocking. The
+listener thread is started by the first record, not by configure(), so
+importing an app starts no thread (e.g. before a pre-forking server forks).
+
+Per-item messages go through limited(), which lets at most `per_second`
+records of an event through and reports how many were suppressed on the
+next one. Summary counts totals and logs them with per-second rates
+every `interval` seconds, in place of one line per item.
+"""
+
+# Standard Libraries
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+_listener = None
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    """Start the QueueListener on first use; later calls only check a flag"""
+    global _listener_started
+    if _listener_started:
+        return
+    with _listener_lock:
+        if _listener is not None and not _listener_started:
+            _listener.start()
+            # Write out whatever is still queued on exit
+            atexit.register(_listener.stop)
+            _listener_started = True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full rather than block"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        _start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class EventFormatter(logging.Formatter):
+    """`time LEVEL logger event key=value ...` text, or one JSON object per line"""
+
+    def __init__(self, fmt='text'):
+        super().__init__()
+        self.json = fmt == 'json'
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        if self.json:
+            return json.dumps({'time': timestamp, 'level': record.levelname, 'logger': record.name,
+                               'event': record.getMessage(), **fields}, default=str)
+        line = f"{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure(level='INFO', fmt='text', queue_size=10000):
+    """
+    Route all logging through a bounded queue to a stdout writer thread,
+    started by the first record; safe to call twice
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    if _listener is not None:
+        return
+
+    records = queue.Queue(queue_size)
+    stream = logging.StreamHandler()
+    stream.setFormatter(EventFormatter(fmt))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(records))
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+
+
+class EventLogger:
+    """Logger taking an event name and key=value fields"""
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+        self.limits = {}
+        self.lock = threading.Lock()
+
+    def log(self, level, event, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, event, **fields):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self.log(logging.ERROR, event, **fields)
+
+    def limited(self, level, event, per_second=1.0, **fields):
+        """Log at most `per_second` records of `event`; the next one carries the suppressed count"""
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self.lock:
+            allowed_at, suppressed = self.limits.get(event, (0.0, 0))
+            if per_second <= 0 or now < allowed_at:
+                self.limits[event] = (allowed_at, suppressed + 1)
+                return
+            self.limits[event] = (now + 1 / per_second, 0)
+        if suppressed:
+            fields['suppressed'] = suppressed
+        self.log(level, event, **fields)
+
+
+def get_logger(name):
+    return EventLogger(name)
+
+
+class Summary:
+    """Counters logged with per-second rates every `interval` seconds, then reset"""
+
+    def __init__(self, log, interval=10.0, event='summary'):
+        self.log = log
+        self.interval = interval
+        self.event = event
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    def start(self):
+        """Start the reporting thread once, however many callers race to start it"""
+        with self.lock:
+            if self.interval > 0 and self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def emit(self, elapsed):
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        if not counts:
+            return
+        fields = {'seconds': round(elapsed, 1)}
+        for key, value in sorted(counts.items()):
+            fields[key] = value
+            fields[f"{key}_per_s"] = round(value / elapsed, 2) if elapsed else None
+        if DroppingQueueHandler.dropped:
+            fields['log_dropped'] = DroppingQueueHandler.dropped
+        self.log.info(self.event, **fields)
+
+    def _run(self):
+        last = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            self.emit(now - last)
+            last = now
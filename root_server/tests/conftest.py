@@ -0,0 +1,44 @@
+"""
+Shared fixtures: root_server's app.py imported against an in-process mongomock.
+"""
+
+# Importing Required Libraries
+import mongomock
+import pymongo
+import pytest
+
+# Standard Libraries
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+@pytest.fixture(scope='session')
+def root_app(tmp_path_factory):
+    """app.py imported against mongomock, with no background workers or response caching"""
+    client = mongomock.MongoClient()
+    original = pymongo.MongoClient
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    os.environ.update({
+        'SCORING_WORKER': 'false',
+        'LATEST_TAILER': 'off',
+        'CACHE_TTL_DATA': '0',
+        'CACHE_TTL_LATEST': '0',
+        'LOG_LEVEL': 'ERROR',
+        'PROFILE_DIR': str(tmp_path_factory.mktemp('profiles'))
+    })
+    try:
+        import app
+    finally:
+        pymongo.MongoClient = original
+    return app
+
+
+@pytest.fixture
+def client(root_app):
+    root_app.sensor_collection.delete_many({})
+    for rollup_collection in root_app.rollup_collections.values():
+        rollup_collection.delete_many({})
+    return root_app.app.test_client()
@@ -0,0 +1,30 @@
+"""
+/data query parameter handling.
+
+Run from root_server/: python -m pytest -q tests
+"""
+
+# Standard Libraries
+from datetime import datetime, timedelta
+
+
+def test_limit_must_be_an_integer(client):
+    response = client.get('/data?limit=abc')
+    assert response.status_code == 400
+    assert response.json == {'success': False, 'error': "'limit' must be an integer"}
+
+
+def test_limit_bounds(root_app, client):
+    assert client.get('/data?limit=0').status_code == 400
+    assert client.get(f'/data?limit={root_app.DATA_MAX_LIMIT + 1}').status_code == 400
+
+
+def test_limit_caps_the_page(root_app, client):
+    start = datetime.utcnow() - timedelta(minutes=10)
+    root_app.sensor_collection.insert_many([
+        {'sensor_id': 'battery_001', 'voltage': 3.7, 'timestamp': start + timedelta(seconds=i)}
+        for i in range(5)
+    ])
+    response = client.get('/data?limit=3')
+    assert response.status_code == 200
+    assert response.json['count'] == 3
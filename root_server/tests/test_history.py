@@ -0,0 +1,46 @@
+"""
+/data/history query parameter handling.
+
+Run from root_server/: python -m pytest -q tests
+"""
+
+# Standard Libraries
+from datetime import datetime, timedelta
+
+
+def store_hourly(root_app, start, hours):
+    for i in range(hours):
+        root_app.rollup_collections['1h'].insert_one({
+            'sensor_id': 'battery_001',
+            'start': start + timedelta(hours=i),
+            'count': 60,
+            'fields': {'voltage': {'n': 60, 'sum': 222.0, 'min': 3.5, 'max': 3.9}}
+        })
+
+
+def test_offset_on_one_bound_only_is_converted_to_utc(root_app, client):
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=6)
+    store_hourly(root_app, start, 6)
+
+    # 'from' with an offset, 'to' defaulting to the naive utcnow()
+    response = client.get('/data/history', query_string={
+        'sensor_id': 'battery_001', 'bucket': '1h',
+        'from': (start + timedelta(hours=7)).isoformat() + '+05:00'
+    })
+    assert response.status_code == 200, response.json
+    assert response.json['from'] == (start + timedelta(hours=2)).isoformat()
+    assert len(response.json['points']) == 4
+
+    # 'to' in Z notation against a naive 'from'
+    response = client.get('/data/history', query_string={
+        'sensor_id': 'battery_001', 'bucket': '1h',
+        'from': start.isoformat(), 'to': (start + timedelta(hours=3)).isoformat() + 'Z'
+    })
+    assert response.status_code == 200, response.json
+    assert len(response.json['points']) == 3
+
+
+def test_invalid_timestamp_is_rejected(client):
+    response = client.get('/data/history', query_string={'from': 'yesterday'})
+    assert response.status_code == 400
+    assert response.json['success'] is False
@@ -1,12 +1,29 @@
 # Importing Required Libraries
 from flask import Flask, jsonify
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from bson import ObjectId
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from retention import ARCHIVE_DIR, ARCHIVE_COMPRESSION, ensure_ttl, export_expired, export_expired_buckets
+from ingest import IngestPipeline
+from spool import Spool
+from buckets import BucketCollection, BucketStore
+from running_stats import apply_running_stats, build_stats_update, remove_running_stats, seed_running_stats
+from structured_log import Summary, configure as configure_logging, get_logger
+from profiling import RequestProfiler, db_listeners
+from fast_json import FastJSONProvider
+from fleet import FleetSimulator
+from replay import CsvReplay
+from scheduler import FixedRateScheduler
 
 # Standard Libraries
+import atexit
+import logging
 import os
 import random
+import signal
+import sys
 import time
 import threading
 
@@ -17,22 +34,158 @@ load_dotenv()
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'ev_battery_monitoring')
 COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'battery_sensors')
+STATS_COLLECTION_NAME = os.getenv('STATS_COLLECTION_NAME', 'battery_stats')
 PORT = int(os.getenv('PORT', 5500))
-INTERVAL = int(os.getenv('INTERVAL', 1))  # Interval in seconds
+INTERVAL = float(os.getenv('INTERVAL', 1))  # Interval in seconds, 0.01 or more
+# What happens to ticks missed when generation overruns: 'skip' or 'catch_up'
+SCHEDULE_POLICY = os.getenv('SCHEDULE_POLICY', 'skip')
+# Most missed ticks run back to back under 'catch_up'; older ones are dropped
+SCHEDULE_MAX_CATCH_UP = int(os.getenv('SCHEDULE_MAX_CATCH_UP', 10))
+# Raw reading retention: 'off' (keep forever), 'archive' (export to ARCHIVE_DIR,
+# then delete) or 'ttl' (TTL index, no archive; stats keep counting expired readings)
+RETENTION_MODE = os.getenv('RETENTION_MODE', 'off')
+RAW_RETENTION_DAYS = float(os.getenv('RAW_RETENTION_DAYS', 30))
+# Rollups are kept longer than raw readings; 0 keeps a bucket size forever
+ROLLUP_RETENTION_DAYS = {
+    '1m': float(os.getenv('ROLLUP_RETENTION_DAYS_1M', 90)),
+    '1h': float(os.getenv('ROLLUP_RETENTION_DAYS_1H', 730)),
+    '1d': float(os.getenv('ROLLUP_RETENTION_DAYS_1D', 0))
+}
+# Seconds between archive runs in 'archive' mode
+RETENTION_CHECK_INTERVAL = float(os.getenv('RETENTION_CHECK_INTERVAL', 3600))
+# 'async' queues readings for an asyncio batch writer using insert_many; 'single' uses
+# insert_one. 'bulk', the former buffered writer, is accepted as 'async'
+WRITE_MODE = os.getenv('WRITE_MODE', 'async')
+if WRITE_MODE not in ('async', 'single', 'bulk'):
+    raise ValueError(f"Unknown WRITE_MODE '{WRITE_MODE}', expected async or single")
+# A batch flush happens at BULK_MAX_DOCS readings or after BULK_MAX_MS, whichever is first
+BULK_MAX_DOCS = int(os.getenv('BULK_MAX_DOCS', 500))
+BULK_MAX_MS = float(os.getenv('BULK_MAX_MS', 250))
+# Readings the async ingest queue holds before INGEST_POLICY applies
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 10000))
+# Full-queue backpressure: 'block', 'drop_oldest' or 'sample'
+INGEST_POLICY = os.getenv('INGEST_POLICY', 'block')
+# 'random' generates one reading per INTERVAL; 'fleet' simulates FLEET_SENSORS sensors;
+# 'replay' streams the rows of REPLAY_FILE
+SIMULATION_MODE = os.getenv('SIMULATION_MODE', 'random')
+FLEET_SENSORS = int(os.getenv('FLEET_SENSORS', 1000))
+# Readings per second per sensor in fleet mode (e.g. 10 = every 100 ms)
+FLEET_RATE_HZ = float(os.getenv('FLEET_RATE_HZ', 1))
+# Expected faults per sensor per hour (thermal ramp to runaway, moisture, voltage sag)
+FLEET_FAULT_RATE = float(os.getenv('FLEET_FAULT_RATE', 0.01))
+# Per-sensor calibration drift, °C per sqrt(second)
+FLEET_DRIFT = float(os.getenv('FLEET_DRIFT', 0.02))
+FLEET_SEED = int(os.getenv('FLEET_SEED')) if os.getenv('FLEET_SEED') else None
+# CSV export with ml_server's training columns (Timestamp, CellID, PackVoltage_V, ...)
+REPLAY_FILE = os.getenv('REPLAY_FILE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'ml_server', 'EV_Battery_Charging_5000_Extended.csv'))
+# Multiple of the original Timestamp spacing, 1 to 1000
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', 60))
+# Rows read from the file, and at most written, per batch
+REPLAY_CHUNK_ROWS = int(os.getenv('REPLAY_CHUNK_ROWS', 1000))
+# Stamp readings with the time they are replayed at rather than the original Timestamp
+REPLAY_REBASE = os.getenv('REPLAY_REBASE', 'true').lower() == 'true'
+# Start over at the end of the file
+REPLAY_LOOP = os.getenv('REPLAY_LOOP', 'false').lower() == 'true'
+# 'documents' stores one document per reading; 'buckets' stores readings in
+# COLLECTION_NAME_buckets, one document per sensor per BUCKET_SPAN seconds
+STORAGE_SCHEMA = os.getenv('STORAGE_SCHEMA', 'documents')
+BUCKET_SPAN = int(os.getenv('BUCKET_SPAN', 3600))
+# A full bucket is followed by a new one for the same sensor and window
+BUCKET_MAX_SAMPLES = int(os.getenv('BUCKET_MAX_SAMPLES', 1000))
+# Write concern for reading inserts: w = 0, 1, 2, ... or 'majority'; j = journaled
+WRITE_CONCERN_W = os.getenv('WRITE_CONCERN_W', '1')
+WRITE_CONCERN_J = os.getenv('WRITE_CONCERN_J', 'false').lower() == 'true'
+# Readings that fail to write are spooled to SPOOL_DIR and replayed when MongoDB is back
+SPOOL_ENABLED = os.getenv('SPOOL_ENABLED', 'true').lower() == 'true'
+SPOOL_DIR = os.getenv('SPOOL_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'spool'))
+# Spool segment files are closed at this size (MB)
+SPOOL_SEGMENT_MB = float(os.getenv('SPOOL_SEGMENT_MB', 16))
+# fsync every append (survives power loss, slower)
+SPOOL_FSYNC = os.getenv('SPOOL_FSYNC', 'false').lower() == 'true'
+# Seconds between reachability checks while MongoDB is down
+SPOOL_RETRY_INTERVAL = float(os.getenv('SPOOL_RETRY_INTERVAL', 5))
+# Readings per insert_many when replaying the spool
+SPOOL_REPLAY_BATCH = int(os.getenv('SPOOL_REPLAY_BATCH', 1000))
+# Log level and format ('text' key=value lines or 'json')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# Most per-reading log lines per second; the rest are counted in the summary
+LOG_READINGS_PER_SECOND = float(os.getenv('LOG_READINGS_PER_SECOND', 1))
+# Seconds between summary lines (readings/s, errors); 0 disables them
+LOG_SUMMARY_INTERVAL = float(os.getenv('LOG_SUMMARY_INTERVAL', 10))
+# Server-Timing headers on every response, and profiles of selected requests
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+# Fraction of requests profiled at random; requests with the X-Profile header always are
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+# Required X-Profile header value when set
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+# 'sample' (collapsed stacks for flame graphs) or 'cprofile' (pstats files)
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sample')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Oldest profiles beyond this many are deleted
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+
+# Log records are written to stdout by a background thread
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = get_logger('sensor')
+# Periodic counts of readings generated, written, spooled and errors
+summary = Summary(log, LOG_SUMMARY_INTERVAL)
 
 # Flask App
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+# Installed only when enabled, so disabled profiling adds nothing to a request
+profiler = RequestProfiler(PROFILE_DIR, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_TOKEN,
+                           interval_ms=PROFILE_INTERVAL_MS, max_files=PROFILE_MAX_FILES)
+if PROFILING_ENABLED:
+    profiler.init_app(app)
 
 # Global MongoDB Connection with timeout
 try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000,
+                         event_listeners=db_listeners(PROFILING_ENABLED))
     db = client[DATABASE_NAME]
     sensor_collection = db[COLLECTION_NAME]
+    running_stats_collection = db[STATS_COLLECTION_NAME]
+    # Reading inserts use the configured write concern
+    insert_concern = WriteConcern(
+        w=int(WRITE_CONCERN_W) if WRITE_CONCERN_W.isdigit() else WRITE_CONCERN_W,
+        j=WRITE_CONCERN_J or None)
+    insert_collection = sensor_collection.with_options(write_concern=insert_concern)
+    # Bucketed readings, appended to instead of inserted
+    bucket_collection = db[f'{COLLECTION_NAME}_buckets']
+    bucket_store = BucketStore(bucket_collection.with_options(write_concern=insert_concern),
+                               BUCKET_SPAN, BUCKET_MAX_SAMPLES) if STORAGE_SCHEMA == 'buckets' else None
+    # Readings as documents whatever the schema, for the stats aggregation
+    readings_view = BucketCollection(bucket_collection) if bucket_store else sensor_collection
+    # Per-sensor min/max/avg rollups, one collection per bucket size
+    rollup_collections = {
+        bucket: db[f'{COLLECTION_NAME}_rollup_{bucket}']
+        for bucket in ('1m', '1h', '1d')
+    }
     # Test connection
     client.server_info()
-    print("✓ MongoDB connection successful!")
+    log.info('mongodb.connected', database=DATABASE_NAME, collection=COLLECTION_NAME)
+    for bucket, rollup_collection in rollup_collections.items():
+        rollup_collection.create_index(
+            [('sensor_id', 1), ('start', 1)], unique=True)
+        # Plain index on start, expiring buckets after their retention
+        ensure_ttl(rollup_collection, 'start',
+                   ROLLUP_RETENTION_DAYS[bucket] * 86400)
+    # Raw readings expire by TTL only in 'ttl' mode; otherwise any TTL is removed
+    raw_ttl = RAW_RETENTION_DAYS * 86400 if RETENTION_MODE == 'ttl' else 0
+    if bucket_store:
+        bucket_store.ensure_indexes()
+        # A bucket expires once its newest reading has; the index also serves newest-first reads
+        ensure_ttl(bucket_collection, 'max_ts', raw_ttl)
+    else:
+        ensure_ttl(sensor_collection, 'timestamp', raw_ttl, create_plain=False)
 except Exception as e:
-    print(f"✗ MongoDB connection failed: {e}")
+    log.error('mongodb.connection_failed', error=str(e))
     raise
 
 # Global stats
@@ -43,6 +196,17 @@ stats = {
     'status': 'running'
 }
 
+# Archive runs of the retention thread
+retention_stats = {
+    'last_run': None,
+    'last_cutoff': None,
+    'archived': 0,
+    'deleted': 0,
+    'files': 0,
+    'bytes': 0,
+    'last_error': None
+}
+
 
 def generate_sensor_data():
     """
@@ -65,9 +229,227 @@ def generate_sensor_data():
     }
 
 
+def update_running_stats(readings):
+    """Apply a batch of inserted readings to the running stats document (seeded if missing)"""
+    apply_running_stats(running_stats_collection, readings_view, COLLECTION_NAME, readings)
+
+
+def bucket_start(timestamp, bucket):
+    """Truncate a timestamp to the start of its 1m/1h/1d rollup bucket"""
+    if bucket == '1m':
+        return timestamp.replace(second=0, microsecond=0)
+    if bucket == '1h':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def update_rollup(readings, bucket):
+    """
+    Fold a batch of readings into one rollup collection (1m, 1h or 1d).
+    Readings are grouped per (sensor_id, bucket) first, so each bucket
+    touched costs one upsert regardless of how many readings it received.
+    """
+    groups = {}
+    for reading in readings:
+        timestamp = reading.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            continue
+        key = (reading.get('sensor_id'), bucket_start(timestamp, bucket))
+        groups.setdefault(key, []).append(reading)
+
+    operations = []
+    for (sensor_id, start), group in groups.items():
+        operations.append(UpdateOne(
+            {'sensor_id': sensor_id, 'start': start},
+            build_stats_update(group, track_range=False), upsert=True))
+
+    if operations:
+        rollup_collections[bucket].bulk_write(operations, ordered=False)
+
+
+def update_rollups(readings):
+    """Fold a batch of readings into the 1m/1h/1d rollup collections"""
+    for bucket in rollup_collections:
+        update_rollup(readings, bucket)
+
+
+# Derived updates made for every written batch, in order: the running stats, then each rollup
+DERIVED_STEPS = ('stats', '1m', '1h', '1d')
+
+
+def apply_derived(readings, steps=DERIVED_STEPS):
+    """
+    Apply the derived updates for readings that are already stored.
+    Returns the steps left undone (from the first that failed) and its
+    error, or ((), None); a step is never applied twice here.
+    """
+    for i, step in enumerate(steps):
+        try:
+            if step == 'stats':
+                update_running_stats(readings)
+            else:
+                update_rollup(readings, step)
+        except PyMongoError as e:
+            return tuple(steps[i:]), e
+    return (), None
+
+
+def update_derived(readings, steps=DERIVED_STEPS):
+    """
+    apply_derived, recording the undone steps in the derived spool when one
+    fails. The readings themselves are stored, so they must not go back
+    through the reading spool: a replay would skip them as duplicates and
+    they would never reach the stats or rollups.
+    """
+    if not readings:
+        return
+    undone, error = apply_derived(readings, steps)
+    if not undone:
+        return
+    summary.count('derived_failed', len(readings))
+    if derived_spool is None:
+        log.limited(logging.ERROR, 'derived.failed', readings=len(readings),
+                    steps=','.join(undone), error=str(error))
+        return
+    database_up.clear()
+    derived_spool.append([{'steps': list(undone), 'reading': reading} for reading in readings])
+    log.error('derived.spooled', readings=len(readings), steps=','.join(undone), error=str(error))
+
+
+def assign_ids(readings):
+    """Fix each reading's _id before its first write attempt, so a retry or replay cannot duplicate it"""
+    for reading in readings:
+        if '_id' not in reading:
+            reading['_id'] = ObjectId()
+
+
+def write_readings(readings):
+    """
+    Insert readings (insert_one for one, else one unordered insert_many, or
+    appends to their buckets with STORAGE_SCHEMA=buckets) and fold the ones
+    that were written into the running stats and rollups. Readings already
+    stored under their _id, e.g. on a spool replay, are skipped. Returns
+    the number of readings written. Only a failed insert raises; a failed
+    stats or rollup update is spooled by itself (update_derived).
+    """
+    assign_ids(readings)
+    rejected = []
+    if bucket_store:
+        written, rejected = bucket_store.insert(readings)
+    else:
+        try:
+            if len(readings) == 1:
+                insert_collection.insert_one(readings[0])
+            else:
+                insert_collection.insert_many(readings, ordered=False)
+            written = readings
+        except DuplicateKeyError:
+            written = []
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            failed = {error['index'] for error in errors}
+            written = [reading for i, reading in enumerate(readings) if i not in failed]
+            rejected = [error for error in errors if error.get('code') != 11000]
+    if rejected:
+        summary.count('rejected', len(rejected))
+        log.limited(logging.ERROR, 'readings.rejected', rejected=len(rejected),
+                    readings=len(readings), error=rejected[0].get('errmsg'))
+
+    update_derived(written)
+    stats['total_posted'] += len(written)
+    if written:
+        stats['last_posted'] = written[-1]
+    summary.count('written', len(written))
+    log.limited(logging.DEBUG, 'readings.written', LOG_READINGS_PER_SECOND,
+                readings=len(written), last_id=written[-1]['_id'] if written else None)
+    return len(written)
+
+
+# Write-ahead spool, and whether MongoDB is taking writes (cleared on a failed write)
+spool = Spool(SPOOL_DIR, int(SPOOL_SEGMENT_MB * 1024 * 1024), SPOOL_FSYNC) if SPOOL_ENABLED else None
+# Stored readings whose stats/rollup updates failed, each with the steps still to apply
+derived_spool = Spool(os.path.join(SPOOL_DIR, 'derived'), int(SPOOL_SEGMENT_MB * 1024 * 1024),
+                      SPOOL_FSYNC) if SPOOL_ENABLED else None
+database_up = threading.Event()
+database_up.set()
+
+
+def replay_derived(entries):
+    """
+    Spool.replay write function for the derived spool. Entries whose steps
+    fail again are appended to a new segment with the steps still undone,
+    rather than raising: raising would keep the segment, and steps already
+    applied from it would be applied twice on the next replay.
+    """
+    groups = {}
+    for entry in entries:
+        groups.setdefault(tuple(entry['steps']), []).append(entry['reading'])
+    for steps, readings in groups.items():
+        undone, error = apply_derived(readings, steps) if database_up.is_set() else (steps, None)
+        if undone:
+            if error is not None:
+                database_up.clear()
+                log.error('derived.replay_failed', readings=len(readings), error=str(error))
+            derived_spool.append([{'steps': list(undone), 'reading': reading} for reading in readings])
+    return len(entries)
+
+
+def write_or_spool(readings):
+    """
+    write_readings, spooling the readings instead when MongoDB fails or is
+    known to be down, or while spooled readings are still waiting. Returns
+    the number of readings written to MongoDB.
+    """
+    if spool is None:
+        return write_readings(readings)
+    assign_ids(readings)
+    # Spooled readings got their _ids first; writing newer ones ahead of them
+    # would put them behind the _id watermark of root's tailer and scoring worker
+    if not database_up.is_set() or spool.pending:
+        spool.append(readings)
+        summary.count('spooled', len(readings))
+        return 0
+    try:
+        return write_readings(readings)
+    except PyMongoError as e:
+        database_up.clear()
+        spool.append(readings)
+        summary.count('spooled', len(readings))
+        log.error('mongodb.write_failed', spooled=len(readings), error=str(e))
+        return 0
+
+
+# Fleet simulator state used when SIMULATION_MODE is 'fleet'
+fleet = FleetSimulator(FLEET_SENSORS, FLEET_FAULT_RATE, FLEET_DRIFT, FLEET_SEED) \
+    if SIMULATION_MODE == 'fleet' else None
+
+# CSV replay state used when SIMULATION_MODE is 'replay'
+csv_replay = CsvReplay(REPLAY_FILE, REPLAY_SPEED, REPLAY_CHUNK_ROWS, REPLAY_REBASE, REPLAY_LOOP) \
+    if SIMULATION_MODE == 'replay' else None
+
+# Fleet ticks and replayed rows are always written in batches, through the async pipeline
+writer_mode = 'single' if WRITE_MODE == 'single' and not (fleet or csv_replay) else 'async'
+ingest_writer = IngestPipeline(write_or_spool, INGEST_QUEUE_SIZE, INGEST_POLICY,
+                               BULK_MAX_DOCS, BULK_MAX_MS)
+
+
+def describe_writer():
+    """One-line write mode summary for the startup banners"""
+    if writer_mode == 'single':
+        return "single"
+    return (f"async (flush at {BULK_MAX_DOCS} readings or {BULK_MAX_MS} ms, "
+            f"queue of {INGEST_QUEUE_SIZE}, {INGEST_POLICY} when full)")
+
+# Fixed-rate tick schedule for whichever generator loop runs
+scheduler = FixedRateScheduler(1 / FLEET_RATE_HZ if fleet else INTERVAL,
+                               SCHEDULE_POLICY, SCHEDULE_MAX_CATCH_UP)
+
+
 def auto_sensor_data_system():
     """
-    Continuously generates sensor data one by one and posts to MongoDB every second.
+    Continuously generates sensor data one by one and posts to MongoDB
+    every INTERVAL seconds on a fixed-rate schedule.
+    In 'async' WRITE_MODE readings are queued to the batching writer instead.
     """
     global stats
     stats['start_time'] = datetime.utcnow()
@@ -77,40 +459,160 @@ def auto_sensor_data_system():
     print("="*60)
     print(f"MongoDB URI: {MONGO_URI}")
     print(f"Database: {DATABASE_NAME}")
-    print(f"Collection: {COLLECTION_NAME}")
-    print(f"Interval: {INTERVAL} second(s)")
+    print(f"Collection: {bucket_collection.name if bucket_store else COLLECTION_NAME}")
+    if bucket_store:
+        print(f"Schema: buckets ({BUCKET_SPAN} s windows, {BUCKET_MAX_SAMPLES} readings max)")
+    print(f"Interval: {INTERVAL} second(s), {SCHEDULE_POLICY} on overrun")
+    print(f"Write Mode: {describe_writer()}")
     print("="*60)
-    print("Starting continuous sensor data generation (one per second)...")
+    print(f"Starting continuous sensor data generation (one every {INTERVAL} second(s))...")
     print()
 
     while True:
+        # Sleep until the next tick on the schedule
+        scheduler.wait()
         try:
-            # Generate single sensor data
+            # Generate single sensor data, stamped with its scheduled time
             sensor_data = generate_sensor_data()
+            sensor_data['timestamp'] = scheduler.scheduled_at
 
-            # Print data being posted
-            timestamp = datetime.utcnow().strftime('%H:%M:%S')
-            print(f"[{timestamp}] Posting Data:")
-            print(f"  {sensor_data}")
+            # Sampled: every reading is counted, at most LOG_READINGS_PER_SECOND are logged
+            summary.count('generated')
+            log.limited(logging.INFO, 'reading.generated', LOG_READINGS_PER_SECOND,
+                        sensor_id=sensor_data['sensor_id'], core_temp=sensor_data['core_temp'],
+                        voltage=sensor_data['voltage'], soc=sensor_data['soc'])
 
-            # Insert into MongoDB
-            result = sensor_collection.insert_one(sensor_data)
+            if writer_mode != 'single':
+                # Written by the batching writer's next flush
+                ingest_writer.submit(sensor_data)
+            else:
+                # Insert into MongoDB, or the spool while it is unreachable
+                write_or_spool([sensor_data])
+
+        except Exception as e:
+            summary.count('errors')
+            log.limited(logging.ERROR, 'reading.failed', error=str(e))
 
-            # Update stats
-            stats['total_posted'] += 1
-            stats['last_posted'] = sensor_data
 
-            # Confirm insertion
-            print(
-                f"  ✓ Successfully posted to MongoDB - ID: {result.inserted_id}")
-            print()
+def fleet_data_system():
+    """
+    Simulates FLEET_SENSORS sensors, generating one reading per sensor every
+    1 / FLEET_RATE_HZ seconds in a single vectorized step, and feeds each
+    tick to the batching writer.
+    """
+    stats['start_time'] = datetime.utcnow()
+
+    print("="*60)
+    print("EV Battery Fleet Simulator")
+    print("="*60)
+    print(f"Sensors: {FLEET_SENSORS} at {FLEET_RATE_HZ} Hz "
+          f"({int(FLEET_SENSORS * FLEET_RATE_HZ)} readings/s)")
+    print(f"Fault rate: {FLEET_FAULT_RATE} per sensor-hour")
+    print(f"Write Mode: {describe_writer()}")
+    print("="*60)
 
+    while True:
+        # Skipped ticks still advance the simulation by the time they covered
+        periods = scheduler.wait()
+        try:
+            readings = fleet.tick(scheduler.scheduled_at, periods * scheduler.period)
+            summary.count('generated', len(readings))
+            ingest_writer.submit_many(readings)
         except Exception as e:
-            print(f"[ERROR] Failed to post data: {e}")
-            print()
+            summary.count('errors')
+            log.limited(logging.ERROR, 'fleet.tick_failed', error=str(e))
 
-        # Wait 1 second before next insertion
-        time.sleep(INTERVAL)
+
+def csv_replay_system():
+    """
+    Streams REPLAY_FILE into the batching writer at REPLAY_SPEED times the
+    original Timestamp spacing, once or, with REPLAY_LOOP, continuously.
+    """
+    stats['start_time'] = datetime.utcnow()
+
+    print("="*60)
+    print("EV Battery CSV Replay")
+    print("="*60)
+    print(f"File: {REPLAY_FILE}")
+    print(f"Speed: {REPLAY_SPEED}x, {'rebased to now' if REPLAY_REBASE else 'original timestamps'}"
+          f"{', looping' if REPLAY_LOOP else ''}")
+    print(f"Write Mode: {describe_writer()}")
+    print("="*60)
+
+    def submit(readings):
+        summary.count('generated', len(readings))
+        ingest_writer.submit_many(readings)
+
+    try:
+        csv_replay.run(submit)
+    except Exception as e:
+        summary.count('errors')
+        log.error('replay.failed', path=REPLAY_FILE, error=str(e))
+
+
+def spool_replay_system():
+    """
+    Waits for MongoDB to come back after a failed write, then drains the
+    spool with bulk insert_many. Also drains segments left by an earlier run.
+    New readings keep going to the spool until it is empty, so replays run
+    back to back until then.
+    """
+    while True:
+        if not database_up.is_set():
+            try:
+                client.admin.command('ping')
+                database_up.set()
+                log.info('mongodb.reachable', pending=spool.pending)
+            except PyMongoError:
+                time.sleep(SPOOL_RETRY_INTERVAL)
+                continue
+
+        while spool.pending and database_up.is_set():
+            try:
+                replayed = spool.replay(write_readings, SPOOL_REPLAY_BATCH)
+                log.info('spool.replayed', **replayed)
+            except PyMongoError as e:
+                database_up.clear()
+                log.error('spool.replay_failed', error=str(e))
+
+        if derived_spool.pending and database_up.is_set():
+            replayed = derived_spool.replay(replay_derived, SPOOL_REPLAY_BATCH)
+            log.info('derived.replayed', **replayed)
+
+        time.sleep(SPOOL_RETRY_INTERVAL)
+
+
+def remove_archived_stats(readings):
+    """Take archived and deleted readings back out of the running stats"""
+    remove_running_stats(running_stats_collection, readings_view, COLLECTION_NAME, readings)
+
+
+def retention_system():
+    """
+    Periodically archives raw readings older than RAW_RETENTION_DAYS
+    to ARCHIVE_DIR, deletes them from MongoDB and from the running stats.
+    """
+    while True:
+        cutoff = datetime.utcnow() - timedelta(days=RAW_RETENTION_DAYS)
+        try:
+            if bucket_store:
+                exported = export_expired_buckets(bucket_collection, cutoff, COLLECTION_NAME,
+                                                  on_deleted=remove_archived_stats)
+            else:
+                exported = export_expired(sensor_collection, cutoff, on_deleted=remove_archived_stats)
+            for key in ('archived', 'deleted', 'files', 'bytes'):
+                retention_stats[key] += exported[key]
+            retention_stats['last_error'] = None
+            if exported['archived']:
+                log.info('retention.archived', readings=exported['archived'], before=cutoff.isoformat(),
+                         files=exported['files'], bytes=exported['bytes'])
+        except Exception as e:
+            retention_stats['last_error'] = str(e)
+            log.error('retention.failed', error=str(e))
+        retention_stats['last_run'] = datetime.utcnow().isoformat()
+        retention_stats['last_cutoff'] = cutoff.isoformat()
+
+        time.sleep(RETENTION_CHECK_INTERVAL)
 
 
 @app.route('/', methods=['GET'])
@@ -141,12 +643,40 @@ def server_status():
         'database': {
             'uri': MONGO_URI,
             'database': DATABASE_NAME,
-            'collection': COLLECTION_NAME
+            'collection': bucket_collection.name if bucket_store else COLLECTION_NAME,
+            'schema': STORAGE_SCHEMA,
+            'bucket': {'span_s': BUCKET_SPAN, 'max_samples': BUCKET_MAX_SAMPLES} if bucket_store else None
         },
         'statistics': {
             'total_posted': stats['total_posted'],
             'interval': f"{INTERVAL} second(s)",
             'last_posted': last_data
+        },
+        'schedule': scheduler.metrics(),
+        'writer': {
+            'mode': writer_mode,
+            'write_concern': {'w': WRITE_CONCERN_W, 'j': WRITE_CONCERN_J},
+            **(ingest_writer.metrics() if writer_mode != 'single' else {})
+        },
+        'spool': {
+            'database_up': database_up.is_set(),
+            **spool.metrics(),
+            'derived': derived_spool.metrics()
+        } if spool else None,
+        'fleet': {
+            'rate_hz': FLEET_RATE_HZ,
+            'fault_rate_per_hour': FLEET_FAULT_RATE,
+            **fleet.metrics()
+        } if fleet else None,
+        'csv_replay': csv_replay.metrics() if csv_replay else None,
+        'profiling': profiler.metrics() if PROFILING_ENABLED else None,
+        'retention': {
+            'mode': RETENTION_MODE,
+            'raw_days': RAW_RETENTION_DAYS,
+            'rollup_days': ROLLUP_RETENTION_DAYS,
+            'archive_dir': ARCHIVE_DIR if RETENTION_MODE == 'archive' else None,
+            'compression': ARCHIVE_COMPRESSION if RETENTION_MODE == 'archive' else None,
+            **(retention_stats if RETENTION_MODE == 'archive' else {})
         }
     })
 
@@ -167,19 +697,43 @@ if __name__ == '__main__':
         client.admin.command('ping')
         print("✓ MongoDB connection successful!")
         print()
+        # Seed /data/stats from the readings already stored before adding new ones
+        seed_running_stats(running_stats_collection, readings_view, COLLECTION_NAME)
     except Exception as e:
         print(f"✗ MongoDB connection failed: {e}")
         print("Please check your MONGO_URI in .env file")
         exit(1)
 
+    # Start the batching writer and flush its queue on shutdown
+    if writer_mode != 'single':
+        ingest_writer.start()
+        atexit.register(ingest_writer.close)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    # Log readings/s and error counts instead of every reading
+    summary.start()
+
     # Start sensor data generation in background thread
     sensor_thread = threading.Thread(
-        target=auto_sensor_data_system, daemon=True)
+        target=fleet_data_system if fleet else csv_replay_system if csv_replay else auto_sensor_data_system,
+        daemon=True)
     sensor_thread.start()
 
+    # Replay spooled readings (and spooled stats/rollup updates) once MongoDB is reachable
+    if spool:
+        spool_thread = threading.Thread(target=spool_replay_system, daemon=True)
+        spool_thread.start()
+
+    # Archive and delete expired raw readings in the background
+    if RETENTION_MODE == 'archive' and RAW_RETENTION_DAYS > 0:
+        retention_thread = threading.Thread(
+            target=retention_system, daemon=True)
+        retention_thread.start()
+
     # Start Flask server
     try:
-        app.run(port=PORT, debug=True)
+        # No reloader: its parent process would start a second set of the threads above
+        app.run(port=PORT, debug=True, use_reloader=False)
     except KeyboardInterrupt:
         print("\n" + "="*60)
         print("Sensor data generation stopped by user")
@@ -0,0 +1,470 @@
+"""
+Sensor Server Write Benchmarks
+==============================
+Write throughput of sensor_server ingest paths against MongoDB at
+MONGO_URI, or an in-process mongomock stand-in with --standin. Readings go
+to throwaway *_bench collections that are dropped afterwards.
+
+Usage:
+    python benchmarks.py insert [--readings 20000] [--standin]
+    python benchmarks.py fleet [--sensors 10000] [--ticks 20] [--standin]
+    python benchmarks.py schedule [--interval 0.01] [--seconds 5] [--work-ms 3] [--standin]
+    python benchmarks.py ingest [--rate 2000] [--seconds 5] [--stall 1.5] [--queue 2000] [--standin]
+    python benchmarks.py spool [--readings 20000] [--standin]
+    python benchmarks.py logging [--readings 20000] [--standin]
+    python benchmarks.py storage [--readings 10000000] [--sensors 10000] [--repeat 20] [--standin]
+    python benchmarks.py replay [--readings 20000] [--standin]
+"""
+
+# Standard Libraries
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_SUFFIX = '_bench'
+
+
+def load_app(standin):
+    """Import app.py against the *_bench collections (and mongomock with standin)"""
+    if standin:
+        try:
+            import mongomock
+            import pymongo
+        except ImportError:
+            sys.exit("✗ --standin needs mongomock (pip install mongomock)")
+        client = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *args, **kwargs: client
+
+    # Keep per-flush logging out of the measurement
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['COLLECTION_NAME'] = os.getenv('COLLECTION_NAME', 'battery_sensors') + BENCH_SUFFIX
+    os.environ['STATS_COLLECTION_NAME'] = os.getenv('STATS_COLLECTION_NAME', 'battery_stats') + BENCH_SUFFIX
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as sensor_app
+    return sensor_app
+
+
+def reset_collections(sensor_app):
+    sensor_app.sensor_collection.delete_many({})
+    sensor_app.running_stats_collection.delete_many({})
+    for rollup_collection in sensor_app.rollup_collections.values():
+        rollup_collection.delete_many({})
+
+
+def drop_collections(sensor_app):
+    sensor_app.sensor_collection.drop()
+    sensor_app.bucket_collection.drop()
+    sensor_app.running_stats_collection.drop()
+    for rollup_collection in sensor_app.rollup_collections.values():
+        rollup_collection.drop()
+
+
+def bench_insert(args, sensor_app):
+    """insert_one per reading (WRITE_MODE=single) against the async batch writer"""
+    readings = [sensor_app.generate_sensor_data() for _ in range(args.readings)]
+    results = {'readings': args.readings, 'write_concern': sensor_app.WRITE_CONCERN_W}
+
+    # Current path: one insert_one plus one stats and rollup write per reading
+    reset_collections(sensor_app)
+    started = time.perf_counter()
+    for reading in readings:
+        sensor_app.insert_collection.insert_one(dict(reading))
+        sensor_app.update_running_stats([reading])
+        sensor_app.update_rollups([reading])
+    elapsed = time.perf_counter() - started
+    results['single'] = {
+        'elapsed_s': round(elapsed, 3),
+        'readings_per_s': round(args.readings / elapsed)
+    }
+
+    for max_docs in args.batch_sizes:
+        reset_collections(sensor_app)
+        writer = sensor_app.IngestPipeline(sensor_app.write_readings, args.readings, 'block', max_docs, args.max_ms)
+        writer.start()
+        started = time.perf_counter()
+        for reading in readings:
+            writer.submit(dict(reading))
+        writer.close(timeout=None)
+        elapsed = time.perf_counter() - started
+        metrics = writer.metrics()
+        assert sensor_app.sensor_collection.count_documents({}) == args.readings
+        results[f'async_{max_docs}'] = {
+            'elapsed_s': round(elapsed, 3),
+            'readings_per_s': round(args.readings / elapsed),
+            'speedup': round(results['single']['elapsed_s'] / elapsed, 1),
+            'flushes': metrics['flushes'],
+            'write_latency': metrics['write_latency']
+        }
+    return results
+
+
+def bench_fleet(args, sensor_app):
+    """Fleet simulator generation rate alone, then through the async batch writer"""
+    fleet = sensor_app.FleetSimulator(args.sensors, fault_rate_per_hour=1, seed=42)
+    now = sensor_app.datetime.utcnow()
+
+    started = time.perf_counter()
+    ticks = [fleet.tick(now, 0.1) for _ in range(args.ticks)]
+    generate_elapsed = time.perf_counter() - started
+    readings = args.sensors * args.ticks
+
+    reset_collections(sensor_app)
+    writer = sensor_app.IngestPipeline(sensor_app.write_readings, readings, 'block', args.batch_sizes[-1], args.max_ms)
+    writer.start()
+    started = time.perf_counter()
+    for tick in ticks:
+        writer.submit_many(tick)
+    writer.close(timeout=None)
+    write_elapsed = time.perf_counter() - started
+    assert sensor_app.sensor_collection.count_documents({}) == readings
+
+    return {
+        'sensors': args.sensors,
+        'ticks': args.ticks,
+        'readings': readings,
+        'generate': {
+            'ms_per_tick': round(generate_elapsed / args.ticks * 1000, 2),
+            'readings_per_s': round(readings / generate_elapsed)
+        },
+        'batch_write': {
+            'max_docs': args.batch_sizes[-1],
+            'readings_per_s': round(readings / write_elapsed),
+            'max_sensor_hz': round(readings / write_elapsed / args.sensors, 2)
+        },
+        'fleet': fleet.metrics()
+    }
+
+
+def bench_schedule(args, sensor_app):
+    """sleep(INTERVAL) after each tick's work against the fixed-rate scheduler"""
+    ticks = int(args.seconds / args.interval)
+    # Work varies per tick like generation plus a write with variable latency
+    work = [random.uniform(0, 2 * args.work_ms) / 1000 for _ in range(ticks)]
+    results = {'interval_s': args.interval, 'ticks': ticks, 'avg_work_ms': args.work_ms}
+
+    started = time.monotonic()
+    for seconds in work:
+        time.sleep(seconds)
+        time.sleep(args.interval)
+    elapsed = time.monotonic() - started
+    results['sleep_after_work'] = {
+        'achieved_hz': round(ticks / elapsed, 3),
+        'drift_s': round(elapsed - ticks * args.interval, 3)
+    }
+
+    for policy in ('skip', 'catch_up'):
+        scheduler = sensor_app.FixedRateScheduler(args.interval, policy)
+        started = time.monotonic()
+        for seconds in work:
+            scheduler.wait()
+            time.sleep(seconds)
+        elapsed = time.monotonic() - started
+        metrics = scheduler.metrics()
+        results[policy] = {
+            'achieved_hz': metrics['achieved_hz'],
+            'drift_s': round(elapsed - ticks * args.interval, 3),
+            'missed_ticks': metrics['missed_ticks'],
+            'jitter': metrics['jitter']
+        }
+    return results
+
+
+def bench_ingest(args, sensor_app):
+    """Producer stalls, drops and queue depth per writer while MongoDB stalls mid-run"""
+    chunk = max(1, int(args.rate * 0.01))
+    ticks = int(args.seconds / 0.01)
+    stall_from = args.seconds / 2 - args.stall / 2
+    results = {'rate': chunk * 100, 'seconds': args.seconds,
+               'stall_s': args.stall, 'queue': args.queue}
+
+    writers = {}
+    for policy in ('block', 'drop_oldest', 'sample'):
+        writers[f'async_{policy}'] = lambda write, policy=policy: sensor_app.IngestPipeline(
+            write, args.queue, policy, args.batch_sizes[-1], args.max_ms)
+
+    for name, make_writer in writers.items():
+        reset_collections(sensor_app)
+        started = time.monotonic()
+
+        def stalling_write(readings):
+            # Every write in the stall window hangs until the window ends
+            stall_end = started + stall_from + args.stall
+            if started + stall_from <= time.monotonic() < stall_end:
+                time.sleep(stall_end - time.monotonic())
+            return sensor_app.write_readings(readings)
+
+        writer = make_writer(stalling_write)
+        writer.start()
+        pending = writer.queue
+        scheduler = sensor_app.FixedRateScheduler(0.01)
+        submit_max = 0.0
+        max_queued = 0
+        for _ in range(ticks):
+            scheduler.wait()
+            readings = [sensor_app.generate_sensor_data() for _ in range(chunk)]
+            submitted = time.perf_counter()
+            writer.submit_many(readings)
+            submit_max = max(submit_max, time.perf_counter() - submitted)
+            max_queued = max(max_queued, len(pending))
+        schedule = scheduler.metrics()
+        metrics = writer.metrics()
+        writer.close(timeout=None)
+
+        results[name] = {
+            'producer_hz': schedule['achieved_hz'],
+            'missed_ticks': schedule['missed_ticks'],
+            'max_submit_ms': round(submit_max * 1000, 2),
+            'max_queued': max_queued,
+            'dropped': metrics.get('dropped', 0),
+            'written': sensor_app.sensor_collection.count_documents({}),
+            'write_latency': metrics.get('write_latency')
+        }
+    return results
+
+
+def bench_spool(args, sensor_app):
+    """Spool append rate and size, then replay throughput, and a second replay that is all duplicates"""
+    readings = [sensor_app.generate_sensor_data() for _ in range(args.readings)]
+    sensor_app.assign_ids(readings)
+    reset_collections(sensor_app)
+
+    with tempfile.TemporaryDirectory() as directory:
+        spool = sensor_app.Spool(directory)
+        started = time.perf_counter()
+        for start in range(0, args.readings, 100):
+            spool.append(readings[start:start + 100])
+        append_elapsed = time.perf_counter() - started
+        size = spool.metrics()['bytes']
+        segments = [open(path).read() for path in spool.segments()]
+
+        first = spool.replay(sensor_app.write_readings, args.batch_sizes[-1])
+        for number, content in enumerate(segments, 1):
+            with open(os.path.join(directory, f'segment-{number:08d}.ndjson'), 'w') as segment:
+                segment.write(content)
+        spool.pending = args.readings
+        second = spool.replay(sensor_app.write_readings, args.batch_sizes[-1])
+
+    assert sensor_app.sensor_collection.count_documents({}) == args.readings
+    return {
+        'readings': args.readings,
+        'append': {
+            'readings_per_s': round(args.readings / append_elapsed),
+            'bytes': size,
+            'bytes_per_reading': round(size / args.readings, 1)
+        },
+        'replay': {**first, 'readings_per_s': round(args.readings / first['seconds'])},
+        'replay_again': {**second, 'readings_per_s': round(args.readings / second['seconds'])}
+    }
+
+
+def bench_logging(args, sensor_app):
+    """Per-reading cost of the old three print() lines against a rate-limited event log"""
+    import builtins
+    readings = [sensor_app.generate_sensor_data() for _ in range(args.readings)]
+    results = {'readings': args.readings}
+
+    with tempfile.TemporaryFile('w') as output:
+        started = time.perf_counter()
+        for reading in readings:
+            timestamp = sensor_app.datetime.utcnow().strftime('%H:%M:%S')
+            builtins.print(f"[{timestamp}] Posting Data:", file=output)
+            builtins.print(f"  {reading}", file=output)
+            builtins.print(f"  ✓ Successfully posted to MongoDB - ID: {id(reading)}", file=output)
+        elapsed = time.perf_counter() - started
+    results['print'] = {'us_per_reading': round(elapsed / args.readings * 1e6, 2)}
+
+    sensor_app.logging.getLogger().setLevel(sensor_app.logging.INFO)
+    log = sensor_app.get_logger('bench')
+    summary = sensor_app.Summary(log, interval=0)
+    started = time.perf_counter()
+    for reading in readings:
+        summary.count('generated')
+        log.limited(sensor_app.logging.INFO, 'reading.generated', 1,
+                    sensor_id=reading['sensor_id'], core_temp=reading['core_temp'],
+                    voltage=reading['voltage'], soc=reading['soc'])
+    elapsed = time.perf_counter() - started
+    sensor_app.logging.getLogger().setLevel(sensor_app.logging.WARNING)
+    results['limited_log'] = {'us_per_reading': round(elapsed / args.readings * 1e6, 2),
+                              'speedup': round(results['print']['us_per_reading'] * args.readings / 1e6 / elapsed, 1)}
+    return results
+
+
+def collection_size(db, name):
+    """Document count, data, storage and index bytes from collStats"""
+    try:
+        stats = db.command('collStats', name)
+    except Exception:
+        # mongomock has no collStats
+        return None
+    return {key: stats.get(key) for key in ('count', 'size', 'storageSize', 'totalIndexSize', 'avgObjSize')}
+
+
+def time_query(run, repeat):
+    """p50/max milliseconds of `repeat` runs of a query"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {'p50_ms': round(timings[len(timings) // 2], 2), 'max_ms': round(timings[-1], 2)}
+
+
+def bench_storage(args, sensor_app):
+    """Storage, index size and root_server read latency, one document per reading against buckets"""
+    from buckets import BucketCollection, BucketStore
+
+    # Same indexes root_server and sensor_server create for each schema
+    documents = sensor_app.sensor_collection
+    documents.create_index([('timestamp', -1), ('_id', -1)])
+    store = BucketStore(sensor_app.bucket_collection, sensor_app.BUCKET_SPAN, sensor_app.BUCKET_MAX_SAMPLES)
+    store.ensure_indexes()
+    sensor_app.ensure_ttl(sensor_app.bucket_collection, 'max_ts', 0)
+    buckets = BucketCollection(sensor_app.bucket_collection)
+
+    # Fleet ticks one second apart, written to both schemas in batches as they are generated
+    fleet = sensor_app.FleetSimulator(args.sensors, seed=42)
+    start = sensor_app.datetime(2026, 1, 1)
+    ticks = max(1, args.readings // args.sensors)
+    results = {'readings': ticks * args.sensors, 'sensors': args.sensors,
+               'bucket_span_s': store.span, 'bucket_max_samples': store.max_samples}
+    elapsed = {'documents': 0.0, 'buckets': 0.0}
+    batch_size = args.batch_sizes[-1]
+    middle = None
+    for tick in range(ticks):
+        readings = fleet.tick(start + sensor_app.timedelta(seconds=tick), 1.0)
+        sensor_app.assign_ids(readings)
+        if tick == ticks // 2:
+            middle = readings[0]
+        for offset in range(0, len(readings), batch_size):
+            batch = readings[offset:offset + batch_size]
+            started = time.perf_counter()
+            documents.insert_many([dict(reading) for reading in batch], ordered=False)
+            elapsed['documents'] += time.perf_counter() - started
+            started = time.perf_counter()
+            store.insert(batch)
+            elapsed['buckets'] += time.perf_counter() - started
+
+    newest = sensor_app.datetime(2026, 1, 1) + sensor_app.timedelta(seconds=ticks - 1)
+    cursor = {'$or': [{'timestamp': {'$lt': middle['timestamp']}},
+                      {'timestamp': middle['timestamp'], '_id': {'$lt': middle['_id']}}]}
+    queries = {
+        # /data, /ml/analyse
+        'latest_100': lambda c: list(c.find().sort([('timestamp', -1), ('_id', -1)]).limit(100)),
+        # /data?before=<cursor>
+        'page_before_100': lambda c: list(c.find(cursor).sort([('timestamp', -1), ('_id', -1)]).limit(100)),
+        # /data/latest without the tailer
+        'newest': lambda c: c.find_one(sort=[('timestamp', -1)]),
+        # tailer and scoring worker polls
+        'after_id_1000': lambda c: list(c.find({'_id': {'$gt': middle['_id']}}).sort('_id', 1).limit(1000)),
+        # one sensor's last minute
+        'sensor_last_minute': lambda c: list(c.find({
+            'sensor_id': middle['sensor_id'],
+            'timestamp': {'$gte': newest - sensor_app.timedelta(seconds=60)}})),
+        'count': lambda c: c.count_documents({})
+    }
+
+    for name, collection, raw in (('documents', documents, documents),
+                                  ('buckets', buckets, sensor_app.bucket_collection)):
+        results[name] = {
+            'write_readings_per_s': round(results['readings'] / elapsed[name]),
+            'documents': raw.count_documents({}),
+            'collStats': collection_size(sensor_app.db, raw.name),
+            'queries': {query: time_query(lambda: run(collection), args.repeat) for query, run in queries.items()}
+        }
+        assert collection.count_documents({}) == results['readings']
+
+    sizes = results['documents']['collStats'], results['buckets']['collStats']
+    if all(sizes):
+        results['ratio'] = {key: round(sizes[0][key] / sizes[1][key], 2) if sizes[1][key] else None
+                            for key in ('size', 'storageSize', 'totalIndexSize')}
+    return results
+
+
+def bench_replay(args, sensor_app):
+    """CSV replay rate at 1000x and peak memory, for a file and one four times its size"""
+    import csv
+    import tracemalloc
+    results = {}
+    with open(sensor_app.REPLAY_FILE, newline='', encoding='utf-8') as export:
+        reader = csv.reader(export)
+        header = next(reader)
+        template = next(reader)
+    timestamp_column = header.index('Timestamp')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in (args.readings, args.readings * 4):
+            path = os.path.join(directory, f'replay-{rows}.csv')
+            start = sensor_app.datetime(2025, 9, 3)
+            with open(path, 'w', newline='', encoding='utf-8') as export:
+                writer = csv.writer(export)
+                writer.writerow(header)
+                for row in range(rows):
+                    # One row every 10 ms of original time: 1000x replays them as fast as they parse
+                    template[timestamp_column] = (start + sensor_app.timedelta(milliseconds=10 * row)).isoformat()
+                    writer.writerow(template)
+
+            written = []
+            replay = sensor_app.CsvReplay(path, 1000, sensor_app.REPLAY_CHUNK_ROWS)
+            tracemalloc.start()
+            started = time.perf_counter()
+            replay.run(lambda readings: written.append(len(readings)))
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert sum(written) == rows
+            results[f'{rows}_rows'] = {
+                'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+                'readings_per_s': round(rows / elapsed),
+                'batches': len(written),
+                'peak_memory_mb': round(peak / 1024 / 1024, 2)
+            }
+    return results
+
+
+BENCHMARKS = {
+    'insert': bench_insert,
+    'fleet': bench_fleet,
+    'schedule': bench_schedule,
+    'ingest': bench_ingest,
+    'spool': bench_spool,
+    'logging': bench_logging,
+    'storage': bench_storage,
+    'replay': bench_replay
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('benchmark', choices=list(BENCHMARKS))
+    parser.add_argument('--readings', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=lambda value: [int(v) for v in value.split(',')],
+                        default=[100, 500, 2000], help='BULK_MAX_DOCS values to compare')
+    parser.add_argument('--max-ms', type=float, default=250)
+    parser.add_argument('--sensors', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.01)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--work-ms', type=float, default=3, help='Mean simulated work per tick')
+    parser.add_argument('--rate', type=int, default=2000, help='Readings per second produced')
+    parser.add_argument('--stall', type=float, default=1.5, help='Seconds MongoDB stalls mid-run')
+    parser.add_argument('--queue', type=int, default=2000, help='INGEST_QUEUE_SIZE for the async writers')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query in the storage benchmark')
+    parser.add_argument('--standin', action='store_true',
+                        help='Use an in-process mongomock client instead of MONGO_URI')
+    args = parser.parse_args()
+
+    sensor_app = load_app(args.standin)
+    sensor_app.print = lambda *a, **k: None
+    try:
+        print(json.dumps(BENCHMARKS[args.benchmark](args, sensor_app), indent=2))
+    finally:
+        drop_collections(sensor_app)
+
+
+if __name__ == '__main__':
+    main()
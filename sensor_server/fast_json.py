@@ -0,0 +1,108 @@
+"""
+Fast JSON encoding for Flask responses.
+
+FastJSONProvider replaces Flask's JSON provider so `jsonify` encodes with
+orjson when it is installed (the standard library json module otherwise)
+and handles, without converting anything in Python first:
+
+- datetime and date: ISO 8601 strings
+- bson ObjectId: hex strings
+- NumPy scalars and arrays: numbers and lists
+- pandas DataFrame: a list of records, Series: an index -> value object
+
+DataFrames and Series are encoded by pandas' own C encoder and embedded
+in the output as pre-encoded JSON, so no per-row dicts are built.
+"""
+
+# Standard Libraries
+import json
+import secrets
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from bson import ObjectId
+except ImportError:
+    # ml_server has no MongoDB client
+    ObjectId = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+# orjson 3.9+ embeds pre-encoded JSON itself; otherwise it is spliced in after encoding
+FRAGMENTS = hasattr(orjson, 'Fragment')
+
+# Marks where pre-encoded pandas JSON is spliced in; the nonce keeps it out of real data
+_MARK = f"\x00{secrets.token_hex(8)}:"
+_MARK_ENCODED = json.dumps(_MARK)[1:-1].encode()
+
+
+def pandas_json(value):
+    """JSON text for a pandas DataFrame or Series, None for anything else (pandas is not imported)"""
+    if type(value).__module__.split('.')[0] != 'pandas':
+        return None
+    if type(value).__name__ == 'DataFrame':
+        return value.to_json(orient='records', date_format='iso')
+    if type(value).__name__ == 'Series':
+        return value.to_json(orient='index', date_format='iso')
+    return None
+
+
+def dumps(obj):
+    """Encode obj to JSON bytes"""
+    fragments = []
+
+    def default(value):
+        if ObjectId is not None and isinstance(value, ObjectId):
+            return str(value)
+        fragment = pandas_json(value)
+        if fragment is not None:
+            if FRAGMENTS:
+                return orjson.Fragment(fragment)
+            fragments.append(fragment)
+            return f"{_MARK}{len(fragments) - 1}"
+        if isinstance(value, date):
+            return value.isoformat()
+        if type(value).__module__.split('.')[0] == 'numpy' and hasattr(value, 'tolist'):
+            return value.tolist()
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    if orjson is not None:
+        data = orjson.dumps(obj, default=default, option=OPTIONS)
+    else:
+        data = json.dumps(obj, default=default, separators=(',', ':')).encode()
+
+    for index, fragment in enumerate(fragments):
+        data = data.replace(b'"' + _MARK_ENCODED + str(index).encode() + b'"', fragment.encode(), 1)
+    return data
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps() and loads() above"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # Bytes straight into the response, without a round trip through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,159 @@
+"""
+Vectorized fleet simulator.
+
+Models thousands of battery sensors as NumPy arrays and advances all of
+them in one step per tick:
+
+- SOC charges and discharges, voltage follows SOC minus an I*R sag
+- core temperature relaxes toward ambient plus I^2*R heating
+- humidity and sensor calibration drift as slow random walks
+- faults start at random and play out over several ticks:
+  thermal (a heating ramp that ends in runaway), moisture ingress and
+  voltage sag
+"""
+
+# Importing Required Libraries
+import numpy as np
+
+FAULT_NONE, FAULT_THERMAL, FAULT_MOISTURE, FAULT_SAG = 0, 1, 2, 3
+FAULT_NAMES = {FAULT_THERMAL: 'thermal', FAULT_MOISTURE: 'moisture', FAULT_SAG: 'voltage_sag'}
+
+# Core temperature (°C) at which a thermal fault counts as runaway
+RUNAWAY_TEMP = 120.0
+
+
+class FleetSimulator:
+    """Per-sensor state for a fleet; tick() returns one reading per sensor"""
+
+    def __init__(self, sensors, fault_rate_per_hour=0.01, drift=0.02, seed=None):
+        self.sensors = sensors
+        self.fault_rate = fault_rate_per_hour / 3600
+        self.drift = drift
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+
+        # Same IDs as the single-sensor generator whatever the fleet size; above 999 they just grow
+        self.sensor_ids = [f"battery_{i:03d}" for i in range(1, sensors + 1)]
+        self.locations = [f"cell_pack_{i % 4 + 1}" for i in range(sensors)]
+
+        self.ambient = rng.uniform(18, 28, sensors)
+        self.humidity = rng.uniform(30, 70, sensors)
+        self.soc = rng.uniform(0, 100, sensors)
+        self.charging = rng.random(sensors) < 0.5
+        self.current = rng.uniform(0.5, 3.5, sensors)
+        self.resistance = rng.uniform(0.04, 0.08, sensors)  # Ohm
+        self.core_temp = self.ambient + rng.uniform(5, 15, sensors)
+        self.temp_bias = np.zeros(sensors)
+
+        self.fault = np.zeros(sensors, dtype=np.int8)
+        self.fault_age = np.zeros(sensors)
+        self.fault_ramp = np.zeros(sensors)  # °C/s for thermal faults
+
+        self.ticks = 0
+        self.faults_started = {name: 0 for name in FAULT_NAMES.values()}
+        self.runaways = 0
+
+    def _inject_faults(self, dt):
+        rng = self.rng
+        healthy = self.fault == FAULT_NONE
+        starting = healthy & (rng.random(self.sensors) < self.fault_rate * dt)
+        if not starting.any():
+            return
+        kinds = rng.integers(FAULT_THERMAL, FAULT_SAG + 1, self.sensors)
+        self.fault[starting] = kinds[starting]
+        self.fault_age[starting] = 0
+        # Thermal faults heat 0.5-3 °C per minute at first and accelerate
+        self.fault_ramp[starting] = rng.uniform(0.5, 3, self.sensors)[starting] / 60
+        for kind, name in FAULT_NAMES.items():
+            self.faults_started[name] += int((starting & (kinds == kind)).sum())
+
+    def _advance(self, dt):
+        rng = self.rng
+        n = self.sensors
+
+        # Charge / discharge, flipping direction at the ends
+        self.soc += np.where(self.charging, 1, -1) * self.current * dt / 36
+        self.charging = np.where(self.soc >= 100, False, np.where(self.soc <= 5, True, self.charging))
+        np.clip(self.soc, 0, 100, out=self.soc)
+        self.current = np.clip(self.current + rng.normal(0, 0.05 * np.sqrt(dt), n), 0.5, 3.5)
+
+        # Slow environmental and calibration drift
+        self.humidity = np.clip(self.humidity + rng.normal(0, 0.05 * np.sqrt(dt), n), 20, 98)
+        self.ambient = np.clip(self.ambient + rng.normal(0, 0.01 * np.sqrt(dt), n), 10, 40)
+        self.temp_bias += rng.normal(0, self.drift * np.sqrt(dt), n)
+
+        # Thermal model: relax toward ambient + I^2*R heating (time constant ~2 min)
+        equilibrium = self.ambient + 8 + self.current ** 2 * self.resistance * 40
+        self.core_temp += (equilibrium - self.core_temp) * min(1.0, dt / 120)
+
+        # Fault progression
+        self.fault_age[self.fault != FAULT_NONE] += dt
+        thermal = self.fault == FAULT_THERMAL
+        if thermal.any():
+            # The ramp accelerates as the cell heats (self-heating)
+            self.fault_ramp[thermal] *= 1 + 0.01 * dt
+            self.core_temp[thermal] += self.fault_ramp[thermal] * dt
+        moisture = self.fault == FAULT_MOISTURE
+        if moisture.any():
+            self.humidity[moisture] += (95 - self.humidity[moisture]) * min(1.0, dt / 30)
+
+        # Runaway ends a thermal fault: the cell is replaced and cools down
+        runaway = thermal & (self.core_temp >= RUNAWAY_TEMP)
+        self.runaways += int(runaway.sum())
+        recovered = runaway | ((self.fault != FAULT_THERMAL) & (self.fault_age > 600))
+        if recovered.any():
+            self.fault[recovered] = FAULT_NONE
+            self.core_temp[runaway] = self.ambient[runaway] + 10
+            self.humidity[recovered & moisture] = rng.uniform(30, 70, n)[recovered & moisture]
+
+    def tick(self, timestamp, dt):
+        """Advance every sensor by dt seconds and return one reading per sensor"""
+        rng = self.rng
+        n = self.sensors
+        self._inject_faults(dt)
+        self._advance(dt)
+
+        core_temp = self.core_temp + self.temp_bias + rng.normal(0, 0.1, n)
+        surface_temp = self.ambient + (core_temp - self.ambient) * 0.7 + rng.normal(0, 0.1, n)
+        temperature = surface_temp + rng.normal(0, 0.3, n)
+        humidity = self.humidity + rng.normal(0, 0.2, n)
+        # Simplified heat index: temperature raised by humidity above 40%
+        heat_index = temperature + np.maximum(humidity - 40, 0) * 0.1
+        sag = np.where(self.fault == FAULT_SAG, 0.4, 0.0)
+        voltage = 3.0 + 1.2 * self.soc / 100 - self.current * self.resistance - sag + rng.normal(0, 0.01, n)
+        current = self.current + rng.normal(0, 0.02, n)
+
+        self.ticks += 1
+        columns = zip(
+            self.sensor_ids, self.locations,
+            np.round(humidity, 2).tolist(), np.round(temperature, 2).tolist(),
+            np.round(heat_index, 2).tolist(), np.round(self.ambient, 2).tolist(),
+            np.round(surface_temp, 2).tolist(), np.round(core_temp, 2).tolist(),
+            np.round(voltage, 2).tolist(), np.round(current, 2).tolist(),
+            np.round(self.soc).astype(int).tolist())
+        return [{
+            "sensor_id": sensor_id,
+            "humidity": hum,
+            "temperature": temp,
+            "heat_index": hi,
+            "battery_location": location,
+            "ambient_temp": amb,
+            "surface_temp": surf,
+            "core_temp": core,
+            "voltage": volt,
+            "current": amps,
+            "soc": soc,
+            "timestamp": timestamp
+        } for sensor_id, location, hum, temp, hi, amb, surf, core, volt, amps, soc in columns]
+
+    def metrics(self):
+        """Fleet state for the / status payload"""
+        active = {name: int((self.fault == kind).sum()) for kind, name in FAULT_NAMES.items()}
+        return {
+            'sensors': self.sensors,
+            'ticks': self.ticks,
+            'active_faults': active,
+            'faults_started': dict(self.faults_started),
+            'runaways': self.runaways,
+            'max_core_temp': round(float(self.core_temp.max()), 2)
+        }
@@ -0,0 +1,253 @@
+"""
+Asyncio ingest pipeline for sensor readings.
+
+Producers on any thread submit readings into a bounded queue; a writer
+coroutine on the pipeline's own event loop drains it in batches of up to
+`max_docs` readings, or whatever is queued once the oldest reading has
+waited `max_ms`. The blocking write function runs via asyncio.to_thread,
+so a slow or stalled MongoDB only backs up the queue. What happens when
+the queue is full is the backpressure `policy`:
+
+- block: producers wait for space (generation slows down with the database)
+- drop_oldest: the oldest queued readings are discarded to make room
+- sample: above half full, readings are admitted with a probability that
+  falls linearly to zero at full, so the queue degrades gradually
+
+Batches are written one at a time, in queue order, so readings reach
+MongoDB with ascending _ids for consumers that tail by _id.
+"""
+
+# Importing Required Libraries
+from structured_log import get_logger
+
+# Standard Libraries
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+log = get_logger('ingest')
+
+POLICIES = ('block', 'drop_oldest', 'sample')
+
+
+class IngestPipeline:
+    """Bounded queue plus an async batch writer in front of a write(readings) callable"""
+
+    def __init__(self, write, max_queue=10000, policy='block', max_docs=500, max_ms=250, window=1000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown ingest policy '{policy}', expected block, drop_oldest or sample")
+        self.write = write
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_docs = max_docs
+        self.max_ms = max_ms
+        self.queue = deque()
+        self.oldest_at = None
+        self.condition = threading.Condition()
+        self.closed = False
+        self.loop = None
+        self.wakeup = None
+        self.ready = threading.Event()
+        self.thread = None
+        self.counters = {
+            'submitted': 0,
+            'dropped': 0,
+            'written': 0,
+            'flushes': 0,
+            'failed_batches': 0,
+            'failed_readings': 0
+        }
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self.last_flush = None
+        # Recent batch write latencies in seconds
+        self.latencies = deque(maxlen=window)
+
+    def start(self):
+        """Run the event loop and writer coroutine on a background thread"""
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.ready.wait()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.wakeup = asyncio.Event()
+        self.ready.set()
+        try:
+            self.loop.run_until_complete(self._consume())
+        finally:
+            self.loop.close()
+
+    def _notify(self):
+        """Wake the writer coroutine from any thread"""
+        if self.loop is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.wakeup.set)
+            except RuntimeError:
+                # Loop closed between the check and the call
+                pass
+
+    def submit(self, reading):
+        self.submit_many([reading])
+
+    def submit_many(self, readings):
+        """Queue readings under the backpressure policy"""
+        readings = list(readings)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('IngestPipeline is closed')
+            was_empty = not self.queue
+            self.counters['submitted'] += len(readings)
+
+            if self.policy == 'block':
+                started = None
+                while readings:
+                    space = self.max_queue - len(self.queue)
+                    if space <= 0:
+                        started = started or time.monotonic()
+                        self.condition.wait()
+                        if self.closed:
+                            raise RuntimeError('IngestPipeline is closed')
+                        continue
+                    self.queue.extend(readings[:space])
+                    readings = readings[space:]
+                    if self.oldest_at is None:
+                        self.oldest_at = time.monotonic()
+                    if readings:
+                        # Let the writer start on what is queued while we wait
+                        self._notify()
+                if started is not None:
+                    self.blocked_seconds += time.monotonic() - started
+            elif self.policy == 'drop_oldest':
+                self.queue.extend(readings)
+                excess = len(self.queue) - self.max_queue
+                for _ in range(max(0, excess)):
+                    self.queue.popleft()
+                self.counters['dropped'] += max(0, excess)
+            else:
+                high_water = self.max_queue // 2
+                for reading in readings:
+                    depth = len(self.queue)
+                    if depth >= self.max_queue or (
+                            depth > high_water and
+                            random.random() * (self.max_queue - high_water) >= self.max_queue - depth):
+                        self.counters['dropped'] += 1
+                        continue
+                    self.queue.append(reading)
+
+            if self.queue and self.oldest_at is None:
+                self.oldest_at = time.monotonic()
+            self.max_depth = max(self.max_depth, len(self.queue))
+            wake = was_empty or len(self.queue) >= self.max_docs
+        if wake:
+            self._notify()
+
+    def _take_batch(self):
+        """A batch if the queue is full enough, old enough or closing, else the seconds to wait"""
+        with self.condition:
+            if not self.queue:
+                return None, None
+            waited = time.monotonic() - self.oldest_at
+            if len(self.queue) < self.max_docs and waited * 1000 < self.max_ms and not self.closed:
+                return None, self.max_ms / 1000 - waited
+            batch = [self.queue.popleft() for _ in range(min(self.max_docs, len(self.queue)))]
+            # Readings left behind were queued after the batch's oldest one
+            self.oldest_at = time.monotonic() if self.queue else None
+            self.condition.notify_all()
+            return batch, None
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            written = await asyncio.to_thread(self.write, batch)
+        except Exception as e:
+            with self.condition:
+                self.counters['failed_batches'] += 1
+                self.counters['failed_readings'] += len(batch)
+            log.error('ingest.write_failed', readings=len(batch), error=str(e))
+            return
+        elapsed = time.perf_counter() - started
+        with self.condition:
+            self.counters['written'] += len(batch) if written is None else written
+            self.counters['flushes'] += 1
+            self.latencies.append(elapsed)
+            self.last_flush = {'readings': len(batch), 'ms': round(elapsed * 1000, 2)}
+
+    async def _consume(self):
+        while True:
+            # Cleared before checking so a wakeup during the check is not lost
+            self.wakeup.clear()
+            batch, timeout = self._take_batch()
+            if batch:
+                await self._flush(batch)
+                continue
+            if timeout is None and self.closed:
+                return
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def close(self, timeout=30):
+        """Stop accepting readings and write everything queued"""
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            # Release producers blocked on a full queue
+            self.condition.notify_all()
+        if self.thread is not None:
+            self._notify()
+            self.thread.join(timeout)
+        else:
+            # Never started: write synchronously
+            asyncio.run(self._drain())
+
+    async def _drain(self):
+        while True:
+            batch, _ = self._take_batch()
+            if not batch:
+                return
+            await self._flush(batch)
+
+    def metrics(self):
+        """Queue depth, drops and write latency for the / status payload"""
+        with self.condition:
+            depth = len(self.queue)
+            oldest_at = self.oldest_at
+            latencies = sorted(self.latencies)
+            counters = dict(self.counters)
+            last_flush = self.last_flush
+        flushes = counters['flushes']
+
+        latency = None
+        if latencies:
+            latency = {
+                'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+                'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2)
+            }
+
+        return {
+            'policy': self.policy,
+            'max_docs': self.max_docs,
+            'max_ms': self.max_ms,
+            'queue': {
+                'depth': depth,
+                'capacity': self.max_queue,
+                'fill': round(depth / self.max_queue, 3),
+                'max_depth': self.max_depth,
+                'oldest_age_ms': round((time.monotonic() - oldest_at) * 1000, 1) if depth and oldest_at else None
+            },
+            **counters,
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'avg_batch': round(counters['written'] / flushes, 1) if flushes else None,
+            'write_latency': latency,
+            'last_flush': last_flush
+        }
@@ -0,0 +1,187 @@
+"""
+Historical CSV replay.
+
+Streams rows of an EV battery charging export (the `ml_server` training
+CSVs, or any file with the same columns) into the sensor schema, keeping
+the original spacing between `Timestamp`s divided by a speed factor: at
+60x, a file with one row per minute produces one reading per second.
+
+The file is read lazily, `chunk_rows` rows at a time, so memory use does
+not grow with its size. Rows that are already due are handed to
+`submit` together, so at high speed readings are written in bulk; the
+replay only sleeps when the next row is ahead of schedule.
+
+With `rebase`, readings are stamped with the wall-clock time they were
+replayed at instead of their original timestamp.
+"""
+
+# Importing Required Libraries
+from structured_log import get_logger
+
+# Standard Libraries
+import csv
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+log = get_logger('replay')
+
+MIN_SPEED = 1
+MAX_SPEED = 1000
+# Timestamp formats seen in exports, tried in order after ISO 8601
+TIMESTAMP_FORMATS = ('%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M')
+# Humidity standing in for the MoistureDetected flag; the ML conversion treats > 60 as moisture
+HUMIDITY_MOISTURE = 65.0
+HUMIDITY_DRY = 45.0
+
+
+def parse_timestamp(value):
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, timestamp_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised Timestamp '{value}'")
+
+
+def cell_sensor_id(cell_id):
+    """CELL3 -> battery_003; other IDs are kept as they are"""
+    digits = ''.join(character for character in cell_id if character.isdigit())
+    return f"battery_{int(digits):03d}" if digits else cell_id
+
+
+def row_to_reading(row):
+    """
+    Map one CSV row to a sensor reading. Voltage and current are the
+    inverse of root_server's conversion to the ML schema (pack volts / 100,
+    amps / 10), so replayed readings convert back to the original row.
+    """
+    temperature = float(row['AvgTemp_C'])
+    return {
+        "sensor_id": cell_sensor_id(row['CellID']),
+        "humidity": HUMIDITY_MOISTURE if row['MoistureDetected'].strip().lower() == 'true' else HUMIDITY_DRY,
+        "temperature": temperature,
+        "battery_location": row['ChargerID'],
+        "ambient_temp": float(row['AmbientTemp_C']),
+        "surface_temp": temperature,
+        "core_temp": float(row['MaxTemp_C']),
+        "voltage": round(float(row['PackVoltage_V']) / 100, 4),
+        "current": round(float(row['ChargeCurrent_A']) / 10, 4),
+        "soc": float(row['SOC_%']),
+        "timestamp": parse_timestamp(row['Timestamp'])
+    }
+
+
+class CsvReplay:
+    """Replays a CSV export through submit(readings) at `speed` times real time"""
+
+    def __init__(self, path, speed=1.0, chunk_rows=1000, rebase=True, loop=False):
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"Replay speed {speed} is outside {MIN_SPEED}-{MAX_SPEED}")
+        self.path = path
+        self.speed = speed
+        self.chunk_rows = chunk_rows
+        self.rebase = rebase
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.counters = {'rows': 0, 'submitted': 0, 'skipped': 0, 'batches': 0, 'passes': 0}
+        self.position = None
+        self.lag = 0.0
+        self.started_at = None
+        self.finished = False
+
+    def chunks(self):
+        """Lists of up to chunk_rows readings, read lazily; unparseable rows are skipped"""
+        with open(self.path, newline='', encoding='utf-8') as export:
+            rows = csv.DictReader(export)
+            while True:
+                chunk = list(itertools.islice(rows, self.chunk_rows))
+                if not chunk:
+                    return
+                readings = []
+                for row in chunk:
+                    try:
+                        readings.append(row_to_reading(row))
+                    except (KeyError, TypeError, ValueError) as e:
+                        with self.lock:
+                            self.counters['skipped'] += 1
+                        log.limited(logging.WARNING, 'replay.row_skipped', error=str(e))
+                with self.lock:
+                    self.counters['rows'] += len(chunk)
+                yield readings
+
+    def _submit(self, submit, batch):
+        submit(batch)
+        with self.lock:
+            self.counters['submitted'] += len(batch)
+            self.counters['batches'] += 1
+
+    def run_once(self, submit):
+        """Replay the file once; returns the readings submitted"""
+        origin = None
+        started = time.monotonic()
+        wall_start = datetime.utcnow()
+        batch = []
+        submitted = 0
+        for readings in self.chunks():
+            for reading in readings:
+                if origin is None:
+                    origin = reading['timestamp']
+                # Rows out of order are due immediately
+                offset = max(0.0, (reading['timestamp'] - origin).total_seconds() / self.speed)
+                delay = started + offset - time.monotonic()
+                if delay > 0:
+                    # Ahead of schedule: write what is due, then wait for this row
+                    if batch:
+                        self._submit(submit, batch)
+                        submitted += len(batch)
+                        batch = []
+                    time.sleep(delay)
+                with self.lock:
+                    self.position = reading['timestamp']
+                    self.lag = max(0.0, -delay)
+                if self.rebase:
+                    reading['timestamp'] = wall_start + timedelta(seconds=offset)
+                batch.append(reading)
+                if len(batch) >= self.chunk_rows:
+                    self._submit(submit, batch)
+                    submitted += len(batch)
+                    batch = []
+        if batch:
+            self._submit(submit, batch)
+            submitted += len(batch)
+        return submitted
+
+    def run(self, submit):
+        """Replay the file, over and over with `loop`"""
+        self.started_at = datetime.utcnow()
+        while True:
+            submitted = self.run_once(submit)
+            with self.lock:
+                self.counters['passes'] += 1
+            log.info('replay.pass_finished', path=self.path, readings=submitted, passes=self.counters['passes'])
+            if not self.loop or not submitted:
+                break
+        self.finished = True
+
+    def metrics(self):
+        """Replay progress for the / status payload"""
+        with self.lock:
+            return {
+                'path': self.path,
+                'speed': self.speed,
+                'rebase': self.rebase,
+                'loop': self.loop,
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                **self.counters,
+                'position': self.position.isoformat() if self.position else None,
+                'lag_seconds': round(self.lag, 3),
+                'finished': self.finished
+            }
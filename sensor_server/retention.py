@@ -0,0 +1,356 @@
+"""
+Retention for sensor readings
+=============================
+Raw readings older than the retention window are exported to compressed
+NDJSON archives partitioned by day, then deleted from MongoDB. Rollup
+collections expire through TTL indexes with longer windows per bucket.
+
+Archive layout (one part file per export batch and day):
+    <ARCHIVE_DIR>/<collection>/date=YYYY-MM-DD/part-<first _id>.ndjson.zst|.gz
+
+Documents are written as MongoDB Extended JSON, so _id and timestamp
+round-trip to ObjectId and datetime on replay. With STORAGE_SCHEMA=buckets,
+buckets whose readings have all expired are unpacked into the same
+per-reading archives.
+
+Usage:
+    python retention.py export [--days 30] [--dry-run]
+    python retention.py list
+    python retention.py query --from 2026-01-01 --to 2026-01-02 [--sensor-id battery_003] [--limit 100]
+    python retention.py replay --from 2026-01-01 --to 2026-01-02 [--target battery_sensors_replay]
+"""
+
+# Importing Required Libraries
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson import json_util
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from buckets import BucketCollection, unpack
+from running_stats import remove_running_stats
+
+# Standard Libraries
+import argparse
+import gzip
+import io
+import os
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Load environment variables
+load_dotenv()
+
+# Global Configuration Variables
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'ev_battery_monitoring')
+COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'battery_sensors')
+STATS_COLLECTION_NAME = os.getenv('STATS_COLLECTION_NAME', 'battery_stats')
+# 'documents' (one per reading) or 'buckets' (readings in <collection>_buckets)
+STORAGE_SCHEMA = os.getenv('STORAGE_SCHEMA', 'documents')
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'archive'))
+# zstd needs the zstandard package; gzip is always available
+ARCHIVE_COMPRESSION = os.getenv(
+    'ARCHIVE_COMPRESSION', 'zstd' if zstandard else 'gzip')
+# Raw readings exported and deleted per batch
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 50000))
+
+EXTENSIONS = {'zstd': '.ndjson.zst', 'gzip': '.ndjson.gz'}
+JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+
+
+def open_archive(path, mode, compression=None):
+    """Open a compressed NDJSON part for text 'w' or 'r'; compression defaults to the extension"""
+    compression = compression or ('zstd' if path.endswith('.zst') else 'gzip')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"{path} needs the zstandard package (pip install zstandard)")
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+
+
+def day_directory(archive_dir, collection_name, day):
+    return os.path.join(archive_dir, collection_name, f"date={day.isoformat()}")
+
+
+def write_part(archive_dir, collection_name, day, documents, compression):
+    """
+    Write one day's documents to a part file named after the first _id.
+    The file is written under a temporary name and renamed, so a crash
+    never leaves a truncated part behind.
+    """
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Unknown ARCHIVE_COMPRESSION '{compression}', expected zstd or gzip")
+    directory = day_directory(archive_dir, collection_name, day)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{documents[0]['_id']}{EXTENSIONS[compression]}")
+    temporary = path + '.tmp'
+    with open_archive(temporary, 'w', compression) as part:
+        for document in documents:
+            part.write(json_util.dumps(document, json_options=JSON_OPTIONS))
+            part.write('\n')
+    os.replace(temporary, path)
+    return path
+
+
+def export_expired(collection, cutoff, archive_dir=ARCHIVE_DIR, compression=ARCHIVE_COMPRESSION,
+                   batch_size=ARCHIVE_BATCH_SIZE, delete=True, on_deleted=None):
+    """
+    Archive readings with a timestamp before `cutoff`, oldest _id first,
+    and delete each batch once its part files are on disk. Re-running after
+    a crash rewrites the same part names, so nothing is archived twice.
+    `on_deleted` is called with the readings each batch actually deleted.
+    """
+    summary = {'archived': 0, 'deleted': 0, 'files': 0, 'bytes': 0, 'days': set()}
+    last_id = None
+    while True:
+        query = {'timestamp': {'$lt': cutoff}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(collection.find(query).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        archive_batch(batch, archive_dir, collection.name, compression, summary)
+
+        if delete:
+            result = collection.delete_many({'_id': {'$in': [d['_id'] for d in batch]}})
+            summary['deleted'] += result.deleted_count
+            # A shortfall means another export run deleted part of the batch
+            # at the same time; the stats are then left to reconcile-stats
+            if on_deleted and result.deleted_count == len(batch):
+                on_deleted(batch)
+
+    summary['days'] = sorted(summary['days'])
+    return summary
+
+
+def export_expired_buckets(collection, cutoff, collection_name, archive_dir=ARCHIVE_DIR,
+                           compression=ARCHIVE_COMPRESSION, batch_size=ARCHIVE_BATCH_SIZE, delete=True,
+                           on_deleted=None):
+    """
+    export_expired for the bucketed schema: buckets whose newest reading is
+    before `cutoff` are unpacked and archived as readings under
+    `collection_name`, then deleted. A bucket straddling the cutoff is kept
+    until all of its readings have expired. `on_deleted` is called with the
+    readings of the buckets each batch actually deleted.
+    """
+    summary = {'archived': 0, 'deleted': 0, 'files': 0, 'bytes': 0, 'days': set()}
+    # Reading count of each bucket in the batch, and where its readings sit in it
+    counts = {}
+    spans = {}
+    batch = []
+
+    def flush():
+        if batch:
+            archive_batch(batch, archive_dir, collection_name, compression, summary)
+            if delete:
+                # A bucket that took a late append since it was read stays for the next run
+                collection.delete_many({'$or': [{'_id': bucket_id, 'count': count}
+                                                for bucket_id, count in counts.items()]})
+                kept = {bucket['_id'] for bucket in collection.find({'_id': {'$in': list(counts)}}, {'_id': 1})}
+                summary['deleted'] += sum(count for bucket_id, count in counts.items() if bucket_id not in kept)
+                if on_deleted:
+                    deleted = [reading for bucket_id, (start, end) in spans.items() if bucket_id not in kept
+                               for reading in batch[start:end]]
+                    if deleted:
+                        on_deleted(deleted)
+        counts.clear()
+        spans.clear()
+        batch.clear()
+
+    for bucket in collection.find({'max_ts': {'$lt': cutoff}}).sort('max_id', 1):
+        counts[bucket['_id']] = bucket['count']
+        start = len(batch)
+        batch.extend(unpack(bucket))
+        spans[bucket['_id']] = (start, len(batch))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    summary['days'] = sorted(summary['days'])
+    return summary
+
+
+def archive_batch(batch, archive_dir, collection_name, compression, summary):
+    """Write a batch of readings as one part file per day and add it to an export summary"""
+    by_day = {}
+    for document in batch:
+        by_day.setdefault(document['timestamp'].date(), []).append(document)
+    for day, documents in sorted(by_day.items()):
+        path = write_part(archive_dir, collection_name, day, documents, compression)
+        summary['files'] += 1
+        summary['bytes'] += os.path.getsize(path)
+        summary['days'].add(day.isoformat())
+    summary['archived'] += len(batch)
+
+
+def archive_parts(archive_dir, collection_name, start=None, end=None):
+    """Part file paths for days in [start, end), oldest first"""
+    root = os.path.join(archive_dir, collection_name)
+    if not os.path.isdir(root):
+        return []
+    paths = []
+    for name in sorted(os.listdir(root)):
+        if not name.startswith('date='):
+            continue
+        day = datetime.fromisoformat(name[len('date='):])
+        if (start and day < datetime(start.year, start.month, start.day)) or (end and day >= end):
+            continue
+        directory = os.path.join(root, name)
+        paths.extend(os.path.join(directory, part) for part in sorted(os.listdir(directory))
+                     if part.startswith('part-') and not part.endswith('.tmp'))
+    return paths
+
+
+def iter_archive(archive_dir, collection_name, start=None, end=None, sensor_id=None):
+    """Yield archived readings in [start, end), optionally for one sensor"""
+    for path in archive_parts(archive_dir, collection_name, start, end):
+        with open_archive(path, 'r') as part:
+            for line in part:
+                document = json_util.loads(line, json_options=JSON_OPTIONS)
+                timestamp = document.get('timestamp')
+                if start and timestamp < start:
+                    continue
+                if end and timestamp >= end:
+                    continue
+                if sensor_id and document.get('sensor_id') != sensor_id:
+                    continue
+                yield document
+
+
+def replay(documents, collection, batch_size=5000):
+    """Insert archived readings back, keeping their _ids; existing ones are skipped"""
+    inserted = 0
+    batch = []
+
+    def flush():
+        try:
+            return len(collection.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get('nInserted', 0)
+
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            inserted += flush()
+            batch = []
+    if batch:
+        inserted += flush()
+    return inserted
+
+
+def ensure_ttl(collection, field, seconds, create_plain=True):
+    """
+    Make the single-field ascending index on `field` expire documents after
+    `seconds`. 0 turns expiry off, leaving a plain index (created only if
+    `create_plain`), so a stale TTL can never delete unarchived readings.
+    """
+    seconds = int(seconds)
+    existing = next((index for index in collection.list_indexes()
+                     if dict(index['key']) == {field: 1}), None)
+    if existing is None:
+        if seconds:
+            collection.create_index([(field, 1)], expireAfterSeconds=seconds)
+        elif create_plain:
+            collection.create_index([(field, 1)])
+        return
+
+    current = existing.get('expireAfterSeconds')
+    if (seconds and current == seconds) or (not seconds and current is None):
+        return
+    if seconds:
+        try:
+            collection.database.command('collMod', collection.name, index={
+                'name': existing['name'], 'expireAfterSeconds': seconds})
+            return
+        except OperationFailure:
+            # Servers before 5.1 cannot turn a plain index into a TTL one
+            pass
+    collection.drop_index(existing['name'])
+    if seconds:
+        collection.create_index([(field, 1)], expireAfterSeconds=seconds)
+    else:
+        collection.create_index([(field, 1)])
+
+
+def parse_day(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    export = subcommands.add_parser('export', help='Archive and delete readings older than --days')
+    export.add_argument('--days', type=float, default=float(os.getenv('RAW_RETENTION_DAYS', 30)))
+    export.add_argument('--dry-run', action='store_true', help='Write archives but keep the readings')
+
+    subcommands.add_parser('list', help='Archived days with part count and size')
+
+    for name in ('query', 'replay'):
+        command = subcommands.add_parser(name)
+        command.add_argument('--from', dest='start', type=parse_day)
+        command.add_argument('--to', dest='end', type=parse_day)
+        command.add_argument('--sensor-id')
+        if name == 'query':
+            command.add_argument('--limit', type=int)
+        else:
+            command.add_argument('--target', default=f'{COLLECTION_NAME}_replay',
+                                 help='Collection to insert into')
+
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--collection', default=COLLECTION_NAME)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        root = os.path.join(args.archive_dir, args.collection)
+        for path in archive_parts(args.archive_dir, args.collection):
+            print(f"{os.path.relpath(path, root)}\t{os.path.getsize(path)} bytes")
+        return
+
+    if args.command == 'query':
+        documents = iter_archive(args.archive_dir, args.collection, args.start, args.end, args.sensor_id)
+        for count, document in enumerate(documents):
+            if args.limit is not None and count >= args.limit:
+                break
+            sys.stdout.write(json_util.dumps(document, json_options=JSON_OPTIONS) + '\n')
+        return
+
+    db = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)[DATABASE_NAME]
+    if args.command == 'export':
+        cutoff = datetime.utcnow() - timedelta(days=args.days)
+        if STORAGE_SCHEMA == 'buckets':
+            collection = db[f'{args.collection}_buckets']
+            readings_view = BucketCollection(collection)
+        else:
+            collection = readings_view = db[args.collection]
+
+        def on_deleted(readings):
+            remove_running_stats(db[STATS_COLLECTION_NAME], readings_view, args.collection, readings)
+
+        if STORAGE_SCHEMA == 'buckets':
+            summary = export_expired_buckets(collection, cutoff, args.collection, args.archive_dir,
+                                             delete=not args.dry_run, on_deleted=on_deleted)
+        else:
+            summary = export_expired(collection, cutoff, args.archive_dir, delete=not args.dry_run,
+                                     on_deleted=on_deleted)
+        print(f"✓ Archived {summary['archived']} readings before {cutoff.isoformat()} "
+              f"into {summary['files']} part(s), {summary['bytes']} bytes; deleted {summary['deleted']}")
+    elif args.command == 'replay':
+        documents = iter_archive(args.archive_dir, args.collection, args.start, args.end, args.sensor_id)
+        inserted = replay(documents, db[args.target])
+        print(f"✓ Replayed {inserted} readings into {args.target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Drift-free fixed-rate scheduler.
+
+Ticks are due on a fixed grid `start + n * period` of the monotonic clock,
+so time spent generating and writing a reading does not stretch the
+period, and lateness on one tick never carries into the next.
+
+When a tick's work overruns and whole periods go by, `policy` decides
+what happens to them:
+
+- skip: jump to the next grid point still ahead; the periods in between
+  are counted as missed and wait() reports how many elapsed
+- catch_up: run the missed ticks back to back, without sleeping, until
+  the schedule is caught up; a backlog of more than `max_catch_up` ticks
+  is dropped and counted as missed
+"""
+
+# Standard Libraries
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# Shortest supported period in seconds
+MIN_PERIOD = 0.01
+POLICIES = ('skip', 'catch_up')
+
+
+class FixedRateScheduler:
+    """Sleeps until the next tick of a fixed-rate monotonic schedule"""
+
+    def __init__(self, period, policy='skip', max_catch_up=10, window=1000):
+        if period < MIN_PERIOD:
+            raise ValueError(f"Period {period}s is below the {MIN_PERIOD}s minimum")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduler policy '{policy}', expected skip or catch_up")
+        self.period = period
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.lock = threading.Lock()
+
+        self.next_due = None
+        self.started_at = None
+        self.wall_origin = None
+        self.scheduled_at = None
+        self.ticks = 0
+        self.missed = 0
+        self.caught_up = 0
+        self.overruns = 0
+        self.last_wake = None
+        # Recent tick wake times and lateness (seconds) for rate and jitter
+        self.wakes = deque(maxlen=window)
+        self.lateness = deque(maxlen=window)
+
+    def _start(self):
+        now = time.monotonic()
+        self.started_at = self.next_due = now
+        self.wall_origin = datetime.utcnow()
+
+    def wait(self):
+        """
+        Block until the next tick is due and return the number of periods
+        it covers: 1 on schedule, more after skipped ticks.
+        `scheduled_at` is set to the tick's due time as a UTC datetime.
+        """
+        if self.next_due is None:
+            self._start()
+        else:
+            self.next_due += self.period
+
+        now = time.monotonic()
+        periods = 1
+        behind = int((now - self.next_due) / self.period)
+        with self.lock:
+            # The previous tick's work took longer than a period
+            if self.last_wake is not None and now - self.last_wake > self.period:
+                self.overruns += 1
+            if behind > 0:
+                if self.policy == 'skip':
+                    self.missed += behind
+                    periods += behind
+                    self.next_due += behind * self.period
+                else:
+                    if behind > self.max_catch_up:
+                        dropped = behind - self.max_catch_up
+                        self.missed += dropped
+                        self.next_due += dropped * self.period
+                    self.caught_up += 1
+
+        delay = self.next_due - now
+        if delay > 0:
+            time.sleep(delay)
+            now = time.monotonic()
+
+        with self.lock:
+            self.ticks += 1
+            self.last_wake = now
+            self.wakes.append(now)
+            self.lateness.append(max(0.0, now - self.next_due))
+        self.scheduled_at = self.wall_origin + timedelta(seconds=self.next_due - self.started_at)
+        return periods
+
+    def metrics(self):
+        """Target and achieved rate, jitter and missed ticks for the / status payload"""
+        with self.lock:
+            wakes = list(self.wakes)
+            lateness = sorted(self.lateness)
+            ticks, missed = self.ticks, self.missed
+            caught_up, overruns = self.caught_up, self.overruns
+
+        achieved_hz = None
+        if len(wakes) > 1 and wakes[-1] > wakes[0]:
+            achieved_hz = round((len(wakes) - 1) / (wakes[-1] - wakes[0]), 3)
+
+        jitter = None
+        if lateness:
+            jitter = {
+                'mean_ms': round(sum(lateness) / len(lateness) * 1000, 3),
+                'p50_ms': round(lateness[len(lateness) // 2] * 1000, 3),
+                'p99_ms': round(lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))] * 1000, 3),
+                'max_ms': round(lateness[-1] * 1000, 3)
+            }
+
+        return {
+            'period_s': self.period,
+            'target_hz': round(1 / self.period, 3),
+            'achieved_hz': achieved_hz,
+            'policy': self.policy,
+            'ticks': ticks,
+            'missed_ticks': missed,
+            'caught_up_ticks': caught_up,
+            'overruns': overruns,
+            'jitter': jitter
+        }
@@ -0,0 +1,152 @@
+"""
+Local write-ahead spool for readings MongoDB could not take.
+
+Readings are appended as MongoDB Extended JSON lines to numbered,
+append-only segment files:
+    <SPOOL_DIR>/segment-00000001.ndjson
+
+A segment is closed once it reaches `segment_bytes`. replay() seals the
+active segment, then feeds each segment, oldest first, to a write
+function in batches and deletes it once fully written. Readings keep
+the _id they were given before their first write attempt, so replaying a
+segment twice (after a crash, or when a timed-out write did land) cannot
+duplicate them.
+"""
+
+# Importing Required Libraries
+from bson import json_util
+
+# Standard Libraries
+import os
+import threading
+import time
+
+JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.ndjson'
+
+
+class Spool:
+    """Segmented append-only NDJSON spool with bulk replay"""
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.active = None
+        self.active_path = None
+
+        segments = self.segments()
+        self.next_sequence = self._sequence(segments[-1]) + 1 if segments else 1
+        # Readings waiting in segments left by an earlier run
+        self.pending = sum(self._count_lines(path) for path in segments)
+        self.counters = {'spooled': 0, 'replayed': 0, 'skipped': 0, 'corrupt': 0}
+        self.last_replay = None
+
+    @staticmethod
+    def _sequence(path):
+        return int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    @staticmethod
+    def _count_lines(path):
+        with open(path, 'rb') as segment:
+            return sum(1 for _ in segment)
+
+    def segments(self):
+        """Segment paths, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _seal(self):
+        """Close the active segment; the next append starts a new one. Caller holds the lock"""
+        if self.active is not None:
+            self.active.close()
+            self.active = self.active_path = None
+
+    def append(self, readings):
+        """Append readings to the active segment, starting a new one when it is full"""
+        lines = ''.join(json_util.dumps(reading, json_options=JSON_OPTIONS) + '\n' for reading in readings)
+        with self.lock:
+            if self.active is None:
+                # Created on first use, so a read-only deployment never touches it
+                os.makedirs(self.directory, exist_ok=True)
+                self.active_path = os.path.join(
+                    self.directory, f"{SEGMENT_PREFIX}{self.next_sequence:08d}{SEGMENT_SUFFIX}")
+                self.next_sequence += 1
+                self.active = open(self.active_path, 'a', encoding='utf-8')
+            self.active.write(lines)
+            self.active.flush()
+            if self.fsync:
+                os.fsync(self.active.fileno())
+            self.pending += len(readings)
+            self.counters['spooled'] += len(readings)
+            if self.active.tell() >= self.segment_bytes:
+                self._seal()
+
+    def _read_segment(self, path):
+        """Readings in a segment and its line count"""
+        readings = []
+        lines = 0
+        with open(path, 'r', encoding='utf-8') as segment:
+            for line in segment:
+                lines += 1
+                try:
+                    readings.append(json_util.loads(line, json_options=JSON_OPTIONS))
+                except ValueError:
+                    # A torn last line from a crash mid-append
+                    self.counters['corrupt'] += 1
+        return readings, lines
+
+    def replay(self, write, batch_size=1000):
+        """
+        Write every spooled reading with write(batch), which returns how many
+        it inserted. Segments are deleted once written; an exception from
+        write stops the replay and leaves the current segment for next time.
+        """
+        started = time.perf_counter()
+        replayed = skipped = 0
+        with self.lock:
+            self._seal()
+            segments = self.segments()
+
+        try:
+            for path in segments:
+                readings, lines = self._read_segment(path)
+                for start in range(0, len(readings), batch_size):
+                    batch = readings[start:start + batch_size]
+                    written = write(batch)
+                    replayed += written
+                    skipped += len(batch) - written
+                os.remove(path)
+                with self.lock:
+                    self.pending = max(0, self.pending - lines)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.counters['replayed'] += replayed
+                self.counters['skipped'] += skipped
+                if replayed or skipped:
+                    self.last_replay = {
+                        'readings': replayed,
+                        'skipped': skipped,
+                        'seconds': round(elapsed, 3),
+                        'readings_per_s': round((replayed + skipped) / elapsed) if elapsed else None,
+                        'at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+                    }
+        return {'replayed': replayed, 'skipped': skipped, 'seconds': round(elapsed, 3)}
+
+    def metrics(self):
+        """Spool size and replay counters for the / status payload"""
+        with self.lock:
+            segments = self.segments()
+            return {
+                'directory': self.directory,
+                'segments': len(segments),
+                'bytes': sum(os.path.getsize(path) for path in segments),
+                'pending': self.pending,
+                **self.counters,
+                'last_replay': self.last_replay
+            }
@@ -0,0 +1,44 @@
+"""
+Shared fixtures: sensor_server's app.py imported against an in-process mongomock.
+"""
+
+# Importing Required Libraries
+import mongomock
+import pymongo
+import pytest
+
+# Standard Libraries
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+@pytest.fixture(scope='session')
+def sensor_app(tmp_path_factory):
+    """app.py imported against mongomock with the synchronous write path"""
+    client = mongomock.MongoClient()
+    original = pymongo.MongoClient
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    os.environ.update({
+        'WRITE_MODE': 'single',
+        'SPOOL_ENABLED': 'false',
+        'RETENTION_MODE': 'off',
+        'LOG_LEVEL': 'ERROR',
+        'PROFILE_DIR': str(tmp_path_factory.mktemp('profiles'))
+    })
+    try:
+        import app
+    finally:
+        pymongo.MongoClient = original
+    return app
+
+
+@pytest.fixture
+def collections(sensor_app):
+    sensor_app.sensor_collection.delete_many({})
+    sensor_app.running_stats_collection.delete_many({})
+    for rollup_collection in sensor_app.rollup_collections.values():
+        rollup_collection.delete_many({})
+    return sensor_app
@@ -0,0 +1,152 @@
+"""
+The running stats document maintained by write_readings must match a full
+aggregation of the readings collection, against an in-process mongomock.
+
+Run from sensor_server/: python -m pytest -q tests
+"""
+
+# Importing Required Libraries
+import pytest
+
+from running_stats import aggregate_running_stats, format_running_stats, seed_running_stats
+
+# Standard Libraries
+from datetime import datetime, timedelta
+
+# Recent enough that no rollup TTL expires the test readings
+START = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+
+
+def readings(count, start=START):
+    batch = []
+    for i in range(count):
+        reading = {
+            'sensor_id': f'battery_{i % 5 + 1:03d}',
+            'battery_location': f'cell_pack_{i % 4 + 1}',
+            'voltage': round(3.0 + (i % 12) / 10, 2),
+            'current': round(0.5 + (i % 30) / 10, 2),
+            'temperature': round(20 + (i * 7) % 30 + 0.25, 2),
+            'core_temp': round(30 + (i * 3) % 20 + 0.5, 2),
+            'surface_temp': round(25 + (i * 5) % 20, 2),
+            'soc': i % 101,
+            'humidity': round(30 + (i * 11) % 40 + 0.1, 2),
+            'heat_index': round(22 + (i * 13) % 33, 2),
+            'ambient_temp': round(18 + (i % 10), 2),
+            'timestamp': start + timedelta(seconds=i)
+        }
+        # Readings without a field are counted but not averaged
+        if i % 17 == 0:
+            del reading['humidity']
+        batch.append(reading)
+    return batch
+
+
+def assert_matches_aggregation(sensor_app):
+    stored = sensor_app.running_stats_collection.find_one({'_id': sensor_app.COLLECTION_NAME})
+    expected = aggregate_running_stats(sensor_app.readings_view, sensor_app.COLLECTION_NAME)
+    assert stored is not None
+    assert stored['count'] == expected['count']
+    assert stored.get('first_reading') == expected.get('first_reading')
+    assert stored.get('last_reading') == expected.get('last_reading')
+    for field, totals in expected['fields'].items():
+        assert stored['fields'][field]['n'] == totals['n'], field
+        assert stored['fields'][field]['sum'] == pytest.approx(totals['sum']), field
+        assert stored['fields'][field].get('min') == totals.get('min'), field
+        assert stored['fields'][field].get('max') == totals.get('max'), field
+    assert format_running_stats(stored) == format_running_stats(expected)
+
+
+def test_batches_and_single_readings_match_aggregation(collections):
+    batch = readings(250)
+    collections.write_readings(batch[:1])
+    collections.write_readings(batch[1:100])
+    for reading in batch[100:110]:
+        collections.write_readings([reading])
+    collections.write_readings(batch[110:])
+    assert_matches_aggregation(collections)
+
+
+def test_missing_document_is_seeded_from_existing_readings(collections):
+    # Readings stored before the stats document existed, as on an upgrade
+    collections.sensor_collection.insert_many(readings(300))
+    collections.write_readings(readings(40, start=START + timedelta(hours=2)))
+    assert collections.running_stats_collection.find_one()['count'] == 340
+    assert_matches_aggregation(collections)
+
+
+def test_replayed_readings_are_not_counted_twice(collections):
+    batch = readings(120)
+    collections.write_readings(batch[:80])
+    # A spool replay resends readings that are already stored under their _id
+    assert collections.write_readings(batch[40:]) == 40
+    assert_matches_aggregation(collections)
+
+
+def test_startup_seed_keeps_an_existing_document(collections):
+    collections.write_readings(readings(50))
+    stored = collections.running_stats_collection.find_one()
+    seeded = seed_running_stats(collections.running_stats_collection,
+                                collections.readings_view, collections.COLLECTION_NAME)
+    assert seeded == stored
+
+
+def test_seed_of_empty_collection_takes_first_bounds(collections):
+    # Sensor startup on an empty database
+    seed_running_stats(collections.running_stats_collection,
+                       collections.readings_view, collections.COLLECTION_NAME)
+    collections.write_readings(readings(30))
+    stored = collections.running_stats_collection.find_one()
+    assert stored['first_reading'] == START
+    assert stored['fields']['voltage']['min'] == 3.0
+    assert_matches_aggregation(collections)
+
+
+def test_failed_derived_update_is_spooled_and_replayed(collections, monkeypatch, tmp_path):
+    from pymongo.errors import AutoReconnect
+    from spool import Spool
+
+    monkeypatch.setattr(collections, 'derived_spool', Spool(str(tmp_path)))
+    collections.write_readings(readings(20))
+
+    # The insert succeeds, the 1h rollup update after it does not
+    rollup = collections.rollup_collections['1h']
+    bulk_write = rollup.bulk_write
+
+    def unavailable(*args, **kwargs):
+        raise AutoReconnect('connection reset')
+
+    monkeypatch.setattr(rollup, 'bulk_write', unavailable)
+    later = readings(30, start=START + timedelta(hours=2))
+    assert collections.write_readings(later) == 30
+    assert collections.derived_spool.pending == 30
+    assert not collections.database_up.is_set()
+    # The stats and 1m steps were applied and are not spooled again
+    assert_matches_aggregation(collections)
+
+    monkeypatch.setattr(rollup, 'bulk_write', bulk_write)
+    collections.database_up.set()
+    collections.derived_spool.replay(collections.replay_derived)
+    assert collections.derived_spool.pending == 0
+    assert_matches_aggregation(collections)
+    hourly = {(doc['sensor_id'], doc['start']): doc['count'] for doc in rollup.find()}
+    assert sum(hourly.values()) == 50
+    assert sum(doc['count'] for doc in collections.rollup_collections['1m'].find()) == 50
+
+
+def test_archived_readings_are_taken_out_of_the_stats(collections, tmp_path):
+    from retention import export_expired
+
+    collections.write_readings(readings(200))
+    # The first 120 readings fall before the cutoff
+    exported = export_expired(collections.sensor_collection, START + timedelta(seconds=120), str(tmp_path),
+                              'gzip', batch_size=50, on_deleted=collections.remove_archived_stats)
+    assert exported['deleted'] == 120
+
+    stored = collections.running_stats_collection.find_one()
+    expected = aggregate_running_stats(collections.readings_view, collections.COLLECTION_NAME)
+    assert stored['count'] == expected['count'] == 80
+    assert stored['first_reading'] == START + timedelta(seconds=120)
+    for field, totals in expected['fields'].items():
+        assert stored['fields'][field]['n'] == totals['n'], field
+        assert stored['fields'][field]['sum'] == pytest.approx(totals['sum']), field
+    assert format_running_stats(stored) == format_running_stats(expected)
@@ -0,0 +1,18 @@
+"""
+The modules every server ships a copy of must match shared/.
+
+Run from sensor_server/: python -m pytest -q tests
+"""
+
+# Standard Libraries
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_server_copies_match_shared():
+    result = subprocess.run([sys.executable, os.path.join(PROJECT_DIR, 'shared', 'sync.py'), '--check'],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
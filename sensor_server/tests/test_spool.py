@@ -0,0 +1,48 @@
+"""
+Readings spooled during a MongoDB outage must reach the collection in _id
+order, ahead of readings generated after it, so root's _id-watermark
+consumers (tailer, scoring worker) see them.
+
+Run from sensor_server/: python -m pytest -q tests
+"""
+
+# Importing Required Libraries
+from pymongo.errors import AutoReconnect
+from spool import Spool
+
+
+def test_readings_spooled_in_an_outage_are_stored_before_newer_ones(collections, monkeypatch, tmp_path):
+    monkeypatch.setattr(collections, 'spool', Spool(str(tmp_path)))
+    generate = collections.generate_sensor_data
+
+    collections.write_or_spool([generate() for _ in range(5)])
+    watermark = max(reading['_id'] for reading in collections.sensor_collection.find())
+
+    # The outage: the insert fails and the batch is spooled
+    insert_many = collections.insert_collection.insert_many
+
+    def unavailable(*args, **kwargs):
+        raise AutoReconnect('connection refused')
+
+    monkeypatch.setattr(collections.insert_collection, 'insert_many', unavailable)
+    spooled = [generate() for _ in range(10)]
+    assert collections.write_or_spool(spooled) == 0
+    assert not collections.database_up.is_set()
+
+    # MongoDB answers a ping again before the replay thread has drained the spool
+    monkeypatch.setattr(collections.insert_collection, 'insert_many', insert_many)
+    collections.database_up.set()
+    newer = [generate() for _ in range(10)]
+    assert collections.write_or_spool(newer) == 0
+    assert collections.spool.pending == 20
+
+    collections.spool.replay(collections.write_readings)
+    assert collections.spool.pending == 0
+    collections.write_or_spool([generate() for _ in range(5)])
+
+    stored = [reading['_id'] for reading in collections.sensor_collection.find()]
+    assert stored == sorted(stored)
+    # What an _id-watermark consumer polling after the outage reads
+    seen = {reading['_id'] for reading in collections.sensor_collection.find({'_id': {'$gt': watermark}})}
+    assert {reading['_id'] for reading in spooled + newer} <= seen
+    assert collections.sensor_collection.count_documents({}) == 30
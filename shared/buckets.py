@@ -0,0 +1,439 @@
+"""
+Bucketed storage schema for sensor readings (STORAGE_SCHEMA=buckets).
+
+Instead of one document per reading, readings are stored one document
+per sensor_id per time window, as columns:
+
+    {'sensor_id': 'battery_001', 'start': <window start>, 'fields': [...],
+     'count': 3, 'min_ts': ..., 'max_ts': ..., 'min_id': ..., 'max_id': ...,
+     'ids': [<ObjectId>, ...], 'dt': [0, 1000, 2000],
+     'cols': {'voltage': [3.91, 3.9, 3.9], 'soc': [80, 80, 79], ...}}
+
+Field names are stored once per bucket rather than once per reading, and
+samples are appended in place with $push until a bucket holds
+`max_samples` readings (a new bucket is started for the same window
+after that). `dt` holds millisecond offsets from `start`; `ids` keeps each
+reading's ObjectId so readers can still tail and resume by _id. Readings
+with a different set of fields go to a separate bucket, so every column of
+a bucket has one value per sample.
+
+BucketStore is the writer used by sensor_server. BucketCollection wraps a
+bucket collection in the part of the pymongo Collection API root_server
+reads readings with (find, find_one, count_documents, aggregate) and
+returns unpacked reading documents, so callers need not know the schema.
+"""
+
+# Importing Required Libraries
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Standard Libraries
+import heapq
+import operator
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+# Stored per bucket rather than as columns
+KEY_FIELDS = ('_id', 'sensor_id', 'timestamp')
+# Bucket fields bounding the readings inside, per sortable reading field
+BOUNDS = {
+    'timestamp': ('min_ts', 'max_ts'),
+    '_id': ('min_id', 'max_id')
+}
+BUCKET_HEADER = ['sensor_id', 'start', 'ids', 'dt', 'min_ts', 'max_ts', 'min_id', 'max_id']
+
+
+def ensure_indexes(collection):
+    """Indexes for appends (sensor_id, start) and _id tailing; max_ts is left to ensure_ttl"""
+    collection.create_index([('sensor_id', 1), ('start', 1)])
+    collection.create_index([('max_id', 1)])
+
+
+def window_start(timestamp, span):
+    """Start of the `span`-second window holding a naive UTC timestamp"""
+    seconds = int((timestamp - EPOCH).total_seconds()) // span * span
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def unpack(bucket):
+    """Reading documents of a bucket, in the order they were appended"""
+    return [sample(bucket, i) for i in range(len(bucket.get('ids', [])))]
+
+
+def sample(bucket, i):
+    """The i-th reading of a bucket (only the columns that were fetched)"""
+    reading = {'_id': bucket['ids'][i], 'sensor_id': bucket.get('sensor_id')}
+    if 'dt' in bucket:
+        reading['timestamp'] = bucket['start'] + timedelta(milliseconds=bucket['dt'][i])
+    for field, values in bucket.get('cols', {}).items():
+        reading[field] = values[i]
+    return reading
+
+
+class BucketStore:
+    """Appends readings to per-sensor, per-window bucket documents"""
+
+    def __init__(self, collection, span=3600, max_samples=1000):
+        self.collection = collection
+        self.span = int(span)
+        self.max_samples = max_samples
+
+    def ensure_indexes(self):
+        ensure_indexes(self.collection)
+
+    def _stored_ids(self, readings):
+        """_ids of these readings already in a bucket, e.g. on a spool replay"""
+        ids = [reading['_id'] for reading in readings]
+        # New readings have the newest _ids, so this only matches buckets holding replayed ones
+        buckets = self.collection.find({
+            'sensor_id': {'$in': list({reading.get('sensor_id') for reading in readings})},
+            'max_id': {'$gte': min(ids)}
+        }, {'ids': 1})
+        stored = set()
+        for bucket in buckets:
+            stored.update(bucket['ids'])
+        return stored.intersection(ids)
+
+    def _append(self, sensor_id, start, fields, readings):
+        """One $push upsert appending readings to the sensor's open bucket for the window"""
+        ids = [reading['_id'] for reading in readings]
+        timestamps = [reading['timestamp'] for reading in readings]
+        push = {
+            'ids': {'$each': ids},
+            # BSON dates have millisecond precision
+            'dt': {'$each': [(timestamp - start) // timedelta(milliseconds=1) for timestamp in timestamps]}
+        }
+        for field in fields:
+            push[f'cols.{field}'] = {'$each': [reading[field] for reading in readings]}
+        return UpdateOne(
+            {'sensor_id': sensor_id, 'start': start, 'fields': list(fields),
+             'count': {'$lt': self.max_samples}},
+            {'$push': push,
+             '$inc': {'count': len(readings)},
+             '$min': {'min_ts': min(timestamps), 'min_id': min(ids)},
+             '$max': {'max_ts': max(timestamps), 'max_id': max(ids)}},
+            upsert=True)
+
+    def insert(self, readings):
+        """
+        Append readings (each with an _id and a timestamp) to their buckets
+        with one unordered bulk_write. Readings already stored are skipped.
+        Returns the readings written and the write errors of the rest.
+        """
+        if not readings:
+            return [], []
+        stored = self._stored_ids(readings)
+        groups = {}
+        for reading in readings:
+            if reading['_id'] in stored:
+                continue
+            fields = tuple(sorted(field for field in reading if field not in KEY_FIELDS))
+            key = (reading.get('sensor_id'), window_start(reading['timestamp'], self.span), fields)
+            groups.setdefault(key, []).append(reading)
+
+        operations = []
+        batches = []
+        for (sensor_id, start, fields), group in groups.items():
+            # A bucket may end up to one chunk over max_samples
+            for offset in range(0, len(group), self.max_samples):
+                batches.append(group[offset:offset + self.max_samples])
+                operations.append(self._append(sensor_id, start, fields, batches[-1]))
+        if not operations:
+            return [], []
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            errors = []
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+        failed = {error['index'] for error in errors}
+        written = [reading for i, batch in enumerate(batches) if i not in failed for reading in batch]
+        return written, errors
+
+
+def _compare(op):
+    def compare(value, operand):
+        try:
+            return value is not None and op(value, operand)
+        except TypeError:
+            return False
+    return compare
+
+
+OPERATORS = {
+    '$eq': operator.eq,
+    '$ne': operator.ne,
+    '$gt': _compare(operator.gt),
+    '$gte': _compare(operator.ge),
+    '$lt': _compare(operator.lt),
+    '$lte': _compare(operator.le),
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+    '$type': lambda value, operand: operand == 'date' and isinstance(value, datetime)
+}
+
+
+def matches(reading, query):
+    """Whether an unpacked reading matches a find() filter (comparisons, $in, $or and $and)"""
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(matches(reading, branch) for branch in condition):
+                return False
+        elif key == '$and':
+            if not all(matches(reading, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            value = reading.get(key)
+            for op, operand in condition.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Query operator {op} is not supported on bucketed readings")
+                if not OPERATORS[op](value, operand):
+                    return False
+        elif reading.get(key) != condition:
+            return False
+    return True
+
+
+def field_range(query, field):
+    """Loosest (low, high) bounds a filter puts on a field; None where it puts none"""
+    low = high = None
+    for key, condition in query.items():
+        if key in ('$or', '$and'):
+            ranges = [field_range(branch, field) for branch in condition]
+            if key == '$or':
+                # Bounded only if every branch is
+                lows, highs = [r[0] for r in ranges], [r[1] for r in ranges]
+                ranges = [(min(lows) if None not in lows else None, max(highs) if None not in highs else None)]
+        elif key == field:
+            if isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+                ranges = [(condition.get('$gt', condition.get('$gte', condition.get('$eq'))),
+                           condition.get('$lt', condition.get('$lte', condition.get('$eq'))))]
+            else:
+                ranges = [(condition, condition)]
+        else:
+            continue
+        for branch_low, branch_high in ranges:
+            if branch_low is not None:
+                low = branch_low if low is None else max(low, branch_low)
+            if branch_high is not None:
+                high = branch_high if high is None else min(high, branch_high)
+    return low, high
+
+
+def bucket_filter(query):
+    """Filter on bucket documents selecting every bucket that can hold a matching reading"""
+    selector = {}
+    for field, (low_field, high_field) in BOUNDS.items():
+        low, high = field_range(query, field)
+        if low is not None:
+            selector[high_field] = {'$gte': low}
+        if high is not None:
+            selector[low_field] = {'$lte': high}
+    sensor_id = query.get('sensor_id')
+    if sensor_id is not None and (not isinstance(sensor_id, dict) or set(sensor_id) <= {'$eq', '$in'}):
+        selector['sensor_id'] = sensor_id
+    return selector
+
+
+def query_fields(query):
+    """Reading fields a filter looks at"""
+    fields = set()
+    for key, condition in query.items():
+        if key in ('$or', '$and'):
+            for branch in condition:
+                fields |= query_fields(branch)
+        else:
+            fields.add(key)
+    return fields
+
+
+def project(reading, projection):
+    """Apply an inclusion projection ({field: 1}, optionally '_id': 0)"""
+    if projection is None:
+        return reading
+    included = {field for field, keep in projection.items() if keep}
+    document = {key: value for key, value in reading.items() if key in included or key == '_id'}
+    if not projection.get('_id', 1):
+        document.pop('_id', None)
+    return document
+
+
+class BucketCursor:
+    """find() over bucketed readings, evaluated when iterated; supports sort() and limit()"""
+
+    def __init__(self, buckets, query, projection):
+        self.buckets = buckets
+        self.query = query
+        self.projection = projection
+        self.sort_keys = []
+        self.limit_count = 0
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            self.sort_keys = [(key_or_list, direction)]
+        else:
+            self.sort_keys = list(key_or_list)
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def __iter__(self):
+        return iter(self.buckets.scan(self.query, self.projection, self.sort_keys, self.limit_count))
+
+
+class BucketCollection:
+    """Read-only view of a bucket collection as a collection of reading documents"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def ensure_indexes(self):
+        ensure_indexes(self.collection)
+
+    def find(self, filter=None, projection=None):
+        return BucketCursor(self, filter or {}, projection)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        cursor = self.find(filter, projection).limit(1)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, filter):
+        if not filter:
+            totals = list(self.collection.aggregate([{'$group': {'_id': None, 'count': {'$sum': '$count'}}}]))
+            return totals[0]['count'] if totals else 0
+        return sum(1 for _ in self.scan(filter, {'_id': 1}))
+
+    def unpack_stages(self):
+        """Aggregation stages turning bucket documents into reading documents"""
+        # distinct() on an array field returns its elements
+        fields = sorted(self.collection.distinct('fields'))
+        reading = {
+            '_id': '$ids',
+            'sensor_id': 1,
+            'timestamp': {'$add': ['$start', {'$arrayElemAt': ['$dt', '$_sample']}]}
+        }
+        for field in fields:
+            reading[field] = {'$arrayElemAt': [f'$cols.{field}', '$_sample']}
+        return [
+            {'$unwind': {'path': '$ids', 'includeArrayIndex': '_sample'}},
+            {'$project': reading}
+        ]
+
+    def aggregate(self, pipeline, **kwargs):
+        return self.collection.aggregate(self.unpack_stages() + list(pipeline), **kwargs)
+
+    def watch(self, *args, **kwargs):
+        # Appends are updates to a bucket, not inserts of readings
+        raise NotImplementedError('Change streams are not available on bucketed readings')
+
+    def scan(self, query, projection=None, sort=None, limit=0):
+        """
+        Yield the readings matching `query` in `sort` order. Buckets are read
+        in order of the bound of the first sort key, and a reading is
+        yielded once no unread bucket can hold one that sorts before it,
+        so a limited scan stops after the buckets it needs.
+        """
+        bucket_projection = dict.fromkeys(BUCKET_HEADER, 1)
+        if projection is None:
+            bucket_projection['cols'] = 1
+        else:
+            fields = {field for field, keep in projection.items() if keep} | query_fields(query)
+            fields |= {field for field, _ in sort or []}
+            bucket_projection.update({f'cols.{field}': 1 for field in fields if field not in KEY_FIELDS})
+        buckets = self.collection.find(bucket_filter(query), bucket_projection)
+
+        if not sort or sort[0][0] not in BOUNDS:
+            readings = (reading for bucket in buckets for reading in unpack(bucket) if matches(reading, query))
+            if sort:
+                readings = self._ordered(list(readings), sort)
+            for count, reading in enumerate(readings, 1):
+                yield project(reading, projection)
+                if count == limit:
+                    return
+            return
+
+        if len({direction for _, direction in sort}) > 1:
+            raise ValueError('Mixed sort directions are not supported on bucketed readings')
+        descending = sort[0][1] == -1
+        first = sort[0][0]
+        edge = BOUNDS[first][1] if descending else BOUNDS[first][0]
+        ahead = operator.gt if descending else operator.lt
+        key = self._key(sort)
+        # Readings outside these bounds on the first sort key cannot match
+        bounds = field_range(query, first)
+        pending = []
+        worst = None
+        emitted = 0
+        for bucket in buckets.sort(edge, -1 if descending else 1):
+            # This bucket and every later one only hold readings at or behind its edge
+            ready = [reading for reading in pending if ahead(reading[first], bucket[edge])]
+            if ready:
+                pending = [reading for reading in pending if not ahead(reading[first], bucket[edge])]
+                for reading in self._ordered(ready, sort):
+                    yield project(reading, projection)
+                    emitted += 1
+                    if emitted == limit:
+                        return
+
+            wanted = limit - emitted if limit else None
+            pending.extend(self._bucket_readings(bucket, query, sort, wanted, bounds, worst))
+            if wanted is not None and len(pending) >= wanted:
+                # Keep the best `wanted`, best first; nothing behind the last can make the result
+                pending = (heapq.nlargest if descending else heapq.nsmallest)(wanted, pending, key)
+                worst = pending[-1][first]
+
+        for reading in self._ordered(pending, sort):
+            yield project(reading, projection)
+            emitted += 1
+            if emitted == limit:
+                return
+
+    @staticmethod
+    def _key(sort):
+        fields = [field for field, _ in sort]
+        return lambda reading: tuple(reading.get(field) for field in fields)
+
+    def _ordered(self, readings, sort):
+        return sorted(readings, key=self._key(sort), reverse=sort[0][1] == -1)
+
+    @staticmethod
+    def _bucket_readings(bucket, query, sort, wanted, bounds, worst):
+        """
+        Up to `wanted` matching readings of a bucket, best first by `sort`,
+        skipping samples outside `bounds` on the first sort key and stopping
+        at the first one that sorts behind `worst`.
+        """
+        columns = {'timestamp': bucket['dt'], '_id': bucket['ids'], **bucket.get('cols', {})}
+        sort_columns = [columns[field] for field, _ in sort if field in columns]
+        descending = sort[0][1] == -1
+        order = sorted(range(len(bucket['ids'])),
+                       key=lambda i: tuple(column[i] for column in sort_columns),
+                       reverse=descending)
+        low, high = bounds
+        if descending:
+            low, high = high, low
+        behind = operator.lt if descending else operator.gt
+        if worst is not None and (high is None or behind(high, worst)):
+            high = worst
+        readings = []
+        for i in order:
+            if sort[0][0] == 'timestamp':
+                value = bucket['start'] + timedelta(milliseconds=bucket['dt'][i])
+            else:
+                value = bucket['ids'][i]
+            # Samples come best first: skip ahead of the range, stop once behind it
+            if low is not None and behind(low, value):
+                continue
+            if high is not None and behind(value, high):
+                break
+            reading = sample(bucket, i)
+            if matches(reading, query):
+                readings.append(reading)
+                if len(readings) == wanted:
+                    break
+        return readings
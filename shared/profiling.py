@@ -0,0 +1,248 @@
+"""
+On-demand request profiling.
+
+When enabled, every response carries a Server-Timing header with coarse
+phase timings, e.g.
+
+    Server-Timing: db;dur=12.4;desc="3 commands", ml;dur=41.0, serialize;dur=0.8, total;dur=57.3
+
+Code marks its phases with `with phase('ml'):`; MongoDB command time is
+collected by a pymongo command listener (pass db_listeners() to
+MongoClient) and jsonify time by wrapping the app's JSON provider.
+
+Selected requests are also profiled: those carrying the profile header
+(whose value must equal `token` when one is set) and a random
+`sample_rate` fraction of the rest. Profiles are written to `directory`
+as collapsed stacks (`sample` mode: a stack sampler thread, one
+`frame;frame;frame count` line per stack, read by flamegraph.pl,
+speedscope and inferno) or pstats files (`cprofile` mode: snakeviz,
+flameprof). The file name is returned in X-Profile-File.
+
+When disabled nothing is installed; phase() is then a thread-local
+lookup and nothing else.
+"""
+
+# Standard Libraries
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    from pymongo import monitoring
+except ImportError:
+    # ml_server has no MongoDB client
+    monitoring = None
+
+MODES = ('sample', 'cprofile')
+
+# Phase timings of the request running on this thread, or None when it is not timed
+_local = threading.local()
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's `name` phase"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+if monitoring is not None:
+    class DatabaseTimer(monitoring.CommandListener):
+        """Adds MongoDB command durations to the `db` phase of the request on the calling thread"""
+
+        def started(self, event):
+            pass
+
+        def _record(self, event):
+            timings = getattr(_local, 'timings', None)
+            if timings is not None:
+                timings['db'] = timings.get('db', 0.0) + event.duration_micros / 1e6
+                _local.db_commands += 1
+
+        succeeded = failed = _record
+
+
+def db_listeners(enabled):
+    """event_listeners for MongoClient: the command timer when profiling is enabled"""
+    return [DatabaseTimer()] if enabled and monitoring is not None else []
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Server-Timing headers for every request and profiles for selected ones"""
+
+    def __init__(self, directory='profiles', mode='sample', sample_rate=0.0, token='',
+                 header='X-Profile', interval_ms=5, max_files=200):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected sample or cprofile")
+        self.directory = directory
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.token = token
+        self.header = header
+        self.interval = interval_ms / 1000
+        self.max_files = max_files
+        self.lock = threading.Lock()
+        self.counters = {'timed': 0, 'profiled': 0, 'profile_errors': 0}
+
+    def init_app(self, app):
+        """Register the request hooks and time the app's JSON responses"""
+        respond = app.json.response
+
+        def timed_response(*args, **kwargs):
+            with phase('serialize'):
+                return respond(*args, **kwargs)
+
+        app.json.response = timed_response
+        app.before_request(self._before)
+        app.after_request(self._after)
+        # Requests that raise never reach after_request
+        app.teardown_request(lambda exc: self._finish())
+
+    def _selected(self, request):
+        value = request.headers.get(self.header)
+        if value is not None:
+            return not self.token or value == self.token
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before(self):
+        from flask import request
+        _local.timings = {}
+        _local.db_commands = 0
+        _local.started = time.perf_counter()
+        _local.profile = None
+        if self._selected(request):
+            try:
+                if self.mode == 'cprofile':
+                    profile = cProfile.Profile()
+                    profile.enable()
+                else:
+                    profile = StackSampler(threading.get_ident(), self.interval)
+                    profile.start()
+                _local.profile = profile
+            except ValueError:
+                # Another profiler is already active on this interpreter
+                with self.lock:
+                    self.counters['profile_errors'] += 1
+
+    def _finish(self):
+        """Stop the profiler, if any, and stop timing this thread; returns the profiler"""
+        profile = getattr(_local, 'profile', None)
+        if profile is not None:
+            if self.mode == 'cprofile':
+                profile.disable()
+            else:
+                profile.stop()
+        _local.profile = None
+        _local.timings = None
+        return profile
+
+    def _after(self, response):
+        from flask import request
+        timings = _local.timings
+        if timings is None:
+            return response
+        total = time.perf_counter() - _local.started
+        db_commands = _local.db_commands
+        profile = self._finish()
+
+        entries = []
+        for name, seconds in timings.items():
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if name == 'db':
+                entry += f';desc="{db_commands} commands"'
+            entries.append(entry)
+        entries.append(f"total;dur={total * 1000:.1f}")
+        response.headers['Server-Timing'] = ', '.join(entries)
+
+        with self.lock:
+            self.counters['timed'] += 1
+        if profile is not None:
+            try:
+                response.headers['X-Profile-File'] = self._write(profile, request, total)
+                with self.lock:
+                    self.counters['profiled'] += 1
+            except OSError:
+                with self.lock:
+                    self.counters['profile_errors'] += 1
+        return response
+
+    def _write(self, profile, request, total):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug}-{total * 1000:.0f}ms-" \
+               f"{threading.get_ident() % 10000:04d}.{'folded' if self.mode == 'sample' else 'prof'}"
+        path = os.path.join(self.directory, name)
+        if self.mode == 'cprofile':
+            profile.dump_stats(path)
+        else:
+            profile.write(path)
+        self._prune()
+        return name
+
+    def _prune(self):
+        """Delete the oldest profiles beyond max_files"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(('.folded', '.prof')))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def metrics(self):
+        """Profiling settings and counts for status payloads"""
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'sample_rate': self.sample_rate,
+                'header': self.header,
+                'token_required': bool(self.token),
+                'directory': os.path.abspath(self.directory),
+                **self.counters
+            }
@@ -0,0 +1,68 @@
+"""
+Copy the shared modules into the servers that use them.
+
+Each server is deployed on its own (one Vercel project per directory), so
+it ships its own copy of these modules. The copies in shared/ are the ones
+to edit; this script writes them into every server, and --check fails when
+any server copy differs, so a stale copy is caught before it is deployed.
+
+Usage:
+    python shared/sync.py           # write shared/*.py into the servers
+    python shared/sync.py --check   # exit 1 if any server copy differs
+"""
+
+# Standard Libraries
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SHARED_DIR)
+
+# Shared module -> servers that ship a copy of it
+MODULES = {
+    'structured_log.py': ('ml_server', 'root_server', 'sensor_server'),
+    'profiling.py': ('ml_server', 'root_server', 'sensor_server'),
+    'fast_json.py': ('ml_server', 'root_server', 'sensor_server'),
+    'buckets.py': ('root_server', 'sensor_server'),
+    'running_stats.py': ('root_server', 'sensor_server')
+}
+
+
+def copies():
+    """(shared path, server copy path) for every module and server"""
+    for module, servers in MODULES.items():
+        for server in servers:
+            yield os.path.join(SHARED_DIR, module), os.path.join(PROJECT_DIR, server, module)
+
+
+def stale_copies():
+    """Server copies that are missing or differ from shared/"""
+    return [target for source, target in copies()
+            if not os.path.exists(target) or not filecmp.cmp(source, target, shallow=False)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--check', action='store_true', help='Only report server copies that differ')
+    args = parser.parse_args()
+
+    stale = stale_copies()
+    if args.check:
+        for target in stale:
+            print(f"✗ {os.path.relpath(target, PROJECT_DIR)} differs from shared/; run python shared/sync.py")
+        if stale:
+            sys.exit(1)
+        print(f"✓ {sum(len(servers) for servers in MODULES.values())} server copies match shared/")
+        return
+
+    sources = {target: source for source, target in copies()}
+    for target in stale:
+        shutil.copyfile(sources[target], target)
+        print(f"✓ Updated {os.path.relpath(target, PROJECT_DIR)}")
+
+
+if __name__ == '__main__':
+    main()